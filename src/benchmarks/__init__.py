@@ -0,0 +1 @@
+# Benchmark scripts, run from src with: python -m benchmarks.<name>
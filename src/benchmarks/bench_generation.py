@@ -0,0 +1,94 @@
+# Benchmark for bulk password and passphrase generation
+# Compares the original generators (one secrets.choice / random call per
+# character, the wordlist re-read for every passphrase) with calling the
+# current single-value generators in a loop and with generate_many.
+#
+# Run from the src directory:
+#   python -m benchmarks.bench_generation [count]
+
+import random
+import string
+import sys
+import time
+from secrets import SystemRandom, choice
+import xkcdpass.xkcd_password as xp
+from managers.password_generator import PasswordGeneration
+from managers.passphrase_generator import PassphraseGenerator, load_wordlist
+
+
+def legacy_generate_password(length=15, uppercase=2, numbers=2, specials=2):
+    """The original implementation: one secrets.choice per character, then a SystemRandom shuffle."""
+    upperCase = string.ascii_uppercase
+    lowerCase = string.ascii_lowercase
+    digits = string.digits
+    punctuation = string.punctuation
+
+    password = [
+        *(choice(upperCase) for _ in range(uppercase)),
+        *(choice(digits) for _ in range(numbers)),
+        *(choice(punctuation) for _ in range(specials)),
+        *(choice(upperCase + lowerCase + digits + punctuation)
+          for _ in range(length - uppercase - numbers - specials))
+    ]
+
+    SystemRandom().shuffle(password)
+    return ''.join(password)
+
+
+def legacy_insert_random_characters(words, chars, count, transform=None):
+    """The original character insertion, using the random module."""
+    for _ in range(count):
+        word_index = random.randint(0, len(words) - 1)
+        word = list(words[word_index])
+        char_index = random.randint(0, len(word) - 1)
+
+        if transform:
+            word[char_index] = transform(word[char_index])
+        else:
+            word[char_index] = random.choice(chars)
+
+        words[word_index] = ''.join(word)
+    return words
+
+
+def legacy_generate_passphrase(num_words=4, word_length=4, separator='-', min_length=15,
+                               min_uppercase=2, min_numbers=2):
+    """The original implementation: the wordfile is read again for every passphrase."""
+    wordlist = xp.generate_wordlist(wordfile=xp.locate_wordfile(), min_length=word_length)
+    words = xp.generate_xkcdpassword(wordlist, numwords=num_words, delimiter=separator).split(separator)
+
+    while sum(len(word) for word in words) + len(separator) * (len(words) - 1) < min_length:
+        words.append(random.choice(wordlist))
+
+    words = legacy_insert_random_characters(words, string.ascii_uppercase, min_uppercase)
+    words = legacy_insert_random_characters(words, string.digits, min_numbers)
+    return separator.join(words)
+
+
+def timed(func):
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def main(count=10000):
+    # Keep the one-off wordlist read out of the current generators' measurements
+    load_wordlist(PassphraseGenerator().policy.word_length)
+
+    generators = {
+        'password': (PasswordGeneration(), 'generate_secure_password', legacy_generate_password),
+        'passphrase': (PassphraseGenerator(), 'generate_passphrase', legacy_generate_passphrase),
+    }
+
+    print(f"{count} values per run")
+    print(f"{'generator':<12}{'before (s)':>12}{'per call (s)':>14}{'generate_many (s)':>20}{'speedup':>10}")
+    for name, (generator, single, legacy) in generators.items():
+        generate_one = getattr(generator, single)
+        before = timed(lambda: [legacy() for _ in range(count)])
+        per_call = timed(lambda: [generate_one() for _ in range(count)])
+        after = timed(lambda: list(generator.generate_many(count)))
+        print(f"{name:<12}{before:>12.3f}{per_call:>14.3f}{after:>20.3f}{before / after:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
@@ -0,0 +1,56 @@
+# Benchmark for PassManApp cold start
+# Measures time-to-first-window in a fresh interpreter (so nothing is already
+# imported), and what building every page up front would have added.
+# The goal is a first window in under 200 ms.
+#
+# Run from the src directory (needs a display for the window timings):
+#   python -m benchmarks.bench_startup [runs]
+
+import subprocess
+import sys
+
+TARGET_MS = 200
+
+# Run in a child interpreter; prints import, first window and all-pages times in ms
+CHILD = """
+import time
+start = time.perf_counter()
+import frameController
+imported = time.perf_counter()
+try:
+    app = frameController.PassManApp()
+    app.update()
+except frameController.tk.TclError:  # No display available
+    print(f"{(imported - start) * 1000:.1f} nan nan")
+    raise SystemExit
+shown = time.perf_counter()
+for page in frameController.PAGES:
+    if page not in app.frames:
+        app._create_frame(page)
+app.update()
+eager = time.perf_counter()
+app.destroy()
+print(f"{(imported - start) * 1000:.1f} {(shown - start) * 1000:.1f} {(eager - shown) * 1000:.1f}")
+"""
+
+
+def run_once():
+    output = subprocess.run([sys.executable, "-c", CHILD], capture_output=True, text=True, check=True).stdout
+    return [float(value) for value in output.split()]
+
+
+def main(runs=5):
+    results = [run_once() for _ in range(runs)]
+    imported, shown, eager = (min(column) for column in zip(*results))
+
+    print(f"best of {runs} cold starts")
+    print(f"{'import frameController':<28}{imported:>10.1f} ms")
+    if shown != shown:  # NaN: Tk could not open a window
+        print("No display available; window timings skipped.")
+        return
+    print(f"{'first window':<28}{shown:>10.1f} ms  (target {TARGET_MS} ms)")
+    print(f"{'building the other pages':<28}{eager:>10.1f} ms  (deferred until shown)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
@@ -0,0 +1,60 @@
+# Benchmark for PasswordValidator._min_validation
+# Compares the original five-pass counting with the single-pass classifier.
+#
+# Run from the src directory:
+#   python -m benchmarks.bench_validation
+
+import timeit
+from managers.validation_manager import PasswordValidator
+
+validator = PasswordValidator()
+
+
+def legacy_min_validation(password):
+    """The original implementation: five passes and strong checked before weak."""
+    if len(password) < validator.weak_requirements['length']:
+        return 'invalid'
+
+    password_status = {
+        'length': len(password),
+        'upper': sum(1 for c in password if c.isupper()),
+        'lower': sum(1 for c in password if c.islower()),
+        'number': sum(1 for c in password if c.isdigit()),
+        'special': sum(1 for c in password if not c.isalnum()),
+    }
+
+    if validator._meets_requirements(password_status, validator.strong_requirements):
+        return 'strong'
+    elif validator._meets_requirements(password_status, validator.weak_requirements):
+        return 'weak'
+    return 'invalid'
+
+
+CASES = {
+    'typical (16 chars)': 'Tr0ub4dor&3xyz!!',
+    'short (6 chars)': 'abc12!',
+    'weak, no specials (20 chars)': 'Password1234567890ab',
+    'very long (10k chars)': 'Tr0ub4dor&3xyz!!' * 625,
+    'non-ASCII (16 chars)': 'Pässwörd&3xÿz!!Ä',
+    'non-ASCII, very long (10k chars)': 'Pässwörd&3xÿz!!Ä' * 625,
+}
+
+
+def bench(func, password):
+    timer = timeit.Timer(lambda: func(password))
+    loops, _ = timer.autorange()
+    best = min(timer.repeat(repeat=5, number=loops))
+    return best / loops * 1e6  # microseconds per call
+
+
+def main():
+    print(f"{'input':<34}{'before (us)':>14}{'after (us)':>14}{'speedup':>10}")
+    for name, password in CASES.items():
+        assert legacy_min_validation(password) == validator._min_validation(password), name
+        before = bench(legacy_min_validation, password)
+        after = bench(validator._min_validation, password)
+        print(f"{name:<34}{before:>14.2f}{after:>14.2f}{before / after:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
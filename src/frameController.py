@@ -1,7 +1,19 @@
 import tkinter as tk
 from tkinter import ttk
-from pages import startFrame, loginFrame, registerFrame, passwordFrame
+import importlib
 import traceback
+from taskScheduler import TaskScheduler, PRIORITY_BACKGROUND
+
+# Page name -> module defining it. Pages are imported and built the first
+# time they are shown, so startup only pays for the start page.
+PAGES = {
+    "StartPage": "pages.startFrame",
+    "LoginPage": "pages.loginFrame",
+    "RegisterPage": "pages.registerFrame",
+    "PasswordsPage": "pages.passwordFrame",
+}
+
+EVICT_MS = 30000  # How often cached vaults are checked for having gone idle
 
 class PassManApp(tk.Tk):
     def __init__(self, *args, **kwargs):
@@ -12,23 +24,47 @@ class PassManApp(tk.Tk):
 
         self.shared_data={}
 
-        container = ttk.Frame(self)
-        container.pack(side="top", fill="both", expand=True)
-        container.grid_rowconfigure(0, weight=1)
-        container.grid_columnconfigure(0, weight=1)
+        # Blocking manager calls from every page run on the shared scheduler
+        self.scheduler = TaskScheduler(self, on_busy=self.set_busy, on_error=self.handle_error)
+
+        # Managers shared by every page, created on first use
+        self._login_manager = None
+        self._password_manager = None
+
+        self.container = ttk.Frame(self)
+        self.container.pack(side="top", fill="both", expand=True)
+        self.container.grid_rowconfigure(0, weight=1)
+        self.container.grid_columnconfigure(0, weight=1)
 
         #Create error message label
         self.error_label = ttk.Label(self, text="", foreground="red", wraplength=400)
         self.error_label.pack()
 
-        self.frames = {}
-        for F in (startFrame.StartPage, loginFrame.LoginPage, registerFrame.RegisterPage, passwordFrame.PasswordsPage):
-            page_name = F.__name__
-            frame = F(parent=container, controller=self)
-            self.frames[page_name] = frame
-            frame.grid(row=0, column=0, sticky="nsew")
+        # Busy indicator, shown while the scheduler has tasks outstanding
+        self.busy_indicator = ttk.Progressbar(self, mode="indeterminate", length=120)
 
+        self.frames = {}
         self.show_frame("StartPage")
+
+        # Idle vaults are dropped from memory on a timer, not only when next used
+        self._evict_after = self.after(EVICT_MS, self._evict_idle_vaults)
+        self.protocol("WM_DELETE_WINDOW", self.close)
+
+    @property
+    def login_manager(self):
+        """The LoginManager shared by every page."""
+        if self._login_manager is None:
+            from managers.login_manager import LoginManager
+            self._login_manager = LoginManager()
+        return self._login_manager
+
+    @property
+    def password_manager(self):
+        """The PasswordManager shared by every page, so they share one vault cache."""
+        if self._password_manager is None:
+            from managers.password_manager import PasswordManager
+            self._password_manager = PasswordManager()
+        return self._password_manager
     
     def set_error_message(self, message):
         """Display error messages on the GUI."""
@@ -44,9 +80,62 @@ class PassManApp(tk.Tk):
         traceback.print_exc() 
         self.set_error_message(error_message)
 
+    def set_busy(self, busy):
+        """Show or hide the busy indicator and cursor."""
+        if busy:
+            self.busy_indicator.pack()
+            self.busy_indicator.start()
+            self.config(cursor="watch")
+        else:
+            self.busy_indicator.stop()
+            self.busy_indicator.pack_forget()
+            self.config(cursor="")
+
+    def dispatch(self, func):
+        """
+        Queues func to run on the Tk thread. Safe to call from any thread,
+        unlike Tk itself.
+        """
+        self.scheduler.dispatch(func)
+
+    def _evict_idle_vaults(self):
+        """Evicts idle cached vaults on a worker, then checks again in EVICT_MS."""
+        if self._password_manager is not None:
+            self.scheduler.submit(self._password_manager.evict_idle, priority=PRIORITY_BACKGROUND)
+        self._evict_after = self.after(EVICT_MS, self._evict_idle_vaults)
+
+    def logout(self):
+        """Locks the logged in user's vault and returns to the start page."""
+        username = self.shared_data.pop("username", None)
+        if username is not None:
+            self.password_manager.lock(username)
+        self.show_frame("StartPage")
+
+    def close(self):
+        """Locks every vault and stops the scheduler before closing the window."""
+        self.after_cancel(self._evict_after)
+        self.scheduler.shutdown()
+        if self._password_manager is not None:
+            self._password_manager.lock()
+        # Keys can be unlocked before any page has used a PasswordManager
+        from managers import vault_keys
+        vault_keys.lock_all()
+        self.destroy()
+
+    def _create_frame(self, page_name):
+        """Imports and builds a page the first time it is needed."""
+        page_class = getattr(importlib.import_module(PAGES[page_name]), page_name)
+        frame = page_class(parent=self.container, controller=self)
+        self.frames[page_name] = frame
+        frame.grid(row=0, column=0, sticky="nsew")
+        return frame
+
     def show_frame(self, page_name):
-        frame = self.frames[page_name]
+        frame = self.frames.get(page_name) or self._create_frame(page_name)
         frame.tkraise()
+        # Let the page refresh itself each time it is shown
+        if hasattr(frame, "on_show"):
+            frame.on_show()
 
 if __name__ == "__main__":
     app = PassManApp()
@@ -1,13 +1,24 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
 from managers import PasswordManager, PasswordValidator, PasswordGeneration, PassphraseGenerator
+from managers.passphrase_generator import preload_wordlist
+from taskScheduler import PRIORITY_BACKGROUND, PRIORITY_USER, TaskScheduler
 
+# Live strength meter timings (milliseconds)
+STRENGTH_DEBOUNCE_MS = 150  # quiet time after the last keystroke before evaluating
+
+# Meter level and colour for each validation result
+STRENGTH_LEVELS = {
+    "invalid": (1, "red"),
+    "weak": (2, "orange"),
+    "strong": (3, "green"),
+}
 
 class PasswordManagerGUI:
     def __init__(self, root):
         self.root = root
         self.root.title("Password Manager")
-        self.root.geometry("400x390")
+        self.root.geometry("400x425")
         
         # Default Styles
         self.style = ttk.Style()
@@ -17,6 +28,15 @@ class PasswordManagerGUI:
         self.validator = PasswordValidator()
         self.manager = PasswordManager()
         self.password_generator = PasswordGeneration()
+        self.passphrase_generator = PassphraseGenerator()
+
+        # zxcvbn and vault writes run on worker threads
+        self.scheduler = TaskScheduler(self.root, on_busy=self.set_busy)
+
+        # Live strength meter state: only the result for the latest
+        # keystroke is ever shown
+        self._strength_after = None
+        self._strength_task = None
         
         # Initialize menu bar
         self.menu_bar = tk.Menu(self.root)
@@ -49,42 +69,55 @@ class PasswordManagerGUI:
 
     def create_widgets(self):
         """Create and layout the main widgets."""
+        # Site
+        self.site_label = ttk.Label(self.main_frame, text="Site:")
+        self.site_label.grid(row=0, column=0, sticky=tk.W, pady=5)
+        self.site_entry = ttk.Entry(self.main_frame)
+        self.site_entry.grid(row=0, column=1, sticky=tk.W, pady=5)
+
         # Username
         self.username_label = ttk.Label(self.main_frame, text="Username:")
-        self.username_label.grid(row=0, column=0, sticky=tk.W, pady=5)
+        self.username_label.grid(row=1, column=0, sticky=tk.W, pady=5)
         self.username_entry = ttk.Entry(self.main_frame)
-        self.username_entry.grid(row=0, column=1, sticky=tk.W, pady=5)
+        self.username_entry.grid(row=1, column=1, sticky=tk.W, pady=5)
 
         # Password
         self.password_label = ttk.Label(self.main_frame, text="Password:")
-        self.password_label.grid(row=1, column=0, sticky=tk.W, pady=5)
+        self.password_label.grid(row=2, column=0, sticky=tk.W, pady=5)
         self.password_entry = ttk.Entry(self.main_frame, show="*")
-        self.password_entry.grid(row=1, column=1, sticky=tk.W, pady=5)
+        self.password_entry.grid(row=2, column=1, sticky=tk.W, pady=5)
+        self.password_entry.bind("<KeyRelease>", lambda event: self.schedule_strength_check())
 
         # Generate Password Button
         self.generate_button = ttk.Button(self.main_frame, text="Generate Password", command=self.generate_password)
-        self.generate_button.grid(row=2, column=0, sticky=tk.W, pady=5)
+        self.generate_button.grid(row=3, column=0, sticky=tk.W, pady=5)
 
         # Generate Passphrase Button
         self.generate_passphrase_button = ttk.Button(self.main_frame, text="Generate Passphrase", command=self.generate_passphrase)
-        self.generate_passphrase_button.grid(row=3, column=0, sticky=tk.W, pady=5)
+        self.generate_passphrase_button.grid(row=4, column=0, sticky=tk.W, pady=5)
+
+        # Live Strength Meter
+        self.strength_label = ttk.Label(self.main_frame, text="Strength: -")
+        self.strength_label.grid(row=4, column=1, sticky=tk.W, pady=5)
+        self.strength_meter = ttk.Progressbar(self.main_frame, maximum=3, length=120)
+        self.strength_meter.grid(row=5, column=1, sticky=tk.W, pady=5)
 
         # Copy Password Button
         self.copy_button = ttk.Button(self.main_frame, text="Copy Password", command=self.copy_password)
-        self.copy_button.grid(row=2, column=1, sticky=tk.W, pady=5)
+        self.copy_button.grid(row=3, column=1, sticky=tk.W, pady=5)
         self.copy_button.state(["disabled"])  # Initially disabled
 
         # Store Password Button
         self.store_button = ttk.Button(self.main_frame, text="Store Password", command=self.store_password)
-        self.store_button.grid(row=4, column=0, sticky=tk.W, pady=5)
+        self.store_button.grid(row=5, column=0, sticky=tk.W, pady=5)
 
         # Status Label
         self.status_label = ttk.Label(self.main_frame, text="", wraplength=300)
-        self.status_label.grid(row=5, column=0, columnspan=3, sticky=tk.W, pady=10)
+        self.status_label.grid(row=6, column=0, columnspan=3, sticky=tk.W, pady=10)
 
         # Scrollable Suggestions Box
         self.scrollable_frame = ttk.Frame(self.main_frame)
-        self.scrollable_frame.grid(row=6, column=0, columnspan=3, sticky=tk.W, pady=10)
+        self.scrollable_frame.grid(row=7, column=0, columnspan=3, sticky=tk.W, pady=10)
 
         # Suggestion Label
         self.suggestions_label = ttk.Label(self.scrollable_frame, text="Password Suggestions:", font=('Arial', 10))
@@ -109,8 +142,8 @@ class PasswordManagerGUI:
         self.suggestions_text.insert(tk.END, "At least 8 characters\nAt least one uppercase letter\nAt least one number\nAt least one special character")
         self.suggestions_text.configure(state='disabled')
 
-        # Set focus to the username entry
-        self.username_entry.focus()
+        # Set focus to the first entry
+        self.site_entry.focus()
 
     def apply_default_styles(self):
         """Apply default styles for the app."""
@@ -173,14 +206,63 @@ class PasswordManagerGUI:
         self.password_entry.insert(0, password)
         self.status_label.config(text=f"Generated: {password} \nKeep it safe.", foreground="green")
         self.copy_button.state(["!disabled"])
+        self.schedule_strength_check()
 
     def generate_passphrase(self):
         """Generate a passphrase and display it."""
-        passphrase = PassphraseGenerator().generate_passphrase()
+        passphrase = self.passphrase_generator.generate_passphrase()
         self.password_entry.delete(0, tk.END)
         self.password_entry.insert(0, passphrase)
         self.status_label.config(text=f"Generated: {passphrase} \nKeep it safe.", foreground="orange")
         self.copy_button.state(["!disabled"])
+        self.schedule_strength_check()
+
+    def schedule_strength_check(self):
+        """
+        Debounce keystrokes: restart the timer on every change so the
+        evaluation only starts once typing pauses.
+        """
+        if self._strength_after is not None:
+            self.root.after_cancel(self._strength_after)
+        self._strength_after = self.root.after(STRENGTH_DEBOUNCE_MS, self._start_strength_check)
+
+    def _start_strength_check(self):
+        """Hand the current password to a worker thread."""
+        self._strength_after = None
+
+        # An evaluation for older input is no longer needed
+        if self._strength_task is not None:
+            self._strength_task.cancel()
+            self._strength_task = None
+
+        password = self.password_entry.get().strip()
+        if not password:
+            self._show_strength(None)
+            return
+
+        self._strength_task = self.scheduler.submit(
+            self.validator.validate, password,
+            priority=PRIORITY_BACKGROUND, callback=self._strength_done,
+        )
+
+    def _strength_done(self, task):
+        """Show the worker's result; stale results are dropped by cancel()."""
+        self._strength_task = None
+        if task.exception() is not None:
+            self._show_strength(None)
+            return
+        result = task.result()
+        self._show_strength(result[0] if isinstance(result, tuple) else result)
+
+    def _show_strength(self, validation_result):
+        """Update the strength label and meter."""
+        if validation_result is None:
+            self.strength_label.config(text="Strength: -", foreground="black")
+            self.strength_meter["value"] = 0
+            return
+        level, colour = STRENGTH_LEVELS[validation_result]
+        self.strength_label.config(text=f"Strength: {validation_result}", foreground=colour)
+        self.strength_meter["value"] = level
 
     def copy_password(self):
         """Copy the generated password to the clipboard."""
@@ -193,19 +275,41 @@ class PasswordManagerGUI:
         else:
             self.status_label.config(text="No password to copy!", foreground="red")
 
+    def set_busy(self, busy):
+        """Show a busy cursor and hold the store button while tasks run."""
+        self.root.config(cursor="watch" if busy else "")
+        self.store_button.state(["disabled"] if busy else ["!disabled"])
+
     def store_password(self):
-        """Store the entered username and password securely."""
+        """Store the entered password for the site securely."""
+        site = self.site_entry.get().strip()
         username = self.username_entry.get().strip()
         password = self.password_entry.get().strip()
         
+        if not site:
+            messagebox.showerror("Input Error", "Site cannot be empty.")
+            return
         if not username:
             messagebox.showerror("Input Error", "Username cannot be empty.")
             return
         if not password:
             messagebox.showerror("Input Error", "Password cannot be empty.")
             return
-        
-        result = self.validator.validate(password)
+
+        # Validated on a worker; the dialogs and store follow in _validated
+        self.scheduler.submit(
+            self.validator.validate, password,
+            priority=PRIORITY_USER,
+            callback=lambda task: self._validated(task, username, site, password),
+        )
+
+    def _validated(self, task, username, site, password):
+        """Show the suggestions, then store the password if it is acceptable."""
+        try:
+            result = task.result()
+        except Exception as e:
+            self.status_label.config(text=f"Unable to validate password: {e}", foreground="red")
+            return
         if isinstance(result, tuple):
             validation_result, suggestions = result
         else:
@@ -221,30 +325,43 @@ class PasswordManagerGUI:
         self.suggestions_text.configure(state='disabled')
 
         if validation_result == "strong":
-            result = self.manager.store_password(username, password)
-            self.status_label.config(text=result, foreground="green")
+            self._store(username, site, password, "green")
         elif validation_result == "weak":
             weak_msg = "Weak password. Would you like to proceed anyway?"
             if messagebox.askyesno("Weak Password", weak_msg):
-                result = self.manager.store_password(username, password)
-                self.status_label.config(text=result, foreground="orange")
+                self._store(username, site, password, "orange")
             else:
                 self.status_label.config(text="Weak password rejected.", foreground="red")
         else:
             self.status_label.config(text="Invalid password.", foreground="red")
 
+    def _store(self, username, site, password, colour):
+        """Write the password on a worker and report the outcome."""
+        def done(task):
+            try:
+                result = task.result()
+            except Exception as e:
+                self.status_label.config(text=f"Unable to store password: {e}", foreground="red")
+                return
+            self.status_label.config(text=result or "Password stored.", foreground=colour)
+
+        self.scheduler.submit(self.manager.store_password, username, site, password,
+                              priority=PRIORITY_USER, callback=done)
+
     def show_about(self):
         """Display information about the application."""
         messagebox.showinfo("About", "Professional Password Manager v1.0\nSecurely store and manage your passwords.")
 
     def show_help(self):
         """Display help information."""
-        messagebox.showinfo("Help", "1. Enter your username and password.\n"
+        messagebox.showinfo("Help", "1. Enter the site, your username and password.\n"
                                     "2. Use 'Generate Password' for a secure password.\n"
                                     "3. Click 'Store Password' to save it.")
 
 
 def main():
+    # Read the passphrase wordlist while the window is being built
+    preload_wordlist()
     root = tk.Tk()
     app = PasswordManagerGUI(root)
     root.mainloop()
@@ -1,8 +1,24 @@
 # This file is used to export the classes from the managers package
-from .password_manager import PasswordManager
-from .validation_manager import PasswordValidator
-from .password_generator import PasswordGeneration
-from .passphrase_generator import PassphraseGenerator
+# Submodules are only imported when one of their classes is first used, so
+# importing a single manager does not pull in every other one (and their
+# zxcvbn, NumPy and Crypto dependencies).
+import importlib
+
+_EXPORTS = {
+    'PasswordManager': '.password_manager',
+    'PasswordValidator': '.validation_manager',
+    'PasswordGeneration': '.password_generator',
+    'PassphraseGenerator': '.passphrase_generator',
+}
+
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 # Export the classes
 __all__ = [
@@ -10,4 +26,4 @@ __all__ = [
     'PasswordValidator',
     'PasswordGeneration',
     'PassphraseGenerator'
-]
\ No newline at end of file
+]
@@ -0,0 +1,133 @@
+# Calibrates Argon2 parameters for this machine and persists the result
+#
+# calibrate() benchmarks the host and picks the largest parameters that keep a
+# hash (and so a verification) within a latency budget. The chosen parameters
+# are saved as JSON in the data directory and used by every LoginManager;
+# hashes made with older parameters are replaced on the next successful login.
+
+import json
+import os
+import tempfile
+import threading
+import time
+from argon2 import PasswordHasher
+from managers.storage_backends import get_data_dir
+
+PARAMETERS_FILE = "argon2.json"
+
+DEFAULT_TARGET_MS = 250
+DEFAULT_MAX_MEMORY_KIB = 256 * 1024  # upper bound tried for memory_cost
+MIN_MEMORY_KIB = 19 * 1024  # never go below the OWASP minimum for Argon2id
+MAX_PARALLELISM = 4
+SAMPLES = 3  # runs per measurement; the fastest one is used
+
+
+def parameters_path(data_dir=None):
+    """Returns where the calibrated parameters are stored."""
+    return os.path.join(get_data_dir(data_dir), PARAMETERS_FILE)
+
+
+def _measure_ms(time_cost, memory_cost, parallelism):
+    """Returns the fastest of SAMPLES hashes with the given parameters, in milliseconds."""
+    hasher = PasswordHasher(time_cost=time_cost, memory_cost=memory_cost, parallelism=parallelism)
+    best = None
+    for _ in range(SAMPLES):
+        start = time.perf_counter()
+        hasher.hash("calibration")
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def calibrate(target_ms=DEFAULT_TARGET_MS, max_memory_kib=DEFAULT_MAX_MEMORY_KIB, parallelism=None):
+    """
+    Finds Argon2 parameters that hash in about target_ms on this machine.
+
+    Parallelism follows the CPU count. Memory is the most valuable cost
+    against GPU attacks, so it starts at max_memory_kib and is halved until a
+    single pass fits the budget. time_cost then takes up the remaining time,
+    stepping back if the measured time overshoots.
+
+    Args:
+    target_ms (float): Latency budget for one verification.
+    max_memory_kib (int): Largest memory_cost to consider, in KiB.
+    parallelism (int): Lanes to use. Defaults to the CPU count, up to MAX_PARALLELISM.
+
+    Returns:
+    dict: time_cost, memory_cost, parallelism, target_ms and measured_ms.
+    """
+    if target_ms <= 0:
+        raise ValueError("The target time must be positive.")
+    parallelism = parallelism or min(os.cpu_count() or 1, MAX_PARALLELISM)
+
+    memory_cost = max(max_memory_kib, MIN_MEMORY_KIB)
+    single_pass = _measure_ms(1, memory_cost, parallelism)
+    while single_pass > target_ms and memory_cost // 2 >= MIN_MEMORY_KIB:
+        memory_cost //= 2
+        single_pass = _measure_ms(1, memory_cost, parallelism)
+
+    # Hash time grows about linearly with time_cost
+    time_cost = max(1, int(target_ms // single_pass))
+    measured = _measure_ms(time_cost, memory_cost, parallelism) if time_cost > 1 else single_pass
+    while time_cost > 1 and measured > target_ms:
+        time_cost -= 1
+        measured = _measure_ms(time_cost, memory_cost, parallelism)
+
+    return {
+        "time_cost": time_cost,
+        "memory_cost": memory_cost,
+        "parallelism": parallelism,
+        "target_ms": target_ms,
+        "measured_ms": round(measured, 1),
+    }
+
+
+def save_parameters(parameters, data_dir=None):
+    """Writes calibrated parameters atomically and makes them the active ones."""
+    path = parameters_path(data_dir)
+    directory = os.path.dirname(path)
+    try:
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, 'w') as file:
+                json.dump(parameters, file, indent=2)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+    except OSError as e:
+        raise IOError(f"Unable to save Argon2 parameters to {path}: {e}") from e
+    with _hashers_lock:
+        _hashers.pop(path, None)
+
+
+def load_parameters(data_dir=None):
+    """Returns the saved parameters, or None if calibration has not been run."""
+    try:
+        with open(parameters_path(data_dir)) as file:
+            parameters = json.load(file)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        raise IOError(f"Unable to read Argon2 parameters: {e}") from e
+    return {key: parameters[key] for key in ("time_cost", "memory_cost", "parallelism")}
+
+
+# PasswordHasher per parameters file, so the file is read once per process
+_hashers = {}
+_hashers_lock = threading.Lock()
+
+
+def get_password_hasher(data_dir=None):
+    """
+    Returns a PasswordHasher using the calibrated parameters, or the
+    argon2-cffi defaults when none have been saved.
+    """
+    path = parameters_path(data_dir)
+    with _hashers_lock:
+        hasher = _hashers.get(path)
+        if hasher is None:
+            parameters = load_parameters(data_dir)
+            hasher = _hashers[path] = PasswordHasher(**parameters) if parameters else PasswordHasher()
+        return hasher
@@ -0,0 +1,195 @@
+# Password policy shared by the generators and the validator
+#
+# A policy is compiled once: the character layout for generated passwords,
+# the counts passphrases must reach and the requirements dict used by
+# PasswordValidator are all worked out up front. Identical rules share one
+# compiled object, and per-site policies are registered once and looked up
+# by site name. Site policies can also be listed in policies.json in the data
+# directory, e.g. {"example.com": {"min_length": 20, "length": 24}}; the file
+# is read the first time a site's policy is looked up.
+
+import json
+import os
+import string
+import threading
+from functools import lru_cache
+from managers.storage_backends import get_data_dir
+
+POLICIES_FILE = "policies.json"
+
+# Rules used when nothing else is given. min_length and the class counts are
+# the strong requirements checked by PasswordValidator; length is the length
+# of generated passwords and the minimum length of generated passphrases.
+DEFAULT_RULES = {
+    'min_length': 13,
+    'length': 15,
+    'upper': 2,
+    'lower': 2,
+    'number': 2,
+    'special': 2,
+    'specials': string.punctuation,
+    'num_words': 4,
+    'word_length': 4,
+    'separator': '-',
+}
+
+COUNT_KEYS = ('upper', 'lower', 'number', 'special')
+
+
+class GenerationPolicy:
+    """
+    A compiled set of password rules.
+
+    Generators build their output to satisfy the policy directly, so nothing
+    they return needs to be validated and regenerated. Build policies with
+    compile_policy, which reuses the compiled object for identical rules.
+    """
+
+    def __init__(self, **rules):
+        """
+        Args:
+        rules: Any of the keys in DEFAULT_RULES; the rest keep their defaults.
+
+        Raises:
+        ValueError: If a rule is unknown or the rules cannot all be met.
+        """
+        unknown = set(rules) - set(DEFAULT_RULES)
+        if unknown:
+            raise ValueError(f"Unknown policy rules: {', '.join(sorted(unknown))}")
+        self.rules = {**DEFAULT_RULES, **rules}
+        for key, value in self.rules.items():
+            setattr(self, key, value)
+
+        if any(self.rules[key] < 0 for key in COUNT_KEYS):
+            raise ValueError("Character counts cannot be negative.")
+        if self.length < self.min_length:
+            raise ValueError("Generated length cannot be shorter than the minimum length.")
+        if sum(self.rules[key] for key in COUNT_KEYS) > self.length:
+            raise ValueError("Required characters do not fit in the generated length.")
+        if not self.specials or not self.specials.isascii() or any(c.isalnum() for c in self.specials):
+            raise ValueError("Specials must be ASCII punctuation or symbols.")
+        if self.num_words < 1:
+            raise ValueError("A passphrase needs at least one word.")
+
+        # Strong requirements in the form PasswordValidator checks them
+        self.requirements = {
+            'length': self.min_length,
+            'upper': self.upper,
+            'lower': self.lower,
+            'number': self.number,
+            'special': self.special,
+        }
+
+        # Character class, characters per password for PasswordGeneration;
+        # the remaining length is filled from every allowed character
+        self.alphabet = string.ascii_uppercase + string.ascii_lowercase + string.digits + self.specials
+        fill = self.length - sum(self.rules[key] for key in COUNT_KEYS)
+        self.layout = (
+            (string.ascii_uppercase, self.upper),
+            (string.ascii_lowercase, self.lower),
+            (string.digits, self.number),
+            (self.specials, self.special),
+            (self.alphabet, fill),
+        )
+
+        # Special characters each passphrase separator contributes
+        self.separator_specials = sum(not c.isalnum() for c in self.separator)
+
+    def __repr__(self):
+        changed = ", ".join(f"{key}={value!r}" for key, value in self.rules.items() if DEFAULT_RULES[key] != value)
+        return f"GenerationPolicy({changed})"
+
+    def replace(self, **changes):
+        """Returns the compiled policy with some rules changed."""
+        return compile_policy(**{**self.rules, **changes})
+
+
+@lru_cache(maxsize=128)
+def _compile(items):
+    return GenerationPolicy(**dict(items))
+
+
+def compile_policy(**rules):
+    """
+    Returns the compiled policy for the given rules, compiling it only once.
+
+    Raises:
+    ValueError: If a rule is unknown or the rules cannot all be met.
+    """
+    unknown = set(rules) - set(DEFAULT_RULES)
+    if unknown:
+        raise ValueError(f"Unknown policy rules: {', '.join(sorted(unknown))}")
+    return _compile(tuple((key, rules.get(key, default)) for key, default in DEFAULT_RULES.items()))
+
+
+DEFAULT_POLICY = compile_policy()
+
+# Site name -> compiled policy, for sites with their own password rules
+_site_policies = {}
+_site_policies_lock = threading.Lock()
+_site_policies_loaded = False
+
+
+def _site_key(site):
+    return site.strip().lower()
+
+
+def set_site_policy(site, **rules):
+    """
+    Compiles and registers the policy for one site.
+
+    Returns:
+    GenerationPolicy: The compiled policy.
+    """
+    policy = compile_policy(**rules)
+    with _site_policies_lock:
+        _site_policies[_site_key(site)] = policy
+    return policy
+
+
+def remove_site_policy(site):
+    """Drops a site's own policy so it falls back to the default."""
+    with _site_policies_lock:
+        _site_policies.pop(_site_key(site), None)
+
+
+def load_site_policies(data_dir=None):
+    """
+    Registers every site policy listed in policies.json. A missing file is
+    not an error. Policies registered with set_site_policy are kept unless
+    the file lists the same site.
+
+    Raises:
+    IOError: If the file cannot be read or is not valid JSON.
+    ValueError: If a listed policy is invalid.
+    """
+    global _site_policies_loaded
+    path = os.path.join(get_data_dir(data_dir), POLICIES_FILE)
+    try:
+        with open(path, encoding='utf-8') as file:
+            listed = json.load(file)
+    except FileNotFoundError:
+        listed = {}
+    except (OSError, ValueError) as e:
+        raise IOError(f"Unable to read site policies from {path}: {e}") from e
+    if not isinstance(listed, dict):
+        raise ValueError(f"{path} must map site names to rules.")
+
+    policies = {_site_key(site): compile_policy(**rules) for site, rules in listed.items()}
+    with _site_policies_lock:
+        _site_policies.update(policies)
+        _site_policies_loaded = True
+
+
+def policy_for(site=None):
+    """Returns the policy registered for site, or the default policy."""
+    if not site:
+        return DEFAULT_POLICY
+    if not _site_policies_loaded:
+        load_site_policies()
+    return _site_policies.get(_site_key(site), DEFAULT_POLICY)
+
+
+def has_site_policy(site):
+    """Returns True if site has its own policy rather than the default."""
+    return policy_for(site) is not DEFAULT_POLICY
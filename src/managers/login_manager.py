@@ -1,28 +1,60 @@
 # A registration and login manager for the application
 
-from argon2 import PasswordHasher
+import datetime
+import hmac
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from argon2.exceptions import VerifyMismatchError
-import keyring
+from managers.argon2_tuning import get_password_hasher
 from managers.validation_manager import PasswordValidator
+from managers.storage_backends import StorageError, get_backend
+from managers import vault_crypto, vault_keys
 import pyotp
 
-APP_NAME = "pass_man"
+# Argon2 runs on a small shared thread pool (argon2-cffi releases the GIL while
+# hashing). Each hash holds its own memory_cost of RAM, so both the number of
+# workers and the number of queued requests are bounded.
+HASH_WORKERS = min(4, os.cpu_count() or 1)
+MAX_PENDING = HASH_WORKERS * 4
+
+_hash_executor = None
+_hash_executor_lock = threading.Lock()
+_hash_slots = threading.BoundedSemaphore(MAX_PENDING)
+
+OTP_NAME = "totp"  # backend entry holding the user's TOTP secret, sealed with the vault key
+OTP_ISSUER = "PassMan"  # shown by authenticator apps
+OTP_WINDOW = 1  # time steps accepted either side of now, for clock drift
+USED_OTP_LIMIT = 4096  # accepted codes remembered to reject replays
+
+# (username, time step) of every recently accepted code, oldest first
+_used_otps = OrderedDict()
+_used_otps_lock = threading.Lock()
+
+
+def _get_hash_executor():
+    """Returns the shared Argon2 worker pool, starting it on first use."""
+    global _hash_executor
+    with _hash_executor_lock:
+        if _hash_executor is None:
+            _hash_executor = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix="argon2")
+        return _hash_executor
 
 class PasswordManagerError(Exception):
     ## Blanket exception for PasswordManager
     ''' Helps mitigate module errors that dont accept specific exceptions '''
     pass
 
-APP_NAME = "pass_man"
-
 class LoginManager:
     """
     Handles user registration and login with secure password hashing and storage.
     """
-    def __init__(self):
-        self.ph = PasswordHasher()
+    def __init__(self, backend=None, otp_window=OTP_WINDOW):
+        self.backend = backend or get_backend()
+        self.ph = get_password_hasher()
         self.validator = PasswordValidator()
-        self.otp = pyotp.TOTP(pyotp.random_base32())
+        self.otp_window = otp_window
 
     def _hash_master_password(self, password):
         """
@@ -32,9 +64,12 @@ class LoginManager:
 
     def _store_master_password(self, username, password):
         """
-        Store the hashed password securely using Keyring.
+        Store the hashed password securely in the storage backend.
         """
-        keyring.set_password(APP_NAME, username, password)
+        try:
+            self.backend.set(username, "", password.encode())
+        except StorageError as e:
+            raise PasswordManagerError(f"Storage error while storing password: {e}") from e
 
     def _get_master_password(self, username):
         """
@@ -42,13 +77,23 @@ class LoginManager:
         Raise ValueError if the username doesn't exist.
         """
         try:
-            password = keyring.get_password(APP_NAME, username)
+            password = self.backend.get(username)
             if password is None:
                 raise PasswordManagerError(f"No password associated with username '{username}'.")
-            return password
-        except keyring.errors.KeyringError as e:
-            # Handle specific Keyring errors
-            raise PasswordManagerError(f"Keyring error while retrieving password: {e}") from e
+            return password.decode()
+        except StorageError as e:
+            # Handle storage backend errors
+            raise PasswordManagerError(f"Storage error while retrieving password: {e}") from e
+
+    def _username_exists(self, username):
+        """
+        Check whether the username already has a master password. register
+        writes it last, so a registration that failed partway leaves none.
+        """
+        try:
+            return self.backend.get(username) is not None
+        except StorageError as e:
+            raise PasswordManagerError(f"Storage error while checking username: {e}") from e
 
     def _validate_master_password(self, password, hashed_password):
         """
@@ -77,37 +122,121 @@ class LoginManager:
 
     def register(self, username, password):
         """
-        Register a new user by storing the hashed password.
-        Raise ValueError if the username already exists.
+        Register a new user by storing the hashed password and a TOTP secret.
+        Raise PasswordManagerError if the username already exists, before
+        anything is written: re-registering would replace the master hash
+        and lock the existing vault away for good.
+        The master hash is written last, so if any step fails there is no
+        account and the username can be registered again.
+        The new user's vault is left unlocked.
+        Return the TOTP secret for enrollment.
         """
+        if self._username_exists(username):
+            raise PasswordManagerError(f"Username '{username}' is already registered.")
         self._validate_password(password)
         hashed_password = self._hash_master_password(password)
-        keyring.set_password(APP_NAME, username, hashed_password)
 
-        # Generate and store a consistent userpin
-        userpin = self.generate_userpin(username)
-        keyring.set_password(APP_NAME, f"{username}_userpin", userpin)
+        # Create the vault key parameters and unlock the new vault
+        vault_keys.unlock(username, password, self.backend)
+        try:
+            # The secret is sealed with the vault key unlocked above
+            secret = self.create_otp_secret(username)
+
+            # Generate and store a consistent userpin
+            userpin = self.generate_userpin(username)
+            try:
+                self.backend.set(username, "userpin", userpin.encode())
+            except StorageError as e:
+                raise PasswordManagerError(f"Storage error while storing userpin: {e}") from e
 
-        return True
+            self._store_master_password(username, hashed_password)
+        except BaseException:
+            vault_keys.lock(username)
+            raise
+
+        return secret
 
     def login(self, username, password):
         """
         Log in by validating the password for the username.
         Return True if valid, otherwise False.
+        A stored hash using outdated Argon2 parameters is replaced on success,
+        and the user's vault key is derived and kept for the session.
         """
         hashed_password = self._get_master_password(username)
-        return self._validate_master_password(password, hashed_password)
+        valid = self._validate_master_password(password, hashed_password)
+
+        if valid:
+            # Upgrade hashes made with older parameters while the password is at hand
+            if self.ph.check_needs_rehash(hashed_password):
+                self._store_master_password(username, self._hash_master_password(password))
+
+            # Derive the vault key once for the whole session
+            vault_keys.unlock(username, password, self.backend)
+        return valid
+
+    def _submit(self, func, args, callback, dispatch, block):
+        """
+        Runs func on the Argon2 worker pool and returns its Future.
+
+        A slot is taken for every request until it finishes. With block=False
+        a full queue raises PasswordManagerError instead of waiting, so an
+        event loop is never stalled by backpressure.
+        """
+        if not _hash_slots.acquire(blocking=block):
+            raise PasswordManagerError("Too many requests in progress, please try again.")
+        try:
+            future = _get_hash_executor().submit(func, *args)
+        except BaseException:
+            _hash_slots.release()
+            raise
+        future.add_done_callback(lambda _: _hash_slots.release())
+
+        if callback is not None:
+            if dispatch is not None:
+                # Hand the callback to the caller's event loop instead of
+                # running it on the worker thread
+                future.add_done_callback(lambda done: dispatch(lambda: callback(done)))
+            else:
+                future.add_done_callback(callback)
+        return future
+
+    def register_async(self, username, password, callback=None, dispatch=None, block=True):
+        """
+        Runs register on the Argon2 worker pool.
+
+        Args:
+        callback (func): Called with the finished Future.
+        dispatch (func): Takes a zero-argument function and runs it on the
+        caller's event loop, e.g. loop.call_soon_threadsafe or
+        PassManApp.dispatch. Without it the callback runs on the worker thread.
+        block (bool): Wait for a free slot when too many requests are pending.
+
+        Returns:
+        concurrent.futures.Future: Resolves to register's result or exception.
+        asyncio callers can await asyncio.wrap_future(future).
+        """
+        return self._submit(self.register, (username, password), callback, dispatch, block)
+
+    def login_async(self, username, password, callback=None, dispatch=None, block=True):
+        """
+        Runs login on the Argon2 worker pool. Arguments as for register_async.
+
+        Returns:
+        concurrent.futures.Future: Resolves to login's result or exception.
+        """
+        return self._submit(self.login, (username, password), callback, dispatch, block)
 
     def generate_userpin(self, username):
         """
         Generate a consistent 4-digit userpin based on the username.
-        If the userpin already exists, retrieve it from Keyring.
+        If the userpin already exists, retrieve it from storage.
         """
         try:
-            existing_userpin = keyring.get_password(APP_NAME, f"{username}_userpin")
+            existing_userpin = self.backend.get(username, "userpin")
             if existing_userpin:
-                return existing_userpin
-        except keyring.errors.KeyringError:
+                return existing_userpin.decode()
+        except StorageError:
             pass
 
         # Generate and return a new userpin if not found
@@ -118,19 +247,100 @@ class LoginManager:
         """
         Retrieve the stored userpin for the username.
         """
-        userpin = keyring.get_password(APP_NAME, f"{username}_userpin")
+        try:
+            userpin = self.backend.get(username, "userpin")
+        except StorageError as e:
+            raise PasswordManagerError(f"Storage error while retrieving userpin: {e}") from e
         if not userpin:
             raise PasswordManagerError(f"No userpin found for username '{username}'.")
-        return userpin
+        return userpin.decode()
 
-    def verify_otp(self, otp):
+    def create_otp_secret(self, username):
         """
-        Use pyotp to verify the OTP entered by the user.
+        Generate and store a new TOTP secret for the username, replacing
+        any previous one. The secret is sealed with the user's vault key,
+        so the vault must be unlocked.
+        Returns the base32 secret for enrollment.
         """
+        secret = pyotp.random_base32()
         try:
-            if not otp:
-                raise PasswordManagerError("Please enter the OTP.")
-            if not self.otp.verify(otp):
-                raise PasswordManagerError("Invalid OTP.")
-        except Exception as e:
-            raise e
+            sealed = vault_crypto.seal(vault_keys.get_session_key(username), secret.encode(), username, OTP_NAME)
+            self.backend.set(username, OTP_NAME, sealed)
+        except vault_keys.VaultLockedError as e:
+            raise PasswordManagerError(str(e)) from e
+        except StorageError as e:
+            raise PasswordManagerError(f"Storage error while storing OTP secret: {e}") from e
+        return secret
+
+    def _get_otp_secret(self, username):
+        """
+        Retrieve and decrypt the stored TOTP secret for the username, or
+        return None if there is none.
+        The vault must be unlocked, i.e. login must have succeeded.
+        Raise PasswordManagerError if a stored secret fails authentication;
+        treating it as missing would let the account enroll a new one.
+        """
+        try:
+            sealed = self.backend.get(username, OTP_NAME)
+            if not sealed:
+                return None
+            return vault_crypto.open_sealed(vault_keys.get_session_key(username), sealed, username, OTP_NAME).decode()
+        except vault_keys.VaultLockedError as e:
+            raise PasswordManagerError(str(e)) from e
+        except vault_crypto.VaultCryptoError as e:
+            raise PasswordManagerError(f"OTP secret for username '{username}' failed authentication.") from e
+        except StorageError as e:
+            raise PasswordManagerError(f"Storage error while retrieving OTP secret: {e}") from e
+
+    def has_otp(self, username):
+        """
+        Return True if the username has a TOTP secret. Accounts registered
+        before secrets were stored have none and must enroll one, with
+        create_otp_secret, after logging in with their password.
+        """
+        return self._get_otp_secret(username) is not None
+
+    def otp_provisioning_uri(self, username, secret):
+        """
+        Return the otpauth:// URI authenticator apps enroll the secret from.
+        """
+        return pyotp.TOTP(secret).provisioning_uri(name=username, issuer_name=OTP_ISSUER)
+
+    def verify_otp(self, username, otp, for_time=None):
+        """
+        Verify a TOTP code against the username's stored secret.
+        Codes for up to otp_window time steps either side of now are
+        accepted, and each code only once. The vault must be unlocked,
+        since the secret is sealed with the vault key.
+        Raise PasswordManagerError if the code is missing, wrong or reused,
+        or the username has no secret yet (see has_otp).
+        """
+        if not otp:
+            raise PasswordManagerError("Please enter the OTP.")
+
+        # The secret is read once, and the code for every step in the window
+        # computed up front
+        secret = self._get_otp_secret(username)
+        if secret is None:
+            raise PasswordManagerError(f"No OTP is set up for username '{username}'.")
+        totp = pyotp.TOTP(secret)
+        step = totp.timecode(for_time or datetime.datetime.now())
+        window = [(counter, totp.generate_otp(counter).encode())
+                  for counter in range(step - self.otp_window, step + self.otp_window + 1)]
+
+        # Every code is compared, so timing does not reveal which one matched
+        entered = str(otp).strip().encode()
+        matched = None
+        for counter, code in window:
+            if hmac.compare_digest(code, entered):
+                matched = counter
+        if matched is None:
+            raise PasswordManagerError("Invalid OTP.")
+
+        used = (username, matched)
+        with _used_otps_lock:
+            if used in _used_otps:
+                raise PasswordManagerError("This OTP has already been used. Please wait for the next one.")
+            _used_otps[used] = None
+            if len(_used_otps) > USED_OTP_LIMIT:
+                _used_otps.popitem(last=False)
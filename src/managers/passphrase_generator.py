@@ -1,18 +1,93 @@
 # A random passphrase generator using xkcdpass module to generate passphrases
 
-import random
+import array
 import string
+import threading
+from collections.abc import Sequence
 import xkcdpass.xkcd_password as xp
+from managers.generation_policy import DEFAULT_POLICY, policy_for
+from managers.random_pool import default_pool
+
+
+class PackedWordlist(Sequence):
+    """
+    Immutable wordlist stored as one bytes buffer plus an array of offsets.
+
+    Far smaller than a list of str objects, and safe to share between
+    threads and generator instances.
+    """
+    __slots__ = ('_data', '_offsets')
+
+    def __init__(self, words):
+        encoded = [word.encode() for word in words]
+        offsets = array.array('I', [0])
+        total = 0
+        for word in encoded:
+            total += len(word)
+            offsets.append(total)
+        self._data = b''.join(encoded)
+        self._offsets = offsets
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("wordlist index out of range")
+        return self._data[self._offsets[index]:self._offsets[index + 1]].decode()
+
+
+# Filtered wordlists keyed by (wordfile, min_length), shared by every generator
+_wordlists = {}
+_wordlists_lock = threading.Lock()
+
+
+def load_wordlist(min_length, wordfile=None):
+    """
+    Returns the filtered wordlist, reading the word file only the first time.
+
+    Args:
+        min_length (int): Minimum length of each word.
+        wordfile (str): Word file to read. Defaults to the xkcdpass default file.
+
+    Returns:
+        PackedWordlist: The cached wordlist.
+    """
+    key = (wordfile, min_length)
+    wordlist = _wordlists.get(key)
+    if wordlist is None:
+        with _wordlists_lock:
+            wordlist = _wordlists.get(key)
+            if wordlist is None:
+                words = xp.generate_wordlist(wordfile=wordfile or xp.locate_wordfile(), min_length=min_length)
+                wordlist = _wordlists[key] = PackedWordlist(words)
+    return wordlist
+
+
+def preload_wordlist(min_length=4, wordfile=None):
+    """
+    Loads a wordlist on a background thread so the first passphrase is fast.
+
+    Returns:
+        threading.Thread: The loading thread (already started).
+    """
+    thread = threading.Thread(target=load_wordlist, args=(min_length, wordfile), daemon=True)
+    thread.start()
+    return thread
 
 
 class PassphraseGenerator:
     """
     Generate secure passphrases with additional entropy.
     """
-    def __init__(self, num_words=4, word_length=4, separator='-', 
-                 min_length=15, min_uppercase=2, min_numbers=2):
+    def __init__(self, num_words=None, word_length=None, separator=None,
+                 min_length=None, min_uppercase=None, min_numbers=None, wordfile=None, policy=None):
         """
-        Initialize the passphrase generator with default or user-defined parameters.
+        Initialize the passphrase generator from a policy, optionally overriding some of its rules.
 
         Args:
             num_words (int): Number of words in the passphrase.
@@ -21,56 +96,114 @@ class PassphraseGenerator:
             min_length (int): Minimum length of the final passphrase.
             min_uppercase (int): Minimum number of uppercase letters.
             min_numbers (int): Minimum number of numeric characters.
+            wordfile (str): Word file to draw from. Defaults to the xkcdpass default file.
+            policy (GenerationPolicy): Rules to follow. Defaults to the shared default policy.
         """
-        self.num_words = num_words
-        self.word_length = word_length
-        self.separator = separator
-        self.min_length = min_length
-        self.min_uppercase = min_uppercase
-        self.min_numbers = min_numbers
+        policy = policy or DEFAULT_POLICY
+        overrides = {
+            rule: value for rule, value in (
+                ('num_words', num_words), ('word_length', word_length), ('separator', separator),
+                ('length', min_length), ('upper', min_uppercase), ('number', min_numbers),
+            ) if value is not None
+        }
+        if 'length' in overrides:
+            overrides['min_length'] = min(policy.min_length, overrides['length'])
+        self.policy = policy.replace(**overrides) if overrides else policy
+        self.wordfile = wordfile
+
+    @classmethod
+    def for_site(cls, site, wordfile=None):
+        """
+        Returns a generator following the site's own policy, or the default one.
+        """
+        return cls(wordfile=wordfile, policy=policy_for(site))
 
     @staticmethod
-    def _insert_random_characters(words, chars, count, transform=None):
+    def _insert_random_characters(buffer, positions, chars, count, pool, transform=None):
         """
         Static utility method to insert random characters into the passphrase.
 
         Args:
-            mypw (str): The initial passphrase.
+            buffer (list): The passphrase characters, modified in place.
+            positions (list): Indices of buffer that may still be replaced. Used
+                indices are removed, so later insertions never overwrite them.
             chars (str): The set of characters to insert (e.g. digits).
             count (int): Number of characters to insert.
+            pool (RandomPool): Source of random values.
             transform (func): Optional function to apply to characters (e.g. str.upper).
 
         Returns:
-            str: Passphrase with the added characters.
+            list: The same buffer, with the added characters.
         """
-        for _ in range(count):
-            word_index = random.randint(0, len(words) - 1)  # Choose a random word
-            word = list(words[word_index])  # Convert word to a list of characters
-            char_index = random.randint(0, len(word) - 1)  # Choose a random character in the word
-            
+        count = min(count, len(positions))
+        replacements = pool.choices(chars, count) if not transform else None
+        for i in range(count):
+            # Pick a remaining position and swap-remove it from the candidates
+            pick = pool.below(len(positions))
+            index = positions[pick]
+            positions[pick] = positions[-1]
+            positions.pop()
+
             if transform:
-                word[char_index] = transform(word[char_index])  # Apply transformation (e.g., uppercase)
+                buffer[index] = transform(buffer[index])  # Apply transformation (e.g., uppercase)
             else:
-                word[char_index] = random.choice(chars)  # Replace with a character from the set
-            
-            words[word_index] = ''.join(word)  # Update the word in the list
-        return words
+                buffer[index] = replacements[i]  # Replace with a character from the set
+        return buffer
+
+    def _build_passphrase(self, wordlist, pool):
+        """
+        Assemble one passphrase from the wordlist using the given random pool.
 
-    def generate_passphrase(self):
+        Words are added until the passphrase is long enough and has enough
+        lowercase letters to take every inserted character while keeping the
+        lowercase count, so the result always meets the policy.
+        """
+        policy = self.policy
+        size = len(wordlist)
+        words = [wordlist[pool.below(size)].lower() for _ in range(policy.num_words)]
+        max_words = policy.num_words + policy.length + sum(policy.requirements.values())
+
+        while True:
+            # One character buffer for the whole passphrase, plus the indices
+            # of the lowercase letters that may be replaced
+            buffer = list(policy.separator.join(words))
+            positions = [i for i, c in enumerate(buffer) if c.islower()]
+
+            # Specials the separators do not already provide go into the words
+            extra_specials = max(0, policy.special - policy.separator_specials * (len(words) - 1))
+            needed = policy.upper + policy.number + extra_specials + policy.lower
+            if len(buffer) >= policy.length and len(positions) >= needed:
+                break
+            if len(words) >= max_words:
+                raise ValueError("The wordlist cannot satisfy the passphrase policy.")
+            words.append(wordlist[pool.below(size)].lower())
+
+        # Add random characters within the words
+        self._insert_random_characters(buffer, positions, string.ascii_uppercase, policy.upper, pool)
+        self._insert_random_characters(buffer, positions, string.digits, policy.number, pool)
+        self._insert_random_characters(buffer, positions, policy.specials, extra_specials, pool)
+
+        return ''.join(buffer)
+
+    def generate_passphrase(self, pool=None):
         """
         Generate a secure passphrase that meets the defined requirements.
         """
-        # Generate the base passphrase
-        wordlist = xp.generate_wordlist(wordfile=xp.locate_wordfile(), min_length=self.word_length)
-        words = xp.generate_xkcdpassword(wordlist, numwords=self.num_words, delimiter=self.separator).split(self.separator)
+        wordlist = load_wordlist(self.policy.word_length, self.wordfile)
+        return self._build_passphrase(wordlist, pool or default_pool)
 
-        # Ensure the passphrase meets minimum length by adding more words if needed
-        while sum(len(word) for word in words) + len(self.separator) * (len(words) - 1) < self.min_length:
-            words.append(random.choice(wordlist))
+    def generate_many(self, n, pool=None):
+        """
+        Generate n passphrases, yielding each one as it is built.
 
-        # Add random characters to the start or end of words
-        words = self._insert_random_characters(words, string.ascii_uppercase, self.min_uppercase)
-        words = self._insert_random_characters(words, string.digits, self.min_numbers)
+        The wordlist is resolved once for the whole run and every random
+        value comes from buffered CSPRNG bytes with rejection sampling.
 
-        # Rejoin the words with the separator
-        return self.separator.join(words)
\ No newline at end of file
+        Args:
+            n (int): Number of passphrases to generate.
+            pool (RandomPool): Source of random bytes. Defaults to the shared pool.
+        """
+        pool = pool or default_pool
+        wordlist = load_wordlist(self.policy.word_length, self.wordfile)
+        for _ in range(n):
+            yield self._build_passphrase(wordlist, pool)
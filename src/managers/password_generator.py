@@ -1,35 +1,56 @@
-import string
-from secrets import SystemRandom, choice
+from managers.generation_policy import DEFAULT_POLICY, policy_for
+from managers.random_pool import default_pool
+
+# Passwords assembled per batch in generate_many
+BATCH_SIZE = 256
+
 class PasswordGeneration:
     """
     Handles automatic password generation with specific requirements.
     """
-    def __init__(self):
-        # Minimum requirements for the password
-        self.length = 15
-        self.uppercase = 2
-        self.numbers = 2
-        self.specials = 2
+    def __init__(self, policy=None):
+        """
+        Args:
+            policy (GenerationPolicy): Rules to follow. Defaults to the shared default policy.
+        """
+        self.policy = policy or DEFAULT_POLICY
+
+    @classmethod
+    def for_site(cls, site):
+        """
+        Returns a generator following the site's own policy, or the default one.
+        """
+        return cls(policy=policy_for(site))
 
-    def generate_secure_password(self):
+    def generate_secure_password(self, pool=None):
         """
         Generate a secure password meeting the defined criteria.
         """
-        # Character sets
-        upperCase = string.ascii_uppercase
-        lowerCase = string.ascii_lowercase
-        numbers = string.digits
-        specials = string.punctuation
-
-        # Build the password with required characters
-        password = [
-            *(choice(upperCase) for _ in range(self.uppercase)),
-            *(choice(numbers) for _ in range(self.numbers)),
-            *(choice(specials) for _ in range(self.specials)),
-            *(choice(upperCase + lowerCase + numbers + specials) 
-              for _ in range(self.length - self.uppercase - self.numbers - self.specials))
-        ]
-
-        # Shuffle and return as a string
-        SystemRandom().shuffle(password)
-        return ''.join(password)
+        return next(self.generate_many(1, pool))
+
+    def generate_many(self, n, pool=None):
+        """
+        Generate n secure passwords, yielding each one as it is built.
+
+        Characters for a whole batch are drawn from buffered CSPRNG bytes
+        with rejection sampling, instead of one secrets.choice per character.
+
+        Args:
+            n (int): Number of passwords to generate.
+            pool (RandomPool): Source of random bytes. Defaults to the shared pool.
+        """
+        pool = pool or default_pool
+        # Character class, characters per password, compiled by the policy
+        layout = self.policy.layout
+
+        remaining = n
+        while remaining > 0:
+            batch = min(remaining, BATCH_SIZE)
+            drawn = [(pool.choices(chars, count * batch), count) for chars, count in layout]
+            for i in range(batch):
+                password = []
+                for chars, count in drawn:
+                    password.extend(chars[i * count:(i + 1) * count])
+                pool.shuffle(password)
+                yield ''.join(password)
+            remaining -= batch
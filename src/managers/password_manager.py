@@ -1,10 +1,14 @@
-import keyring
-from Crypto.Cipher import AES
-from Crypto.Random import get_random_bytes
-from Crypto.Util.Padding import pad, unpad
+import threading
 from managers.validation_manager import PasswordValidator
+from managers import vault_crypto, vault_format, vault_keys
+from managers.vault_cache import VaultSession, DEFAULT_IDLE_TIMEOUT
+from managers.storage_backends import StorageError, get_backend
+from managers.search_index import MAX_RESULTS
+from managers.generation_policy import has_site_policy
 
-APP_NAME = "pass_man"
+INDEX_NAME = "index"
+RECORD_PREFIX = "site:"
+BACKUP_NAME = "backup"  # bound into encrypted backup streams
 
 class PasswordManager:
     """
@@ -12,95 +16,384 @@ class PasswordManager:
 
     This class provides functionalities to:
     - Encrypt and decrypt passwords.
-    - Store passwords securely in a keyring.
+    - Store passwords securely in the configured storage backend.
     - Check for existing usernames.
+
+    Each site is stored as its own encrypted record, so adding, updating or
+    deleting one entry only rewrites that entry. Backends that cannot list
+    their entries (keyring) also get a small encrypted index of site names.
+
+    Records and the index use the binary format in vault_format.
+
+    Entries are sealed with AES-GCM (vault_crypto), with the owner and entry
+    name bound in so records cannot be swapped between sites or vaults.
+    They are encrypted with the user's session key from vault_keys, which
+    is derived from the master password at login and shared by every
+    instance. Using a vault before its owner has logged in raises
+    vault_keys.VaultLockedError.
+
+    Once a vault has been read it is cached for the unlocked session, so
+    repeated reads skip storage and AES entirely until the session is locked
+    or sits idle for longer than idle_timeout.
     """
 
-    def __init__(self):
+    def __init__(self, idle_timeout=DEFAULT_IDLE_TIMEOUT, backend=None):
         """
         Initializes the PasswordManager.
+
+        Parameters:
+        idle_timeout (float): Seconds a cached vault may go unused before it is evicted.
+        backend (StorageBackend): Where records live. Defaults to the configured backend.
         """
-        self._key = get_random_bytes(16)  # AES-128 key size
+        self.backend = backend or get_backend()
+        self.validator = PasswordValidator()
+        self.idle_timeout = idle_timeout
+        self._sessions = {}
+        # Pages share one manager across the scheduler's workers: this guards
+        # _sessions and keeps each check-then-write operation atomic
+        self._lock = threading.RLock()
+
+    def _encrypt(self, username, name, data):
+        """Encrypts the given serialized entry with AES-GCM under the user's session key."""
+        return vault_crypto.seal(vault_keys.get_session_key(username), data, username, name)
+
+    def _decrypt(self, username, name, encrypted_data):
+        """Decrypts and authenticates the given encrypted entry with AES-GCM."""
+        return vault_crypto.open_sealed(vault_keys.get_session_key(username), encrypted_data, username, name)
+
+    @staticmethod
+    def _record_name(site):
+        """Returns the entry name holding a single site record."""
+        return RECORD_PREFIX + site
 
-    def _encrypt(self, password):
-        """Encrypts the given password using AES."""
-        cipher = AES.new(self._key, AES.MODE_CBC)
-        ciphertext = cipher.encrypt(pad(password.encode(), AES.block_size))
-        return cipher.iv + ciphertext
+    def _read_entry(self, username, name):
+        """Reads and decrypts a single entry, or returns None if it is missing."""
+        encrypted_data = self.backend.get(username, name)
+        if not encrypted_data:
+            return None
+        return self._decrypt(username, name, encrypted_data)
 
-    def _decrypt(self, encrypted_data):
-        """Decrypts the given encrypted password using AES."""
-        iv = encrypted_data[:AES.block_size]
-        ciphertext = encrypted_data[AES.block_size:]
-        cipher = AES.new(self._key, AES.MODE_CBC, iv)
-        return unpad(cipher.decrypt(ciphertext), AES.block_size).decode()
+    def _seal_entry(self, username, name, records):
+        """Serializes and encrypts the records of a single entry."""
+        return self._encrypt(username, name, vault_format.encode_records(records))
+
+    def _write_entry(self, username, name, records):
+        """Serializes, encrypts and writes a single entry."""
+        self.backend.set(username, name, self._seal_entry(username, name, records))
+
+    def _write_index(self, username, index):
+        """Writes the list of site names stored for the user, if the backend needs one."""
+        if not self.backend.can_list:
+            self._write_entry(username, INDEX_NAME, ((site,) for site in index))
+
+    def _write_record(self, username, site, site_username, password):
+        """Writes the record for a single site."""
+        self._write_entry(username, self._record_name(site), [(site_username, password)])
+
+    def _load_index(self, username):
+        """Returns the list of site names stored for the user."""
+        if self.backend.can_list:
+            sites = [name[len(RECORD_PREFIX):] for name in self.backend.names(username, RECORD_PREFIX)]
+            return sites
+
+        data = self._read_entry(username, INDEX_NAME)
+        if data is None:
+            return []
+        return [site for (site,) in vault_format.VaultReader(data)]
+
+    def _load_record(self, username, site):
+        """Returns the credentials stored for a single site, or None if missing."""
+        data = self._read_entry(username, self._record_name(site))
+        if data is None:
+            return None
+        site_username, password = vault_format.VaultReader(data).first()
+        return {"username": site_username, "password": password}
+
+    def _session(self, username):
+        """
+        Returns the cached session for the user, evicting it if it has gone
+        idle or the user's vault key has been locked.
+        """
+        with self._lock:
+            session = self._sessions.get(username)
+            if session is not None and (session.expired() or not vault_keys.is_unlocked(username)):
+                self.invalidate(username)
+                return None
+            return session
+
+    def _sites(self, username):
+        """Returns the user's site names, from the session cache when available."""
+        session = self._session(username)
+        if session is not None:
+            return session.sites()
+        return self._load_index(username)
+
+    def invalidate(self, username):
+        """Drops and zeroes the cached vault for the user."""
+        with self._lock:
+            session = self._sessions.pop(username, None)
+            if session is not None:
+                session.wipe()
+
+    def evict_idle(self):
+        """
+        Drops and zeroes every cached vault that has gone idle or whose vault
+        key has been locked. Called on a timer, so an idle vault does not stay
+        in memory until it is next used.
+
+        Returns:
+        list: The usernames whose cached vaults were evicted.
+        """
+        with self._lock:
+            idle = [username for username, session in self._sessions.items()
+                    if session.expired() or not vault_keys.is_unlocked(username)]
+            for username in idle:
+                self.invalidate(username)
+            return idle
+
+    def lock(self, username=None):
+        """
+        Ends the user's unlocked session, zeroing their cached credentials and
+        vault key. Without a username every session is ended.
+        """
+        with self._lock:
+            if username is not None:
+                self.invalidate(username)
+                vault_keys.lock(username)
+                return
+            for username in list(self._sessions):
+                self.invalidate(username)
+            vault_keys.lock_all()
 
     def _username_exists(self, username):
-        """Checks if the username already exists in the keyring."""
+        """Checks if the username already has a vault in storage."""
         try:
-            passwords = keyring.get_password(APP_NAME, username)
-            return passwords is not None
-        except keyring.errors.KeyringError as e:
-            raise IOError(f"Keyring error while checking username: {e}")
+            if self.backend.can_list:
+                return bool(self.backend.names(username, RECORD_PREFIX))
+            return self.backend.get(username, INDEX_NAME) is not None
+        except StorageError as e:
+            raise IOError(f"Storage error while checking username: {e}")
 
     def load_passwords(self, username):
-        """Loads the stored passwords for a user from the keyring."""
+        """Loads the stored passwords for a user from storage."""
         try:
-            encrypted_data = keyring.get_password(APP_NAME, username)
-            if not encrypted_data:
-                return {}
-            passwords = self._decrypt(bytes.fromhex(encrypted_data))
-            return eval(passwords)  # Convert string representation back to a dictionary
-        except keyring.errors.KeyringError as e:
-            raise IOError(f"Keyring error while loading passwords: {e}")
+            passwords = {}
+            for site in self._load_index(username):
+                record = self._load_record(username, site)
+                if record is not None:
+                    passwords[site] = record
+            return passwords
+        except StorageError as e:
+            raise IOError(f"Storage error while loading passwords: {e}")
 
     def get_passwords(self, username):
         """Returns the stored passwords for the given username."""
-        return self.load_passwords(username)
+        with self._lock:
+            session = self._session(username)
+            if session is None:
+                session = VaultSession(self.load_passwords(username), self.idle_timeout)
+                self._sessions[username] = session
+            return session.snapshot()
 
-    def store_password(self, username, site, password):
-        """Stores the password securely in the keyring."""
-        try:
-            validity = PasswordValidator.validate(password)
-            if not validity:
-                raise ValueError("Password is too weak.")
+    def _unlocked_session(self, username):
+        """Returns the user's session, loading the vault into it if needed."""
+        with self._lock:
+            session = self._session(username)
+            if session is None:
+                self.get_passwords(username)
+                session = self._sessions[username]
+            return session
 
-            # Load existing passwords or initialize an empty dictionary
-            passwords = self.load_passwords(username)
+    def search(self, username, query, mode="substring", limit=MAX_RESULTS):
+        """
+        Searches the user's site names using the session's in-memory index.
 
-            # Add the new password
-            passwords[site] = password
+        Parameters:
+        username (str): The vault owner.
+        query (str): The text to look for (case-insensitive).
+        mode (str): prefix, substring or fuzzy.
+        limit (int): Maximum number of results, or None for all of them.
 
-            # Encrypt and save the updated passwords
-            encrypted_passwords = self._encrypt(str(passwords)).hex()
-            keyring.set_password(APP_NAME, username, encrypted_passwords)
-        except keyring.errors.KeyringError as e:
-            raise IOError(f"Keyring error while storing password: {e}")
-        except ValueError as e:
-            raise ValueError(f"Error storing the password: {e}")
+        Returns:
+        dict: Matching site name -> credentials, best matches first.
+        """
+        if mode not in ("prefix", "substring", "fuzzy"):
+            raise ValueError(f"Unknown search mode: {mode}")
+        session = self._unlocked_session(username)
+        return session.entries(session.lookup(mode, query, limit))
+
+    def find_by_username(self, username, site_username):
+        """Returns site name -> credentials for every site stored under site_username."""
+        session = self._unlocked_session(username)
+        return session.entries(session.lookup("by_username", site_username))
+
+    def _check_strength(self, password, site=None):
+        """
+        Raises ValueError if the password fails validation, or misses the
+        character rules of a site with its own policy (generation_policy).
+        """
+        result = self.validator.validate(password)
+        validity = result[0] if isinstance(result, tuple) else result
+        if validity == 'invalid':
+            raise ValueError("Password is too weak.")
+        if has_site_policy(site) and not self.validator.for_site(site).meets_policy(password):
+            raise ValueError(f"Password does not meet the password rules for {site}.")
+
+    def store_password(self, username, site, password, site_username=""):
+        """Stores the password securely in storage."""
+        with self._lock:
+            try:
+                self._check_strength(password, site)
+
+                index = self._sites(username)
+
+                # Only the record for this site is encrypted and written
+                self._write_record(username, site, site_username, password)
+
+                # The index only changes when a new site is added
+                if site not in index:
+                    index.append(site)
+                    self._write_index(username, index)
+
+                session = self._session(username)
+                if session is not None:
+                    session.put(site, site_username, password)
+            except StorageError as e:
+                self.invalidate(username)
+                raise IOError(f"Storage error while storing password: {e}")
+            except vault_keys.VaultLockedError:
+                raise
+            except ValueError as e:
+                raise ValueError(f"Error storing the password: {e}")
 
     def delete_password(self, username, site):
         """Deletes the password associated with the given site for a user."""
+        with self._lock:
+            # Listable backends need no key to find or delete a record, so
+            # a locked vault is refused up front
+            vault_keys.get_session_key(username)
+            try:
+                index = self._sites(username)
+                if site in index:
+                    self.backend.delete(username, self._record_name(site))
+                    index.remove(site)
+                    self._write_index(username, index)
+
+                    session = self._session(username)
+                    if session is not None:
+                        session.remove(site)
+                else:
+                    raise ValueError(f"No password found for site: {site}")
+            except StorageError as e:
+                self.invalidate(username)
+                raise IOError(f"Storage error while deleting password: {e}")
+
+    def add_password(self, username, site, site_username, password):
+        """Adds a new password to storage."""
+        with self._lock:
+            try:
+                if site in self._sites(username):
+                    raise ValueError("Site already exists. Use a different site name or update the existing password.")
+
+                self.store_password(username, site, password, site_username)
+            except Exception as e:
+                raise e
+
+    def add_passwords_bulk(self, username, entries, overwrite=False):
+        """
+        Adds many passwords in a single pass.
+
+        Every entry is validated before anything is written, so a bad row
+        leaves the vault untouched. All records are then encrypted together
+        and the site index is rewritten once, instead of once per entry.
+
+        Parameters:
+        username (str): The vault owner.
+        entries (iterable): (site, site_username, password) tuples.
+        overwrite (bool): Replace existing sites instead of rejecting them.
+
+        Returns:
+        int: The number of entries written.
+
+        Raises:
+        ValueError: If any entry is invalid; lists every failing entry.
+        IOError: If storage cannot be written to.
+        """
+        with self._lock:
+            try:
+                index = self._sites(username)
+                existing = set(index)
+                batch = {}
+                errors = []
+                for row, (site, site_username, password) in enumerate(entries, start=1):
+                    if not site or not password:
+                        errors.append(f"entry {row}: site and password are required")
+                    elif site in batch:
+                        errors.append(f"entry {row} ({site}): duplicate site in import")
+                    elif site in existing and not overwrite:
+                        errors.append(f"entry {row} ({site}): site already exists")
+                    else:
+                        try:
+                            self._check_strength(password, site)
+                        except ValueError as e:
+                            errors.append(f"entry {row} ({site}): {e}")
+                        batch[site] = (site_username or "", password)
+                if errors:
+                    raise ValueError(f"{len(errors)} invalid entries: " + "; ".join(errors))
+
+                # Encrypt everything up front, then persist in one pass
+                # (a single transaction on backends that support it)
+                sealed = []
+                for site, credentials in batch.items():
+                    name = self._record_name(site)
+                    sealed.append((name, self._seal_entry(username, name, [credentials])))
+                self.backend.set_many(username, sealed)
+                new_sites = [site for site in batch if site not in existing]
+                if new_sites:
+                    self._write_index(username, index + new_sites)
+
+                session = self._session(username)
+                if session is not None:
+                    for site, (site_username, password) in batch.items():
+                        session.put(site, site_username, password)
+                return len(batch)
+            except StorageError as e:
+                self.invalidate(username)
+                raise IOError(f"Storage error while importing passwords: {e}")
+
+    def export_passwords(self, username):
+        """
+        Yields (site, site_username, password) for every stored entry.
+
+        Records are decrypted one at a time as the caller consumes them,
+        unless the vault is already cached for the session.
+        """
         try:
-            passwords = self.load_passwords(username)
-            if site in passwords:
-                del passwords[site]
-
-                # Encrypt and save the updated passwords
-                encrypted_passwords = self._encrypt(str(passwords)).hex()
-                keyring.set_password(APP_NAME, username, encrypted_passwords)
-            else:
-                raise ValueError(f"No password found for site: {site}")
-        except keyring.errors.KeyringError as e:
-            raise IOError(f"Keyring error while deleting password: {e}")
-
-    def add_password(self, username, site, password):
-        """Adds a new password to the keyring."""
-        try:
-            passwords = self.load_passwords(username)
-            if site in passwords:
-                raise ValueError("Site already exists. Use a different site name or update the existing password.")
+            session = self._session(username)
+            if session is not None:
+                for site, credentials in session.snapshot().items():
+                    yield site, credentials["username"], credentials["password"]
+                return
+
+            for site in self._load_index(username):
+                record = self._load_record(username, site)
+                if record is not None:
+                    yield site, record["username"], record["password"]
+        except StorageError as e:
+            raise IOError(f"Storage error while exporting passwords: {e}")
 
-            self.store_password(username, site, password)
-        except Exception as e:
-            raise e
+    def open_backup_writer(self, username, dest):
+        """
+        Returns a binary file that encrypts everything written to it into
+        dest with the user's session key, one 64 KiB segment at a time.
+        Closing it writes the final segment; call its abort() first if the
+        backup failed, so a partial backup never decrypts as complete.
+        """
+        return vault_crypto.EncryptingWriter(vault_keys.get_session_key(username), dest, username, BACKUP_NAME)
+
+    def open_backup_reader(self, username, source):
+        """
+        Returns a binary file that decrypts a backup written by
+        open_backup_writer, authenticating each segment before it is read.
+        """
+        return vault_crypto.DecryptingReader(vault_keys.get_session_key(username), source, username, BACKUP_NAME)
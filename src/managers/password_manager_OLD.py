@@ -1,12 +1,34 @@
 import os
 import hashlib
+from operator import itemgetter
+import json
+import mmap
 import random
 import string
+import tempfile
+import threading
+from contextlib import contextmanager
 import portalocker
 
 DEFAULT_FILENAME = 'passwords.txt'
 SALT_LENGTH = 8
 
+# The password file is an append-only log of "site:username:salt:hash" lines.
+# A line with TOMBSTONE_SALT as its salt deletes the user's earlier record.
+# The index file maps each username to the offset of its live record, and
+# records how much of the log it covers; anything appended since is replayed.
+INDEX_SUFFIX = '.idx'
+LOCK_SUFFIX = '.lock'
+INDEX_VERSION = 1
+TOMBSTONE_SALT = '-'
+CHECKPOINT_BYTES = 1 << 20  # log growth before the index file is rewritten
+COMPACT_MIN_DEAD = 1024  # dead lines before compaction is considered
+
+# Columns of a record line, and the names get_passwords uses for them
+RECORD_FIELDS = ('site', 'username', 'salt', 'hash')
+PASSWORD_FIELDS = {'website': 'site', 'username': 'username', 'salt': 'salt', 'password': 'hash'}
+SCAN_WINDOW = 1 << 20  # bytes of the mapped log decoded at a time
+
 class PasswordManager:
     """
     Handles secure storage and management of passwords.
@@ -17,6 +39,14 @@ class PasswordManager:
     - Hash passwords using SHA-256 with a salt.
     - Store passwords securely in a file.
     - Check for existing usernames.
+
+    Records are only ever appended, and deletes append a tombstone. Lookups
+    go through an in-memory index (username -> offset) that is checkpointed
+    to disk, so they read a single line instead of scanning the file. Once
+    dead lines outnumber live ones the log is compacted. Every operation
+    holds a portalocker lock on a separate lock file: shared for reads and
+    exclusive for writes and compaction, so several processes can share
+    the file.
     """
     
     def __init__(self, filename=DEFAULT_FILENAME):
@@ -27,17 +57,202 @@ class PasswordManager:
         filename (str): The name of the file used to store passwords.
         """
         self.filename = filename
+        self.index_filename = filename + INDEX_SUFFIX
+        self.lock_filename = filename + LOCK_SUFFIX
+        self._offsets = {}  # username -> offset of its live record
+        self._log_id = None  # (device, inode) of the log the index describes
+        self._indexed_size = 0  # bytes of the log applied to the index
+        self._checkpoint_size = 0  # log size covered by the index file
+        self._dead = 0  # superseded records and tombstones in the log
+        self._mutex = threading.RLock()
+        self._scans = threading.local()  # iter_records scans open in each thread
         self._ensure_file_exists()
 
     def _ensure_file_exists(self):
         """Ensures the password storage file exists. Creates it if not present."""
         if not os.path.exists(self.filename):
             try:
-                with open(self.filename, 'w') as file:
+                with open(self.filename, 'a') as file:
                     file.write('')  # Create an empty file
             except IOError as e:
                 raise IOError(f"Unable to create the file {self.filename}: {e}")
 
+    @contextmanager
+    def _file_lock(self, exclusive=False):
+        """Holds the portalocker lock on the lock file."""
+        try:
+            lock_file = open(self.lock_filename, 'a')
+        except IOError as e:
+            raise IOError(f"Unable to open the lock file {self.lock_filename}: {e}")
+        with lock_file:
+            portalocker.lock(lock_file, portalocker.LOCK_EX if exclusive else portalocker.LOCK_SH)
+            try:
+                yield
+            finally:
+                portalocker.unlock(lock_file)
+
+    @contextmanager
+    def _locked(self, exclusive=False):
+        """Holds the file lock and brings the index up to date with the log."""
+        if exclusive and getattr(self._scans, 'count', 0):
+            # The scan's shared lock would make this wait for itself
+            raise IOError("Cannot change the password file while iterating over it in the same thread.")
+        with self._mutex, self._file_lock(exclusive):
+            self._refresh()
+            yield
+
+    def _refresh(self):
+        """Catches the index up with records other writers have appended or compacted."""
+        try:
+            stat = os.stat(self.filename)
+        except IOError as e:
+            raise IOError(f"An error occurred while reading the file {self.filename}: {e}")
+        log_id = (stat.st_dev, stat.st_ino)
+        if log_id != self._log_id or stat.st_size < self._indexed_size:
+            self._load_index(log_id, stat.st_size)
+        if stat.st_size > self._indexed_size:
+            self._replay(stat.st_size)
+
+    def _load_index(self, log_id, log_size):
+        """Loads the index file if it describes this log; otherwise starts from an empty index."""
+        self._offsets, self._indexed_size, self._dead = {}, 0, 0
+        self._log_id = log_id
+        try:
+            with open(self.index_filename, 'r') as file:
+                data = json.load(file)
+            if (data.get('version') == INDEX_VERSION and tuple(data['log_id']) == log_id
+                    and data['log_size'] <= log_size):
+                self._offsets, self._indexed_size, self._dead = data['offsets'], data['log_size'], data['dead']
+        except (IOError, ValueError, KeyError, TypeError):
+            pass  # Missing or stale: the whole log is replayed instead
+        self._checkpoint_size = self._indexed_size
+
+    def _replay(self, log_size):
+        """Applies the log from the indexed size onwards to the index."""
+        try:
+            with open(self.filename, 'rb') as file:
+                file.seek(self._indexed_size)
+                offset = self._indexed_size
+                for line in file:
+                    if not line.endswith(b'\n') or offset + len(line) > log_size:
+                        break  # A write still in progress (or torn by a crash)
+                    self._apply(line, offset)
+                    offset += len(line)
+        except IOError as e:
+            raise IOError(f"An error occurred while reading the file {self.filename}: {e}")
+        self._indexed_size = offset
+
+    def _apply(self, line, offset):
+        """Updates the index with one log line."""
+        fields = line.decode().rstrip('\n').split(':')
+        if len(fields) != 4:
+            self._dead += 1
+            return
+        _, username, salt, _ = fields
+        if username in self._offsets:
+            # The earlier record is superseded or deleted
+            self._dead += 1
+            del self._offsets[username]
+        if salt == TOMBSTONE_SALT:
+            self._dead += 1
+        else:
+            self._offsets[username] = offset
+
+    def _read_record(self, offset):
+        """Returns (site, username, salt, hashed_password) for the record at offset."""
+        try:
+            with open(self.filename, 'rb') as file:
+                file.seek(offset)
+                line = file.readline()
+        except IOError as e:
+            raise IOError(f"An error occurred while reading the file {self.filename}: {e}")
+        return tuple(line.decode().rstrip('\n').split(':'))
+
+    def _append(self, line):
+        """Appends one line to the log and applies it. Call with the exclusive lock held."""
+        data = line.encode()
+        try:
+            with open(self.filename, 'ab') as file:
+                offset = file.seek(0, os.SEEK_END)
+                if offset != self._indexed_size:
+                    # Drop a line torn by a writer that crashed mid-write
+                    file.truncate(self._indexed_size)
+                    offset = self._indexed_size
+                file.write(data)
+        except IOError as e:
+            raise IOError(f"An error occurred while writing to the file {self.filename}: {e}")
+        self._apply(data, offset)
+        self._indexed_size = offset + len(data)
+        if self._indexed_size - self._checkpoint_size >= CHECKPOINT_BYTES:
+            self._write_index()
+
+    def _write_index(self):
+        """Writes the index file atomically. Call with the exclusive lock held."""
+        data = {
+            'version': INDEX_VERSION,
+            'log_id': list(self._log_id),
+            'log_size': self._indexed_size,
+            'dead': self._dead,
+            'offsets': self._offsets,
+        }
+        directory = os.path.dirname(os.path.abspath(self.index_filename))
+        try:
+            fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+            try:
+                with os.fdopen(fd, 'w') as file:
+                    json.dump(data, file, separators=(',', ':'))
+                os.replace(temp_path, self.index_filename)
+            except BaseException:
+                os.unlink(temp_path)
+                raise
+        except IOError as e:
+            raise IOError(f"An error occurred while writing the index {self.index_filename}: {e}")
+        self._checkpoint_size = self._indexed_size
+
+    def _compact(self):
+        """
+        Rewrites the log with only its live records. Call with the exclusive lock held.
+
+        The new log is written beside the old one and renamed over it, so
+        readers in other processes see either the old log or the new one and
+        notice the change of inode on their next operation.
+        """
+        live = set(self._offsets.values())
+        offsets = {}
+        directory = os.path.dirname(os.path.abspath(self.filename))
+        try:
+            fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+            try:
+                with os.fdopen(fd, 'wb') as output, open(self.filename, 'rb') as source:
+                    offset = new_offset = 0
+                    for line in source:
+                        if offset >= self._indexed_size:
+                            break
+                        if offset in live:
+                            offsets[line.split(b':', 2)[1].decode()] = new_offset
+                            output.write(line)
+                            new_offset += len(line)
+                        offset += len(line)
+                    output.flush()
+                    os.fsync(output.fileno())
+                os.replace(temp_path, self.filename)
+            except BaseException:
+                if os.path.exists(temp_path):
+                    os.unlink(temp_path)
+                raise
+            stat = os.stat(self.filename)
+        except IOError as e:
+            raise IOError(f"An error occurred while compacting the file {self.filename}: {e}")
+
+        self._offsets, self._dead, self._indexed_size = offsets, 0, new_offset
+        self._log_id = (stat.st_dev, stat.st_ino)
+        self._write_index()
+
+    def compact(self):
+        """Removes deleted and superseded records from the password file."""
+        with self._locked(exclusive=True):
+            self._compact()
+
     def _generate_salt(self):
         """Generates a random salt of predefined length."""
         return ''.join(random.choices(string.ascii_letters + string.digits, k=SALT_LENGTH))
@@ -56,16 +271,9 @@ class PasswordManager:
         return hashlib.sha256((value + salt).encode()).hexdigest()
     
     def _username_exists(self, username):
-        """Checks if the username already exists in the file."""
-        try:
-            with open(self.filename, 'r') as file:
-                for line in file:
-                    stored_username = line.split(':')[0]
-                    if stored_username == username:
-                        return True
-            return False
-        except IOError as e:
-            raise IOError(f"An error occurred while reading the file {self.filename}: {e}")
+        """Checks if the username already exists in the file (an index lookup)."""
+        with self._locked():
+            return username in self._offsets
 
     def _store_master_password(self, site, username, password):
         """
@@ -80,27 +288,22 @@ class PasswordManager:
         str: A message indicating the password was stored successfully.
         
         Raises:
+        ValueError: If the site or username contains ':' or a newline.
         IOError: If the file cannot be written to.
         """
-        if self._username_exists(username):
-            return 'Username already exists'
-        
+        if any(':' in value or '\n' in value for value in (site, username)):
+            raise ValueError("Site and username cannot contain ':' or newlines.")
+
         salt = self._generate_salt()
         hashed_password = self._hash(password, salt)
-        
-        try:
-            with open(self.filename, 'a') as file:
-                # Lock the file to prevent race conditions
-                portalocker.lock(file, portalocker.LOCK_EX)
-                try:
-                    file.write(f"{site}:{username}:{salt}:{hashed_password}\n")
-                finally:
-                    portalocker.unlock(file)
-            return 'Password stored successfully'
-        except IOError as e:
-            raise IOError(f"An error occurred while writing to the file {self.filename}: {e}")
-
 
+        # Checked and written under one exclusive lock, so two writers
+        # cannot both add the same username
+        with self._locked(exclusive=True):
+            if username in self._offsets:
+                return 'Username already exists'
+            self._append(f"{site}:{username}:{salt}:{hashed_password}\n")
+        return 'Password stored successfully'
 
     def _verify_password(self, username, password):
         """
@@ -116,44 +319,114 @@ class PasswordManager:
         Raises:
         ValueError: If the username does not exist or the password is incorrect.
         """
-        try:
-            with open(self.filename, 'r') as file:
-                for line in file:
-                    _, stored_username, salt, hashed_password = line.strip().split(':')
-                    if stored_username == username:
-                        if self._hash(password, salt) == hashed_password:
-                            return True
-                        else:
-                            return False
+        with self._locked():
+            offset = self._offsets.get(username)
+            if offset is None:
                 raise ValueError('Username not found')
-        except IOError as e:
-            raise IOError(f"An error occurred while reading the file {self.filename}: {e}")
-            
+            _, _, salt, hashed_password = self._read_record(offset)
+        return self._hash(password, salt) == hashed_password
+
+    def iter_records(self, fields=('site', 'username', 'hash')):
+        """
+        Lazily yields the requested fields of every live record, in file order.
+
+        The log is memory-mapped and walked in windows of whole lines. Each
+        window is decoded straight from a memoryview of the mapping and split
+        in C, and only the requested columns are kept, so memory stays
+        bounded by the window rather than the file. Live offsets are only
+        checked when the log holds deleted or superseded lines.
+
+        The shared lock is held until the iterator is exhausted or closed,
+        so compaction cannot replace the file while it is mapped (which
+        fails outright on Windows). Writers wait meanwhile; writing from the
+        thread consuming the iterator raises IOError instead of deadlocking.
+
+        Parameters:
+        fields (tuple): Names from RECORD_FIELDS, in the order to yield them.
+
+        Yields:
+        tuple: One str per requested field.
+
+        Raises:
+        ValueError: If a field name is unknown.
+        IOError: If the file cannot be read.
+        """
+        unknown = [field for field in fields if field not in RECORD_FIELDS]
+        if unknown:
+            raise ValueError(f"Unknown record fields: {', '.join(unknown)}")
+        columns = [RECORD_FIELDS.index(field) for field in fields]
+        pick = itemgetter(*columns) if len(columns) > 1 else (lambda parts: (parts[columns[0]],))
+        # Splits per line: enough to isolate the last requested column
+        splits = min(max(columns, default=0) + 1, len(RECORD_FIELDS) - 1)
+
+        with self._file_lock():
+            with self._mutex:
+                self._refresh()
+                size = self._indexed_size
+                live = set(self._offsets.values()) if self._dead else None
+                empty = not size or not self._offsets
+            if empty:
+                return
+            try:
+                file = open(self.filename, 'rb')
+            except IOError as e:
+                raise IOError(f"An error occurred while reading the file {self.filename}: {e}")
+
+            self._scans.count = getattr(self._scans, 'count', 0) + 1
+            try:
+                yield from self._scan(file, size, live, pick, splits)
+            finally:
+                self._scans.count -= 1
+
+    @staticmethod
+    def _scan(file, size, live, pick, splits):
+        """Yields the picked fields of every live line in the first size bytes of file."""
+        with file, mmap.mmap(file.fileno(), size, access=mmap.ACCESS_READ) as mapped:
+            view = memoryview(mapped)
+            try:
+                start = 0
+                while start < size:
+                    # Cut the window at the last newline inside it
+                    stop = mapped.rfind(b'\n', start, min(size, start + SCAN_WINDOW)) + 1
+                    if stop <= start:
+                        stop = mapped.find(b'\n', start, size) + 1
+                    lines = str(view[start:stop - 1], 'utf-8').split('\n')
+
+                    if live is None:
+                        for line in lines:
+                            yield pick(line.split(':', splits))
+                    else:
+                        # Character and byte offsets only match for ASCII windows
+                        ascii_window = sum(map(len, lines)) + len(lines) == stop - start
+                        offset = start
+                        for line in lines:
+                            if offset in live:
+                                yield pick(line.split(':', splits))
+                            offset += (len(line) if ascii_window else len(line.encode())) + 1
+                    start = stop
+            finally:
+                view.release()
+
     def load_passwords(self):
         """
-        Loads and returns all stored passwords.
+        Lazily loads all stored passwords.
         
         Returns:
-        list: A list of tuples containing the username and hashed password.
+        iterator: Tuples of (site, username, hashed password), read from the
+        memory-mapped file as they are consumed.
 
         Raises:
         IOError: If the file cannot be read.
         """
-        try:
-            with open(self.filename, 'r') as file:
-                passwords = []
-                for line in file:
-                    site, stored_username, _, hashed_password = line.strip().split(':')
-                    passwords.append((site, stored_username, hashed_password))
-                
-        except IOError as e:
-            raise IOError(f"An error occurred while reading the file {self.filename}: {e}")
-        
+        return self.iter_records(('site', 'username', 'hash'))
+
     def remove_password(self,site,username):
         """
-        Removes the stored password for the given username.
+        Removes the stored password for the given username by appending a
+        tombstone. The log is compacted once dead lines outnumber live ones.
         
         Parameters:
+        site (str): The website associated with the password.
         username (str): The username associated with the password.
         
         Returns:
@@ -163,34 +436,34 @@ class PasswordManager:
         ValueError: If the username does not exist.
         IOError: If the file cannot be written to.
         """
-        try:
-            with open(self.filename, 'r') as file:
-                lines = file.readlines()
-            with open(self.filename, 'w') as file:
-                for line in lines:
-                    stored_site, stored_username, _, _ = line.strip().split(':')
-                    if stored_username != username and stored_site != site:
-                        file.write(line)
-                return 'Password removed successfully'
-        except IOError as e:
-            raise IOError(f"An error occurred while writing to the file {self.filename}: {e}")
-        except ValueError as e:
-            raise ValueError(f"An error occurred while verifying the password: {e}")
-    def get_passwords(self):
-        
-        try:
-            with open(self.filename, 'r') as file:
-                passwords = []
-                for line in file:
-                    site, user, salt, password = line.strip().split(':')
-                    clean_password = self._unencrypt_password(password, salt)
-                    passwords.append({'website': site, 'username': user, 'password': clean_password})
-                return passwords
-        except IOError as e:
-            raise IOError(f"An error occurred while reading the file {self.filename}: {e}")
-        except ValueError as e:
-            raise ValueError(f"An error occurred while verifying the password: {e}")
-        
+        with self._locked(exclusive=True):
+            offset = self._offsets.get(username)
+            if offset is None or self._read_record(offset)[0] != site:
+                raise ValueError(f"No password stored for {username} on {site}")
+            self._append(f"{site}:{username}:{TOMBSTONE_SALT}:\n")
+            if self._dead >= COMPACT_MIN_DEAD and self._dead > len(self._offsets):
+                self._compact()
+        return 'Password removed successfully'
+
+    def get_passwords(self, fields=('website', 'username', 'password')):
+        """
+        Lazily yields the stored entries as dicts holding only the requested fields.
+
+        Only salted hashes are stored, so 'password' is the SHA-256 hash.
+
+        Parameters:
+        fields (tuple): Any of 'website', 'username', 'salt' and 'password'.
+
+        Raises:
+        ValueError: If a field name is unknown.
+        IOError: If the file cannot be read.
+        """
+        unknown = [field for field in fields if field not in PASSWORD_FIELDS]
+        if unknown:
+            raise ValueError(f"Unknown password fields: {', '.join(unknown)}")
+        for values in self.iter_records(tuple(PASSWORD_FIELDS[field] for field in fields)):
+            yield dict(zip(fields, values))
+
     def add_password(self, website, username, password):
         """
         Adds a new password for the given username.
@@ -205,7 +478,7 @@ class PasswordManager:
         Raises:
         IOError: If the file cannot be written to.
         """
-        return self._store_password(website, username, password)
+        return self._store_master_password(website, username, password)
     
     def delete_password(self, site, username):
         """
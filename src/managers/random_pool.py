@@ -0,0 +1,120 @@
+# Buffered CSPRNG sampling for the password and passphrase generators
+# Draws os.urandom in large blocks and maps bytes to values without modulo bias
+
+import os
+import threading
+
+DEFAULT_POOL_SIZE = 4096  # bytes fetched from the OS per refill
+
+
+class RandomPool:
+    """
+    Serves random values from a buffer of os.urandom bytes.
+
+    Every mapping uses rejection sampling: bytes that would make some values
+    more likely than others (the remainder above the largest multiple of the
+    range) are thrown away rather than reduced with modulo.
+    """
+
+    def __init__(self, size=DEFAULT_POOL_SIZE):
+        self.size = size
+        self._buffer = b""
+        self._pos = 0
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        self._tables = {}
+
+    def _take(self, n):
+        """Returns the next n unused bytes, refilling from the OS as needed."""
+        # A forked child must never reuse bytes its parent has buffered
+        if self._pid != os.getpid():
+            self._buffer, self._pos, self._pid = b"", 0, os.getpid()
+        if self._pos + n > len(self._buffer):
+            self._buffer = os.urandom(max(self.size, n))
+            self._pos = 0
+        data = self._buffer[self._pos:self._pos + n]
+        self._pos += n
+        return data
+
+    def token_bytes(self, n):
+        """Returns n random bytes."""
+        with self._lock:
+            return self._take(n)
+
+    def below(self, n):
+        """Returns a uniformly random integer in [0, n)."""
+        if n <= 0:
+            raise ValueError("n must be positive")
+        if n == 1:
+            return 0
+        bits = (n - 1).bit_length()
+        size = (bits + 7) // 8
+        mask = (1 << bits) - 1
+        with self._lock:
+            while True:
+                value = int.from_bytes(self._take(size), 'big') & mask
+                if value < n:
+                    return value
+
+    def _table(self, alphabet):
+        """Builds the byte translation used to map random bytes onto an ASCII alphabet."""
+        table = self._tables.get(alphabet)
+        if table is None:
+            size = len(alphabet)
+            if not 0 < size <= 256 or not alphabet.isascii():
+                raise ValueError("alphabet must be 1-256 ASCII characters")
+            limit = 256 - 256 % size
+            encoded = alphabet.encode('ascii')
+            mapping = bytes(encoded[b % size] if b < limit else 0 for b in range(256))
+            table = self._tables[alphabet] = (mapping, bytes(range(limit, 256)), limit)
+        return table
+
+    def choices(self, alphabet, k):
+        """
+        Returns a string of k characters drawn uniformly from an ASCII alphabet.
+
+        Whole blocks of bytes are mapped at once with bytes.translate, which
+        also drops the rejected bytes.
+        """
+        mapping, rejected, limit = self._table(alphabet)
+        out = []
+        remaining = k
+        with self._lock:
+            while remaining > 0:
+                # Over-draw slightly so one round usually covers the rejections
+                want = remaining * 256 // limit + 8
+                chunk = self._take(want).translate(mapping, rejected)[:remaining]
+                out.append(chunk)
+                remaining -= len(chunk)
+        return b"".join(out).decode('ascii')
+
+    def shuffle(self, items):
+        """Shuffles a list in place (Fisher-Yates)."""
+        n = len(items)
+        if n > 256:
+            for i in range(n - 1, 0, -1):
+                j = self.below(i + 1)
+                items[i], items[j] = items[j], items[i]
+            return
+
+        # Every swap index fits in one byte, so draw them all in one go
+        with self._lock:
+            data = self._take(2 * n)
+            pos = 0
+            for i in range(n - 1, 0, -1):
+                size = i + 1
+                limit = 256 - 256 % size
+                while True:
+                    if pos == len(data):
+                        data = self._take(n)
+                        pos = 0
+                    value = data[pos]
+                    pos += 1
+                    if value < limit:
+                        break
+                j = value % size
+                items[i], items[j] = items[j], items[i]
+
+
+# Shared by generators that are not given their own pool
+default_pool = RandomPool()
@@ -0,0 +1,79 @@
+# Bounded LRU cache for zxcvbn results
+# Entries are keyed by an HMAC of the password, never the password itself
+
+import hashlib
+import hmac
+import secrets
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_MAX_SIZE = 1024
+DEFAULT_TTL = 300  # seconds
+
+
+class ScoreCache:
+    """
+    Memoizes password scores with LRU eviction and a time-to-live.
+
+    The HMAC key is random per process, so cache keys cannot be matched
+    against precomputed hashes and mean nothing outside this process.
+    """
+
+    def __init__(self, max_size=DEFAULT_MAX_SIZE, ttl=DEFAULT_TTL):
+        """
+        Args:
+        max_size (int): Maximum number of cached scores.
+        ttl (float): Seconds a score stays valid, or None to keep it until evicted.
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._key = secrets.token_bytes(32)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _digest(self, password):
+        return hmac.new(self._key, password.encode(), hashlib.sha256).digest()
+
+    def get(self, password):
+        """Returns the cached value for the password, or None on a miss."""
+        digest = self._digest(password)
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is not None:
+                value, expires = entry
+                if expires is None or expires > time.monotonic():
+                    self._entries.move_to_end(digest)
+                    self.hits += 1
+                    return value
+                del self._entries[digest]
+            self.misses += 1
+            return None
+
+    def put(self, password, value):
+        """Caches a value for the password, evicting the least recently used entry if full."""
+        digest = self._digest(password)
+        expires = None if self.ttl is None else time.monotonic() + self.ttl
+        with self._lock:
+            self._entries[digest] = (value, expires)
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Drops every cached value and resets the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        """Returns the hit and miss counters and the current size."""
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._entries)}
+
+
+# Shared by every PasswordValidator that is not given its own cache
+default_score_cache = ScoreCache()
@@ -0,0 +1,179 @@
+# In-memory search index over the site names and usernames of an unlocked vault
+
+import heapq
+import math
+from bisect import bisect_left, insort
+from collections import Counter
+
+MAX_RESULTS = 50
+FUZZY_THRESHOLD = 0.5
+
+
+def _trigrams(text):
+    """Returns the trigrams of text, padded so short words still produce some."""
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _grams(text, size):
+    """Returns the unpadded n-grams of text."""
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+class VaultSearchIndex:
+    """
+    Indexes site names for prefix, substring and fuzzy lookups, and
+    usernames for exact lookups. All matching is case-insensitive.
+
+    - Prefix: a sorted array of lowered site names searched with bisect,
+      which gives the same O(log n + k) lookups as a trie with far less
+      per-node overhead in Python.
+    - Substring: postings of bigrams and padded trigrams, intersected
+      smallest-first and then confirmed with a plain substring check.
+    - Fuzzy: candidates ranked by the share of the query's trigrams they
+      contain, then by overall trigram similarity (Jaccard).
+    """
+
+    def __init__(self, passwords=None):
+        """
+        Args:
+        passwords (dict): Site name -> {"username": str, "password": str}.
+        """
+        self._sorted = []  # (lowered site, site)
+        self._lowered = {}  # site -> lowered site
+        self._trigrams = {}
+        self._trigram_counts = {}
+        self._bigrams = {}
+        self._usernames = {}
+        self._site_usernames = {}
+        for site, credentials in (passwords or {}).items():
+            self._index(site, credentials["username"])
+            self._sorted.append((self._lowered[site], site))
+        self._sorted.sort()
+
+    def __len__(self):
+        return len(self._lowered)
+
+    def add(self, site, site_username=""):
+        """Indexes a site, replacing any previous entry for it."""
+        self.remove(site)
+        self._index(site, site_username)
+        insort(self._sorted, (self._lowered[site], site))
+
+    def _index(self, site, site_username):
+        """Adds a site to every index except the sorted name array."""
+        lowered = site.lower()
+        self._lowered[site] = lowered
+        trigrams = _trigrams(lowered)
+        self._trigram_counts[site] = len(trigrams)
+        for gram in trigrams:
+            self._trigrams.setdefault(gram, set()).add(site)
+        for gram in _grams(lowered, 2):
+            self._bigrams.setdefault(gram, set()).add(site)
+
+        user_key = site_username.lower()
+        self._site_usernames[site] = user_key
+        self._usernames.setdefault(user_key, set()).add(site)
+
+    def remove(self, site):
+        """Removes a site from the index if it is present."""
+        lowered = self._lowered.pop(site, None)
+        if lowered is None:
+            return
+        del self._sorted[bisect_left(self._sorted, (lowered, site))]
+        del self._trigram_counts[site]
+        for postings, grams in ((self._trigrams, _trigrams(lowered)), (self._bigrams, _grams(lowered, 2))):
+            for gram in grams:
+                sites = postings[gram]
+                sites.discard(site)
+                if not sites:
+                    del postings[gram]
+
+        user_key = self._site_usernames.pop(site)
+        sites = self._usernames[user_key]
+        sites.discard(site)
+        if not sites:
+            del self._usernames[user_key]
+
+    def prefix(self, query, limit=MAX_RESULTS):
+        """Returns sites whose name starts with query, in name order."""
+        query = query.lower()
+        results = []
+        start = bisect_left(self._sorted, (query, ""))
+        for lowered, site in self._sorted[start:start + limit if limit else None]:
+            if not lowered.startswith(query):
+                break
+            results.append(site)
+        return results
+
+    def substring(self, query, limit=MAX_RESULTS):
+        """Returns sites whose name contains query, in name order."""
+        query = query.lower()
+        if not query:
+            return self.prefix("", limit)
+
+        if len(query) >= 3:
+            postings = [self._trigrams.get(gram) for gram in _grams(query, 3)]
+        elif len(query) == 2:
+            postings = [self._bigrams.get(query)]
+        else:
+            # Single characters are too common to be worth indexing
+            postings = None
+
+        if postings is None:
+            candidates = None
+        elif not all(postings):
+            return []
+        else:
+            postings.sort(key=len)
+            candidates = set(postings[0])
+            for sites in postings[1:]:
+                candidates &= sites
+                if not candidates:
+                    return []
+
+        # With many candidates it is cheaper to walk the names in order and
+        # stop at the limit than to sort every candidate
+        if limit and (candidates is None or len(self) * limit < len(candidates) ** 2):
+            results = []
+            for lowered, site in self._sorted:
+                if query in lowered and (candidates is None or site in candidates):
+                    results.append(site)
+                    if len(results) == limit:
+                        break
+            return results
+
+        candidates = self._lowered if candidates is None else candidates
+        matches = sorted((self._lowered[site], site) for site in candidates if query in self._lowered[site])
+        if limit:
+            matches = matches[:limit]
+        return [site for _, site in matches]
+
+    def fuzzy(self, query, limit=MAX_RESULTS, threshold=FUZZY_THRESHOLD):
+        """Returns sites similar to query, most similar first."""
+        grams = _trigrams(query.lower())
+        postings = sorted((self._trigrams.get(gram, set()) for gram in grams), key=len)
+
+        # A match must contain at least threshold of the query's trigrams, so
+        # it must appear in one of the rarest postings. Only those are counted
+        # in bulk; the common ones are probed per candidate.
+        required = max(1, math.ceil(threshold * len(grams)))
+        rare = len(postings) - required + 1
+        overlap = Counter()
+        for sites in postings[:rare]:
+            overlap.update(sites)
+        for sites in postings[rare:]:
+            overlap.update(overlap.keys() & sites)
+
+        counts = self._trigram_counts
+        size = len(grams)
+        scored = [
+            (-shared, (size + counts[site] - shared) / shared, site)
+            for site, shared in overlap.items() if shared >= required
+        ]
+        ranked = heapq.nsmallest(limit, scored) if limit else sorted(scored)
+        return [site for _, _, site in ranked]
+
+    def by_username(self, site_username):
+        """Returns the sites stored under the given username, in name order."""
+        return sorted(self._usernames.get(site_username.lower(), ()))
@@ -0,0 +1,321 @@
+# Storage backends used by PasswordManager and LoginManager
+#
+# Every backend stores opaque byte values addressed by (owner, name), where
+# owner is the user the entry belongs to. The backend is chosen with the
+# PASSMAN_BACKEND environment variable (keyring, file or sqlite) and data is
+# kept under PASSMAN_DATA_DIR for the file and sqlite engines.
+
+import base64
+import os
+import sqlite3
+import tempfile
+import threading
+
+APP_NAME = "pass_man"
+
+DEFAULT_BACKEND = "keyring"
+DEFAULT_DATA_DIR = os.path.join(os.path.expanduser("~"), ".passman")
+
+
+class StorageError(IOError):
+    ''' Raised when a backend cannot read or write an entry '''
+    pass
+
+
+class StorageBackend:
+    """
+    Interface shared by all storage engines.
+
+    can_list is True when the engine can enumerate names itself, so callers
+    do not need to maintain their own index of entries.
+    """
+    can_list = False
+
+    def get(self, owner, name=""):
+        """Returns the stored bytes, or None if the entry does not exist."""
+        raise NotImplementedError
+
+    def set(self, owner, name, value):
+        """Stores bytes under the given owner and name."""
+        raise NotImplementedError
+
+    def delete(self, owner, name=""):
+        """Deletes an entry. Returns False if it did not exist."""
+        raise NotImplementedError
+
+    def set_many(self, owner, items):
+        """Stores several (name, value) pairs for one owner."""
+        for name, value in items:
+            self.set(owner, name, value)
+
+    def delete_many(self, owner, names):
+        """Deletes several entries for one owner."""
+        for name in names:
+            self.delete(owner, name)
+
+    def names(self, owner, prefix=""):
+        """Returns the names stored for the owner that start with prefix."""
+        raise NotImplementedError(f"{type(self).__name__} cannot list entries.")
+
+    def close(self):
+        """Releases any resources held by the backend."""
+        pass
+
+
+class KeyringBackend(StorageBackend):
+    """
+    Stores entries in the system keyring under APP_NAME.
+
+    Keyring only holds text, so values are base85 encoded with a "b85:"
+    prefix (25% larger than the raw bytes, where hex doubles them). Values
+    with a "hex:" prefix, or none at all, were written by older versions and
+    are still read.
+    """
+
+    # Entry names that predate the owner:name scheme
+    LEGACY_NAMES = {"userpin": "{owner}_userpin"}
+
+    def __init__(self, service=APP_NAME):
+        # Imported here so the file and sqlite engines never load keyring
+        import keyring
+        self._keyring = keyring
+        self.service = service
+
+    def _entry_name(self, owner, name):
+        if not name:
+            return owner
+        if name in self.LEGACY_NAMES:
+            return self.LEGACY_NAMES[name].format(owner=owner)
+        return f"{owner}:{name}"
+
+    def get(self, owner, name=""):
+        try:
+            value = self._keyring.get_password(self.service, self._entry_name(owner, name))
+        except self._keyring.errors.KeyringError as e:
+            raise StorageError(f"Keyring error while reading {name or owner}: {e}") from e
+        if value is None:
+            return None
+        if value.startswith("b85:"):
+            return base64.b85decode(value[4:])
+        if value.startswith("hex:"):
+            return bytes.fromhex(value[4:])
+        return value.encode()
+
+    def set(self, owner, name, value):
+        try:
+            self._keyring.set_password(self.service, self._entry_name(owner, name), "b85:" + base64.b85encode(value).decode())
+        except self._keyring.errors.KeyringError as e:
+            raise StorageError(f"Keyring error while writing {name or owner}: {e}") from e
+
+    def delete(self, owner, name=""):
+        try:
+            self._keyring.delete_password(self.service, self._entry_name(owner, name))
+            return True
+        except self._keyring.errors.PasswordDeleteError:
+            return False
+        except self._keyring.errors.KeyringError as e:
+            raise StorageError(f"Keyring error while deleting {name or owner}: {e}") from e
+
+
+class FileBackend(StorageBackend):
+    """
+    Stores each entry as its own file: <root>/<owner>/<name>.
+
+    Owner and name are base64url encoded so any string is a safe file name.
+    Writes go to a temporary file which is then renamed over the old one.
+    """
+    can_list = True
+
+    def __init__(self, root):
+        self.root = root
+
+    @staticmethod
+    def _encode(value):
+        return base64.urlsafe_b64encode(value.encode()).decode().rstrip("=") or "_"
+
+    @staticmethod
+    def _decode(value):
+        if value == "_":
+            return ""
+        return base64.urlsafe_b64decode(value + "=" * (-len(value) % 4)).decode()
+
+    def _owner_dir(self, owner):
+        return os.path.join(self.root, self._encode(owner))
+
+    def _path(self, owner, name):
+        return os.path.join(self._owner_dir(owner), self._encode(name))
+
+    def get(self, owner, name=""):
+        try:
+            with open(self._path(owner, name), 'rb') as file:
+                return file.read()
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            raise StorageError(f"File error while reading {name or owner}: {e}") from e
+
+    def set(self, owner, name, value):
+        directory = self._owner_dir(owner)
+        try:
+            os.makedirs(directory, mode=0o700, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+            try:
+                with os.fdopen(fd, 'wb') as file:
+                    file.write(value)
+                os.replace(temp_path, self._path(owner, name))
+            except BaseException:
+                os.unlink(temp_path)
+                raise
+        except OSError as e:
+            raise StorageError(f"File error while writing {name or owner}: {e}") from e
+
+    def delete(self, owner, name=""):
+        try:
+            os.unlink(self._path(owner, name))
+            return True
+        except FileNotFoundError:
+            return False
+        except OSError as e:
+            raise StorageError(f"File error while deleting {name or owner}: {e}") from e
+
+    def names(self, owner, prefix=""):
+        try:
+            entries = os.listdir(self._owner_dir(owner))
+        except FileNotFoundError:
+            return []
+        except OSError as e:
+            raise StorageError(f"File error while listing {owner}: {e}") from e
+        names = (self._decode(entry) for entry in entries if not entry.startswith(".tmp-"))
+        return sorted(name for name in names if name.startswith(prefix))
+
+
+class SQLiteBackend(StorageBackend):
+    """
+    Stores entries in a local SQLite database in WAL mode.
+
+    The (owner, name) primary key indexes every lookup by user, and prefix
+    queries over names (e.g. all "site:" records) are range scans on it.
+    """
+    can_list = True
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(path)
+        try:
+            if directory:
+                os.makedirs(directory, mode=0o700, exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " owner TEXT NOT NULL,"
+                " name TEXT NOT NULL,"
+                " value BLOB NOT NULL,"
+                " PRIMARY KEY (owner, name)"
+                ") WITHOUT ROWID"
+            )
+        except (OSError, sqlite3.Error) as e:
+            raise StorageError(f"Unable to open the database {path}: {e}") from e
+        self._lock = threading.Lock()
+
+    def _execute(self, action, sql, params=()):
+        try:
+            with self._lock:
+                return self._conn.execute(sql, params).fetchall()
+        except sqlite3.Error as e:
+            raise StorageError(f"Database error while {action}: {e}") from e
+
+    def get(self, owner, name=""):
+        rows = self._execute("reading", "SELECT value FROM entries WHERE owner = ? AND name = ?", (owner, name))
+        return bytes(rows[0][0]) if rows else None
+
+    def set(self, owner, name, value):
+        self._execute(
+            "writing",
+            "INSERT OR REPLACE INTO entries (owner, name, value) VALUES (?, ?, ?)",
+            (owner, name, value),
+        )
+
+    def delete(self, owner, name=""):
+        try:
+            with self._lock:
+                cursor = self._conn.execute("DELETE FROM entries WHERE owner = ? AND name = ?", (owner, name))
+                return cursor.rowcount > 0
+        except sqlite3.Error as e:
+            raise StorageError(f"Database error while deleting: {e}") from e
+
+    def _transaction(self, action, sql, params):
+        """Runs one statement over many parameter sets in a single transaction."""
+        try:
+            with self._lock:
+                self._conn.execute("BEGIN IMMEDIATE")
+                try:
+                    self._conn.executemany(sql, params)
+                except BaseException:
+                    self._conn.execute("ROLLBACK")
+                    raise
+                self._conn.execute("COMMIT")
+        except sqlite3.Error as e:
+            raise StorageError(f"Database error while {action}: {e}") from e
+
+    def set_many(self, owner, items):
+        self._transaction(
+            "writing",
+            "INSERT OR REPLACE INTO entries (owner, name, value) VALUES (?, ?, ?)",
+            ((owner, name, value) for name, value in items),
+        )
+
+    def delete_many(self, owner, names):
+        self._transaction(
+            "deleting",
+            "DELETE FROM entries WHERE owner = ? AND name = ?",
+            ((owner, name) for name in names),
+        )
+
+    def names(self, owner, prefix=""):
+        # A range on the primary key instead of LIKE, so the index is used
+        rows = self._execute(
+            "listing",
+            "SELECT name FROM entries WHERE owner = ? AND name >= ? AND name < ? ORDER BY name",
+            (owner, prefix, prefix + "\U0010ffff"),
+        )
+        return [name for (name,) in rows]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def get_data_dir(data_dir=None):
+    """Returns the directory for local data: data_dir, then $PASSMAN_DATA_DIR, then ~/.passman."""
+    return data_dir or os.environ.get("PASSMAN_DATA_DIR") or DEFAULT_DATA_DIR
+
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def get_backend(kind=None, data_dir=None):
+    """
+    Returns the configured backend, shared by every caller in the process.
+
+    Args:
+    kind (str): keyring, file or sqlite. Defaults to $PASSMAN_BACKEND, then keyring.
+    data_dir (str): Where file and sqlite data live. Defaults to $PASSMAN_DATA_DIR.
+    """
+    kind = (kind or os.environ.get("PASSMAN_BACKEND") or DEFAULT_BACKEND).lower()
+    data_dir = get_data_dir(data_dir)
+
+    with _backends_lock:
+        key = (kind, data_dir)
+        if key not in _backends:
+            if kind == "keyring":
+                _backends[key] = KeyringBackend()
+            elif kind == "file":
+                _backends[key] = FileBackend(os.path.join(data_dir, "vault"))
+            elif kind == "sqlite":
+                _backends[key] = SQLiteBackend(os.path.join(data_dir, "passman.db"))
+            else:
+                raise ValueError(f"Unknown storage backend: {kind}")
+        return _backends[key]
@@ -1,18 +1,78 @@
 # Uses the PasswordValidator class to validate
 # Backups with zxcvbn algorithm to give a security score
 
-from zxcvbn import zxcvbn
+import os
+import threading
+import concurrent.futures
+from managers.generation_policy import DEFAULT_POLICY, policy_for
+from managers.score_cache import default_score_cache
+
+# NumPy is optional (see requirements.in) and only imported the first time
+# a batch is counted
+_numpy = None
+_numpy_checked = False
+_numpy_lock = threading.Lock()  # Batches are counted on scheduler workers
+
+# Order of the columns produced when counting character classes in bulk
+STATUS_KEYS = ('length', 'upper', 'lower', 'number', 'special')
+
+# Passwords handled per batch by validate_many
+BATCH_SIZE = 4096
+
+
+# The class of each ASCII code: 0 upper, 1 lower, 2 number, 3 special.
+# For ASCII these classes are disjoint, so each code has exactly one. Both
+# the str.translate and NumPy tables below are built from this.
+_ASCII_CLASS_OF = tuple(
+    0 if c.isupper() else 1 if c.islower() else 2 if c.isdigit() else 3
+    for c in map(chr, range(128))
+)
+
+_ASCII_CLASSES = None  # _ASCII_CLASS_OF as a NumPy array, set once NumPy is loaded
+
+
+def _load_numpy():
+    """Returns the numpy module, importing it on first use, or None if it is not installed."""
+    global _numpy, _numpy_checked, _ASCII_CLASSES
+    if not _numpy_checked:
+        with _numpy_lock:
+            if not _numpy_checked:
+                try:
+                    import numpy
+                except ImportError:  # Batch counting falls back to pure Python
+                    numpy = None
+                if numpy is not None:
+                    _ASCII_CLASSES = numpy.array(_ASCII_CLASS_OF, dtype=numpy.int64)
+                # Published last, so no thread sees the module without its table
+                _numpy = numpy
+                _numpy_checked = True
+    return _numpy
+
+# Translates every ASCII character to a letter naming its class, so counting
+# a class is a single str.count over the translated password
+_CLASS_LETTERS = str.maketrans({chr(code): 'ULNS'[cls] for code, cls in enumerate(_ASCII_CLASS_OF)})
+
+
+def _score_worker(password):
+    """Runs zxcvbn in a worker process."""
+    return PasswordValidator()._security_score(password)
 
 class PasswordValidator:
     """Handles password validation based on predefined security standards."""
     
-    def __init__(self):
+    def __init__(self, score_cache=None, policy=None):
         """
         Initializes the PasswordValidator with predefined security standards.
         
         weak_requirements: Minimum requirements for a weak password.
         strong_requirements: Minimum requirements for a strong password.
+        score_cache: ScoreCache for zxcvbn results, shared across validators by default.
+        policy: GenerationPolicy whose requirements a strong password must meet,
+        the same policy the generators build their output from. A strong
+        password also meets every weak requirement, even where the policy
+        asks for less (e.g. special=0).
         """
+        self.score_cache = score_cache if score_cache is not None else default_score_cache
         self.weak_requirements = {
             'length': 8,
             'upper': 1,
@@ -21,18 +81,34 @@ class PasswordValidator:
             'special': 1
         }
 
+        self.policy = policy or DEFAULT_POLICY
         self.strong_requirements = {
-            'length': 13,
-            'upper': 2,
-            'lower': 2,
-            'number': 2,
-            'special': 2
+            key: max(self.weak_requirements[key], count) for key, count in self.policy.requirements.items()
         }
 
+    def for_site(self, site):
+        """
+        Returns a validator checking the site's own policy, sharing this
+        validator's score cache. Returns self if the site uses this policy.
+        """
+        policy = policy_for(site)
+        if policy is self.policy:
+            return self
+        return PasswordValidator(self.score_cache, policy)
+
+    def meets_policy(self, password):
+        """
+        Returns True if the password has every character the policy
+        requires. Unlike the strong requirements, the weak ones are not added.
+        """
+        requirements = self.policy.requirements
+        return self._meets_requirements(self._password_status(password, requirements), requirements)
+
     def _security_score(self, password):
         """
         Returns the security score of the given password using the zxcvbn algorithm.
         Also takes feedback from the zxcvbn algorithm to improve the password.
+        Results are memoized in the score cache, so repeated passwords skip zxcvbn.
 
         Args:
         password (str): The password to evaluate.
@@ -41,9 +117,18 @@ class PasswordValidator:
         int: The security score of the password.
         str: The feedback from the zxcvbn algorithm.
         """
+        cached = self.score_cache.get(password)
+        if cached is not None:
+            score, suggestions = cached
+            return score, list(suggestions)
+
         try:
+            # Imported on first use: zxcvbn loads large frequency lists
+            from zxcvbn import zxcvbn
             result = zxcvbn(password)
-            return result['score'], result['feedback']['suggestions']
+            score, suggestions = result['score'], result['feedback']['suggestions']
+            self.score_cache.put(password, (score, tuple(suggestions)))
+            return score, suggestions
         except IndexError:
             return 0, "Error: Password is too weak."
         except KeyError:
@@ -65,27 +150,105 @@ class PasswordValidator:
         'weak' if the password meets the weak requirements but not the strong requirements,
         'strong' if the password meets the strong requirements.
         """
-                
+        # Cheapest checks first: length, then one pass over the characters
         if len(password) < self.weak_requirements['length']:
             return 'invalid'
 
-        password_status = {
-            'length': len(password),
-            'upper': sum(1 for c in password if c.isupper()),
-            'lower': sum(1 for c in password if c.islower()),
-            'number': sum(1 for c in password if c.isdigit()),
-            'special': sum(1 for c in password if not c.isalnum()),
-        }
+        password_status = self._password_status(password, self.strong_requirements)
 
-        if self._meets_requirements(password_status, self.strong_requirements):
+        if not self._meets_requirements(password_status, self.weak_requirements):
+            return 'invalid'
+        elif self._meets_requirements(password_status, self.strong_requirements):
             return 'strong'
-        elif self._meets_requirements(password_status, self.weak_requirements):
-            return 'weak'
-        return 'invalid'
+        return 'weak'
+
+    def _password_status(self, password, target=None):
+        """
+        Counts the characters of each class in the password in a single pass.
+
+        ASCII passwords are translated to class letters and counted in C.
+        Other passwords are walked once, stopping early as soon as every
+        class has reached the counts in target (when given), since larger
+        counts cannot change the outcome.
+        """
+        if password.isascii():
+            classes = password.translate(_CLASS_LETTERS)
+            return {
+                'length': len(password),
+                'upper': classes.count('U'),
+                'lower': classes.count('L'),
+                'number': classes.count('N'),
+                'special': classes.count('S'),
+            }
+
+        if target:
+            need_upper, need_lower = target['upper'], target['lower']
+            need_number, need_special = target['number'], target['special']
+        upper = lower = number = special = 0
+        for c in password:
+            if c.isupper():
+                upper += 1
+            elif c.islower():
+                lower += 1
+            elif c.isdigit():
+                number += 1
+            elif not c.isalnum():
+                special += 1
+            else:
+                continue
+            if (target and upper >= need_upper and lower >= need_lower
+                    and number >= need_number and special >= need_special):
+                break
+        return {'length': len(password), 'upper': upper, 'lower': lower, 'number': number, 'special': special}
 
     def _meets_requirements(self, password_status, requirements):
         return all(password_status[key] >= requirements[key] for key in requirements)
 
+    def _min_validation_many(self, passwords):
+        """
+        Runs _min_validation over a batch of passwords.
+
+        With NumPy, ASCII passwords are concatenated into one byte array and
+        their character classes are counted together; anything else goes
+        through _min_validation one at a time.
+        """
+        results = [None] * len(passwords)
+        ascii_rows = []
+        np = _load_numpy()
+        if np is not None:
+            ascii_rows = [i for i, password in enumerate(passwords) if password.isascii()]
+
+        if ascii_rows:
+            lengths = np.fromiter((len(passwords[i]) for i in ascii_rows), dtype=np.int64, count=len(ascii_rows))
+            data = np.frombuffer(''.join(passwords[i] for i in ascii_rows).encode('ascii'), dtype=np.uint8)
+
+            # Count (password, class) pairs in one bincount
+            owners = np.repeat(np.arange(len(ascii_rows)), lengths)
+            counts = np.bincount(owners * 4 + _ASCII_CLASSES[data], minlength=len(ascii_rows) * 4)
+            status = np.column_stack((lengths, counts.reshape(-1, 4)))
+
+            weak = (status >= [self.weak_requirements[key] for key in STATUS_KEYS]).all(axis=1)
+            strong = (status >= [self.strong_requirements[key] for key in STATUS_KEYS]).all(axis=1)
+            # Weak is checked first, as in _min_validation
+            labels = np.where(~weak, 'invalid', np.where(strong, 'strong', 'weak'))
+            for i, label in zip(ascii_rows, labels.tolist()):
+                results[i] = label
+
+        for i, password in enumerate(passwords):
+            if results[i] is None:
+                results[i] = self._min_validation(password)
+        return results
+
+    @staticmethod
+    def _score_result(security_score, suggestions):
+        """Maps a zxcvbn score onto the result returned by validate."""
+        if security_score == 4:
+            return 'strong', "Great password! No security suggestions."
+        elif security_score >= 3:
+            return 'weak', suggestions
+        else:
+            return 'invalid', suggestions
+
     def validate(self, password):
         """ 
         Controls the validation program flow.
@@ -96,9 +259,66 @@ class PasswordValidator:
             return 'invalid'
         else:
             security_score, suggestions = self._security_score(password)
-            if security_score == 4:
-                return 'strong', "Great password! No security suggestions."
-            elif security_score >= 3:
-                return 'weak', suggestions
+            return self._score_result(security_score, suggestions)
+
+    def validate_many(self, passwords, workers=None, batch_size=BATCH_SIZE):
+        """
+        Validates a large stream of passwords, yielding results as they are ready.
+
+        Passwords are read in batches. Character classes for a whole batch are
+        counted together, and passwords that pass those cheap checks are scored
+        by zxcvbn across a process pool (skipping any already in the score cache).
+
+        Args:
+        passwords (iterable): The passwords to validate.
+        workers (int): Worker processes for zxcvbn; 1 scores in this process.
+        batch_size (int): Passwords read and scored per batch.
+
+        Yields:
+        The same result validate() returns, in input order.
+        """
+        workers = workers or os.cpu_count() or 1
+        pool = concurrent.futures.ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+        try:
+            batch = []
+            for password in passwords:
+                batch.append(password)
+                if len(batch) == batch_size:
+                    yield from self._validate_batch(batch, pool, workers)
+                    batch = []
+            if batch:
+                yield from self._validate_batch(batch, pool, workers)
+        finally:
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+
+    def _validate_batch(self, batch, pool, workers):
+        """Validates one batch for validate_many, yielding each result once it is known."""
+        results = [None] * len(batch)
+        pending = []
+        for i, status in enumerate(self._min_validation_many(batch)):
+            if status == 'invalid':
+                results[i] = 'invalid'
+                continue
+            cached = self.score_cache.get(batch[i])
+            if cached is not None:
+                results[i] = self._score_result(cached[0], list(cached[1]))
             else:
-                return 'invalid', suggestions
\ No newline at end of file
+                pending.append(i)
+
+        to_score = [batch[i] for i in pending]
+        if pool is None:
+            scores = map(self._security_score, to_score)
+        else:
+            chunksize = max(1, len(to_score) // (workers * 4))
+            scores = pool.map(_score_worker, to_score, chunksize=chunksize)
+
+        # pool.map returns scores in order, so each result can be yielded as
+        # soon as every score before it has arrived
+        for i, result in enumerate(results):
+            if result is None:
+                security_score, suggestions = next(scores)
+                if not isinstance(suggestions, str):
+                    self.score_cache.put(batch[i], (security_score, tuple(suggestions)))
+                result = self._score_result(security_score, suggestions)
+            yield result
\ No newline at end of file
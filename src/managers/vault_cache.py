@@ -0,0 +1,144 @@
+# In-memory cache of a decrypted vault for the length of an unlocked session
+
+import threading
+import time
+from managers.search_index import VaultSearchIndex
+
+DEFAULT_IDLE_TIMEOUT = 300  # seconds
+
+
+class VaultSession:
+    """
+    Holds the decrypted entries of one vault while it is unlocked.
+
+    Credentials are kept in bytearrays so they can be zeroed when the session
+    is locked or evicted. The decoded view is built once and reused until the
+    next write; callers get their own copies of it. Those copies hold str,
+    which Python cannot overwrite, so wipe() only clears the bytearrays: a
+    string handed out lives until the caller drops it and it is collected.
+    The search index is built on the first search and then kept in step with
+    every write.
+
+    Sessions are shared by the scheduler's worker threads, so every method
+    holds the session's lock. Query the index through lookup(), which holds
+    it too.
+    """
+
+    def __init__(self, passwords, idle_timeout=DEFAULT_IDLE_TIMEOUT):
+        """
+        Args:
+        passwords (dict): Site name -> {"username": str, "password": str}.
+        idle_timeout (float): Seconds without use before the session expires.
+        """
+        self.idle_timeout = idle_timeout
+        self._lock = threading.RLock()
+        self._entries = {}
+        self._view = None
+        self._index = None
+        for site, credentials in passwords.items():
+            self.put(site, credentials["username"], credentials["password"])
+        self.touch()
+
+    def touch(self):
+        """Marks the session as used now."""
+        self._last_used = time.monotonic()
+
+    def expired(self):
+        """Returns True if the session has been idle for longer than its timeout."""
+        if self.idle_timeout is None:
+            return False
+        return time.monotonic() - self._last_used > self.idle_timeout
+
+    def sites(self):
+        """Returns the cached site names in index order."""
+        with self._lock:
+            return list(self._entries)
+
+    def search_index(self):
+        """
+        Returns the search index over the cached entries, building it if
+        needed. Writes update it in place, so only use it from one thread.
+        """
+        with self._lock:
+            if self._index is None:
+                self._index = VaultSearchIndex(self._decoded())
+            self.touch()
+            return self._index
+
+    def lookup(self, query, *args):
+        """
+        Runs one search index query, e.g. lookup("prefix", "git", 10), under
+        the session lock.
+
+        Returns:
+        list: The matching site names.
+        """
+        with self._lock:
+            return getattr(self.search_index(), query)(*args)
+
+    def entries(self, sites):
+        """
+        Returns site name -> credentials for the given cached sites only.
+        Like snapshot(), every credentials dict is a fresh copy.
+        """
+        with self._lock:
+            view = self._decoded()
+            return {site: dict(view[site]) for site in sites if site in view}
+
+    def snapshot(self):
+        """
+        Returns the cached vault as site name -> credentials.
+
+        The outer and inner dicts are copies the caller may change freely.
+        The strings in them cannot be zeroed, so they outlive wipe().
+        """
+        with self._lock:
+            return {site: dict(credentials) for site, credentials in self._decoded().items()}
+
+    def _decoded(self):
+        """
+        Returns the shared decoded view, building it if needed. Call with the
+        lock held, and never hand the view out.
+        """
+        if self._view is None:
+            self._view = {
+                site: {"username": username.decode(), "password": password.decode()}
+                for site, (username, password) in self._entries.items()
+            }
+        self.touch()
+        return self._view
+
+    def put(self, site, username, password):
+        """Writes back a stored entry after it has been persisted."""
+        with self._lock:
+            old = self._entries.get(site)
+            if old is not None:
+                self._zero(old)
+            self._entries[site] = (bytearray(username.encode()), bytearray(password.encode()))
+            self._view = None
+            if self._index is not None:
+                self._index.add(site, username)
+
+    def remove(self, site):
+        """Drops a single entry after it has been deleted from storage."""
+        with self._lock:
+            entry = self._entries.pop(site, None)
+            if entry is not None:
+                self._zero(entry)
+                self._view = None
+                if self._index is not None:
+                    self._index.remove(site)
+
+    @staticmethod
+    def _zero(entry):
+        """Overwrites the buffers of one cached entry with zero bytes."""
+        for buffer in entry:
+            buffer[:] = bytes(len(buffer))
+
+    def wipe(self):
+        """Zeroes and drops every cached credential."""
+        with self._lock:
+            for site in list(self._entries):
+                self.remove(site)
+            self._view = None
+            self._index = None
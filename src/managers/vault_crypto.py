@@ -0,0 +1,260 @@
+# Authenticated encryption for vault records and streams
+#
+# Records are sealed with AES-GCM under a fresh random nonce. The owner and
+# entry name are bound in as associated data, so a record copied into another
+# user's vault or under another site name fails to decrypt. There is no
+# fallback to unauthenticated AES-CBC: a record that fails authentication is
+# rejected, never decrypted some other way.
+#
+# Streams are split into fixed-size segments, each sealed on its own with a
+# nonce made from a random prefix, the segment number and a final-segment
+# flag. Only one segment is held in memory at a time, and reordered,
+# dropped or truncated segments are all detected.
+
+import io
+import os
+import struct
+from Crypto.Cipher import AES
+
+RECORD_VERSION = 2
+STREAM_VERSION = 3
+NONCE_SIZE = 12
+TAG_SIZE = 16
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+STREAM_HEADER = struct.Struct(">BI7s")  # version, segment size, nonce prefix
+SEGMENT_NONCE = struct.Struct(">7sIB")  # nonce prefix, segment number, final flag
+MAX_SEGMENTS = 2 ** 32
+
+
+class VaultCryptoError(ValueError):
+    ''' Raised when data cannot be decrypted or fails authentication '''
+    pass
+
+
+def _associated_data(owner, name):
+    return f"{owner}\x00{name}".encode()
+
+
+def seal(key, data, owner, name=""):
+    """
+    Encrypts one record.
+
+    Returns:
+    bytes: version byte, nonce, ciphertext and tag.
+    """
+    nonce = os.urandom(NONCE_SIZE)
+    cipher = AES.new(key, AES.MODE_GCM, nonce=nonce)
+    cipher.update(_associated_data(owner, name))
+    ciphertext, tag = cipher.encrypt_and_digest(data)
+    return bytes((RECORD_VERSION,)) + nonce + ciphertext + tag
+
+
+def open_sealed(key, data, owner, name=""):
+    """
+    Decrypts one record sealed by seal.
+
+    Raises:
+    VaultCryptoError: If the record is damaged, was sealed for another
+    owner or name, or the key is wrong.
+    """
+    data = memoryview(data)
+    if len(data) >= 1 + NONCE_SIZE + TAG_SIZE and data[0] == RECORD_VERSION:
+        cipher = AES.new(key, AES.MODE_GCM, nonce=data[1:1 + NONCE_SIZE])
+        cipher.update(_associated_data(owner, name))
+        try:
+            return cipher.decrypt_and_verify(data[1 + NONCE_SIZE:-TAG_SIZE], data[-TAG_SIZE:])
+        except ValueError:
+            pass
+    raise VaultCryptoError(f"Unable to decrypt {name or owner}: wrong key or damaged data.")
+
+
+class StreamSealer:
+    """
+    Incremental encryptor behind encrypt_chunks and EncryptingWriter.
+
+    Plaintext is fed in pieces of any size; every completed segment is
+    returned sealed, and finish() seals whatever is left as the final one.
+    """
+
+    def __init__(self, key, owner, name="", chunk_size=DEFAULT_CHUNK_SIZE):
+        self._key = key
+        self._prefix = os.urandom(7)
+        self.chunk_size = chunk_size
+        self.header = STREAM_HEADER.pack(STREAM_VERSION, chunk_size, self._prefix)
+        self._associated = self.header + _associated_data(owner, name)
+        self._buffer = bytearray()
+        self._number = 0
+
+    def _seal(self, segment, final):
+        nonce = SEGMENT_NONCE.pack(self._prefix, self._number, final)
+        cipher = AES.new(self._key, AES.MODE_GCM, nonce=nonce)
+        cipher.update(self._associated)
+        ciphertext, tag = cipher.encrypt_and_digest(segment)
+        self._number += 1
+        return ciphertext + tag
+
+    def feed(self, data):
+        """Returns the sealed segments completed by data."""
+        self._buffer += data
+        sealed = []
+        # Keep at least one byte back so the final segment is never empty
+        # unless the whole stream is
+        while len(self._buffer) > self.chunk_size:
+            if self._number == MAX_SEGMENTS - 1:
+                raise VaultCryptoError("Stream is too long.")
+            sealed.append(self._seal(bytes(self._buffer[:self.chunk_size]), 0))
+            del self._buffer[:self.chunk_size]
+        return sealed
+
+    def finish(self):
+        """Returns the sealed final segment."""
+        segment = bytes(self._buffer)
+        self._buffer.clear()
+        return self._seal(segment, 1)
+
+
+def encrypt_chunks(key, chunks, owner, name="", chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Encrypts a stream of byte chunks, yielding the encrypted stream piece by piece.
+
+    Args:
+    key (bytes): The AES key.
+    chunks (iterable): Plaintext pieces of any size.
+    owner, name (str): Bound into every segment, as for records.
+    chunk_size (int): Plaintext bytes per sealed segment.
+    """
+    sealer = StreamSealer(key, owner, name, chunk_size)
+    yield sealer.header
+    for chunk in chunks:
+        yield from sealer.feed(chunk)
+    yield sealer.finish()
+
+
+def decrypt_chunks(key, chunks, owner, name=""):
+    """
+    Decrypts a stream made by encrypt_chunks, yielding each segment once it
+    has been authenticated.
+
+    Raises:
+    VaultCryptoError: If the stream is damaged, truncated or sealed for another owner or name.
+    """
+    buffer = bytearray()
+    chunks = iter(chunks)
+
+    def fill(size):
+        # Read until the buffer holds size bytes or the input ends
+        while len(buffer) < size:
+            chunk = next(chunks, None)
+            if chunk is None:
+                return False
+            buffer.extend(chunk)
+        return True
+
+    if not fill(STREAM_HEADER.size):
+        raise VaultCryptoError("Encrypted stream is truncated.")
+    header = bytes(buffer[:STREAM_HEADER.size])
+    del buffer[:STREAM_HEADER.size]
+    version, chunk_size, prefix = STREAM_HEADER.unpack(header)
+    if version != STREAM_VERSION or chunk_size == 0:
+        raise VaultCryptoError("Not an encrypted vault stream.")
+    associated = header + _associated_data(owner, name)
+    segment_size = chunk_size + TAG_SIZE
+
+    number = 0
+    while True:
+        # A full segment followed by more data cannot be the last one
+        final = not fill(segment_size + 1)
+        segment = bytes(buffer[:segment_size])
+        del buffer[:segment_size]
+        if len(segment) < TAG_SIZE:
+            raise VaultCryptoError("Encrypted stream is truncated.")
+        cipher = AES.new(key, AES.MODE_GCM, nonce=SEGMENT_NONCE.pack(prefix, number, int(final)))
+        cipher.update(associated)
+        try:
+            plaintext = cipher.decrypt_and_verify(segment[:-TAG_SIZE], segment[-TAG_SIZE:])
+        except ValueError:
+            raise VaultCryptoError("Encrypted stream is damaged or truncated.") from None
+        yield plaintext
+        if final:
+            return
+        number += 1
+
+
+def _read_chunks(file, size=DEFAULT_CHUNK_SIZE):
+    return iter(lambda: file.read(size), b"")
+
+
+def encrypt_stream(key, source, dest, owner, name="", chunk_size=DEFAULT_CHUNK_SIZE):
+    """Encrypts the binary file object source into dest, one segment at a time."""
+    for piece in encrypt_chunks(key, _read_chunks(source, chunk_size), owner, name, chunk_size):
+        dest.write(piece)
+
+
+def decrypt_stream(key, source, dest, owner, name=""):
+    """Decrypts the binary file object source into dest, one segment at a time."""
+    for piece in decrypt_chunks(key, _read_chunks(source), owner, name):
+        dest.write(piece)
+
+
+class DecryptingReader(io.RawIOBase):
+    """
+    Read-only binary file over an encrypted stream, for wrapping in
+    io.TextIOWrapper (e.g. to read an encrypted CSV row by row).
+    """
+
+    def __init__(self, key, source, owner, name=""):
+        self._pieces = decrypt_chunks(key, _read_chunks(source), owner, name)
+        self._pending = b""
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while not self._pending:
+            self._pending = next(self._pieces, None)
+            if self._pending is None:
+                self._pending = b""
+                return 0
+        size = min(len(buffer), len(self._pending))
+        buffer[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        return size
+
+
+class EncryptingWriter(io.RawIOBase):
+    """
+    Write-only binary file that encrypts into dest as data arrives. The
+    final segment is written when the writer is closed, unless abort() was
+    called first.
+    """
+
+    def __init__(self, key, dest, owner, name="", chunk_size=DEFAULT_CHUNK_SIZE):
+        self._dest = dest
+        self._sealer = StreamSealer(key, owner, name, chunk_size)
+        self._aborted = False
+        dest.write(self._sealer.header)
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        if self._aborted:
+            return len(data)  # Dropped; see abort
+        for segment in self._sealer.feed(data):
+            self._dest.write(segment)
+        return len(data)
+
+    def abort(self):
+        """
+        Gives up on the stream: data still buffered or written later is
+        dropped and no final segment is written, so the stream can never
+        decrypt as complete. Wrappers can still be closed normally.
+        """
+        self._aborted = True
+        self._sealer = None
+
+    def close(self):
+        if not self.closed and not self._aborted:
+            self._dest.write(self._sealer.finish())
+        super().close()
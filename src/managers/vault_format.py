@@ -0,0 +1,118 @@
+# Binary serialization for vault records
+# Replaces the str(dict) / eval() round trip with length-prefixed records
+
+import struct
+import zlib
+
+MAGIC = b"PMV"
+VERSION = 1
+FLAG_COMPRESSED = 0x01
+
+# Bodies smaller than this are never worth compressing
+COMPRESS_THRESHOLD = 256
+
+HEADER = struct.Struct(">3sBB")  # magic, version, flags
+LENGTH = struct.Struct(">I")  # prefix used for both records and fields
+
+
+class VaultFormatError(ValueError):
+    ''' Raised when a blob is not a valid vault record stream '''
+    pass
+
+
+def encode_records(records, compress=True):
+    """
+    Serializes records into a versioned binary blob.
+
+    Args:
+    records (iterable): Tuples of strings, one tuple per record.
+    compress (bool): Compress the body with zlib when it makes it smaller.
+
+    Returns:
+    bytes: The header followed by the length-prefixed records.
+    """
+    body = bytearray()
+    for fields in records:
+        payload = bytearray()
+        for field in fields:
+            data = field.encode()
+            payload += LENGTH.pack(len(data))
+            payload += data
+        body += LENGTH.pack(len(payload))
+        body += payload
+
+    flags = 0
+    if compress and len(body) >= COMPRESS_THRESHOLD:
+        packed = zlib.compress(body)
+        if len(packed) < len(body):
+            body = packed
+            flags |= FLAG_COMPRESSED
+
+    return HEADER.pack(MAGIC, VERSION, flags) + bytes(body)
+
+
+class VaultReader:
+    """
+    Lazily decodes a binary record blob.
+
+    Records are only split into fields, and fields only decoded into strings,
+    as the caller iterates over them.
+    """
+
+    def __init__(self, data):
+        if len(data) < HEADER.size:
+            raise VaultFormatError("Vault data is truncated.")
+        magic, version, flags = HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise VaultFormatError("Vault data has an unknown format.")
+        if version != VERSION:
+            raise VaultFormatError(f"Unsupported vault format version: {version}")
+
+        body = memoryview(data)[HEADER.size:]
+        if flags & FLAG_COMPRESSED:
+            try:
+                body = memoryview(zlib.decompress(body))
+            except zlib.error as e:
+                raise VaultFormatError(f"Vault data does not decompress: {e}") from e
+        self._body = body
+
+    def iter_raw(self):
+        """Yields each record as a tuple of undecoded memoryview fields."""
+        body = self._body
+        offset = 0
+        end = len(body)
+        while offset < end:
+            if offset + LENGTH.size > end:
+                raise VaultFormatError("Vault record header is truncated.")
+            (size,) = LENGTH.unpack_from(body, offset)
+            offset += LENGTH.size
+            record_end = offset + size
+            if record_end > end:
+                raise VaultFormatError("Vault record is truncated.")
+
+            fields = []
+            while offset < record_end:
+                if offset + LENGTH.size > record_end:
+                    raise VaultFormatError("Vault field header overruns the record.")
+                (length,) = LENGTH.unpack_from(body, offset)
+                offset += LENGTH.size
+                if offset + length > record_end:
+                    raise VaultFormatError("Vault field overruns the record.")
+                fields.append(body[offset:offset + length])
+                offset += length
+            yield tuple(fields)
+
+    def __iter__(self):
+        """Yields each record as a tuple of strings."""
+        for fields in self.iter_raw():
+            try:
+                record = tuple(str(field, 'utf-8') for field in fields)
+            except UnicodeDecodeError as e:
+                raise VaultFormatError(f"Vault field is not valid UTF-8: {e}") from e
+            yield record
+
+    def first(self):
+        """Returns the first record, decoding nothing beyond it."""
+        for record in self:
+            return record
+        raise VaultFormatError("Vault data holds no records.")
@@ -0,0 +1,116 @@
+# Vault encryption keys derived from the master password
+#
+# The key is derived with Argon2id once, when the user logs in, and kept in a
+# process-wide registry for the rest of the session. Every PasswordManager
+# reads the same key from here, so data written by one instance can be read
+# by any other, and again after a restart.
+
+import base64
+import json
+import os
+import threading
+from argon2.low_level import Type, hash_secret_raw
+from managers.argon2_tuning import get_password_hasher
+from managers.storage_backends import StorageError, get_backend
+
+KDF_NAME = "kdf"  # backend entry holding the user's salt and KDF parameters
+KEY_SIZE = 32  # AES-256
+SALT_SIZE = 16
+
+
+class VaultLockedError(ValueError):
+    ''' Raised when a vault is used before its owner has logged in '''
+    pass
+
+
+# Username -> derived key, as a bytearray so it can be zeroed on lock
+_session_keys = {}
+_session_keys_lock = threading.Lock()
+
+
+def _load_kdf_parameters(username, backend):
+    """
+    Returns the user's salt and KDF parameters, creating them on first use.
+
+    Parameters are fixed when the salt is created, so re-calibrating Argon2
+    for login hashes never changes an existing vault key.
+    """
+    try:
+        stored = backend.get(username, KDF_NAME)
+        if stored is not None:
+            parameters = json.loads(stored.decode())
+            parameters["salt"] = base64.b64decode(parameters["salt"])
+            return parameters
+
+        hasher = get_password_hasher()
+        parameters = {
+            "salt": os.urandom(SALT_SIZE),
+            "time_cost": hasher.time_cost,
+            "memory_cost": hasher.memory_cost,
+            "parallelism": hasher.parallelism,
+        }
+        stored = dict(parameters, salt=base64.b64encode(parameters["salt"]).decode())
+        backend.set(username, KDF_NAME, json.dumps(stored).encode())
+        return parameters
+    except StorageError as e:
+        raise IOError(f"Storage error while loading key parameters: {e}") from e
+
+
+def derive_key(password, parameters):
+    """Derives the vault key for a master password with Argon2id."""
+    return hash_secret_raw(
+        secret=password.encode(),
+        salt=parameters["salt"],
+        time_cost=parameters["time_cost"],
+        memory_cost=parameters["memory_cost"],
+        parallelism=parameters["parallelism"],
+        hash_len=KEY_SIZE,
+        type=Type.ID,
+    )
+
+
+def unlock(username, password, backend=None):
+    """
+    Derives the user's vault key and keeps it for the session.
+
+    Only call this once the master password has been verified: a wrong
+    password derives a key that simply cannot decrypt the vault.
+    """
+    key = bytearray(derive_key(password, _load_kdf_parameters(username, backend or get_backend())))
+    with _session_keys_lock:
+        old = _session_keys.get(username)
+        _session_keys[username] = key
+    if old is not None:
+        old[:] = bytes(len(old))
+
+
+def is_unlocked(username):
+    """Returns True if the user's vault key is held for this session."""
+    return username in _session_keys
+
+
+def get_session_key(username):
+    """
+    Returns the user's vault key.
+
+    Raises:
+    VaultLockedError: If the user has not logged in this session.
+    """
+    key = _session_keys.get(username)
+    if key is None:
+        raise VaultLockedError(f"The vault for '{username}' is locked. Please log in first.")
+    return bytes(key)
+
+
+def lock(username):
+    """Zeroes and forgets the user's vault key."""
+    with _session_keys_lock:
+        key = _session_keys.pop(username, None)
+    if key is not None:
+        key[:] = bytes(len(key))
+
+
+def lock_all():
+    """Zeroes and forgets every vault key."""
+    for username in list(_session_keys):
+        lock(username)
@@ -1,9 +1,21 @@
 # Initialise the frame modules
+# Each page module is only imported when its page is first used
+import importlib
 
-from .startFrame import StartPage
-from .loginFrame import LoginPage
-from .registerFrame import RegisterPage
-from .passwordFrame import PasswordsPage
+_EXPORTS = {
+    'StartPage': '.startFrame',
+    'LoginPage': '.loginFrame',
+    'RegisterPage': '.registerFrame',
+    'PasswordsPage': '.passwordFrame',
+}
+
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 ## Export the classes
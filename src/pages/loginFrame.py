@@ -1,13 +1,16 @@
 # A simple login frame for the application
 import tkinter as tk
 from tkinter import ttk
-from managers.login_manager import LoginManager, PasswordManagerError
+from managers import vault_keys
+from managers.login_manager import PasswordManagerError
+from pages.qrRenderer import ProvisioningImages
+from taskScheduler import PRIORITY_USER
 
 class LoginPage(tk.Frame):
     def __init__(self, parent, controller):
         tk.Frame.__init__(self, parent)
         self.controller = controller
-        self.login_manager = LoginManager()
+        self.login_manager = controller.login_manager
 
         label = ttk.Label(self, text="Login", font=controller.title_font)
         label.pack(side="top", fill="x", pady=10)
@@ -29,22 +32,90 @@ class LoginPage(tk.Frame):
         self.otp_entry_label.pack()
         self.otp_entry.pack()
 
-        login_button = ttk.Button(self, text="Login", command=self.login)
-        login_button.pack()
+        self.login_button = ttk.Button(self, text="Login", command=self.login)
+        self.login_button.pack()
 
         back_button = ttk.Button(self, text="Back",
                                 command=lambda: controller.show_frame("StartPage"))
         back_button.pack()
 
+        # Shown when an account from before OTP secrets were stored enrolls one
+        self.qr_images = ProvisioningImages(self)
+        self.enroll_label = ttk.Label(self, text="", wraplength=300)
+        self.enroll_label.pack(pady=5)
+        self.qr_image_label = tk.Label(self)
+        self.qr_image_label.pack(pady=10)
+
+    def on_show(self):
+        """Drops any enrollment QR code from a previous visit to this screen."""
+        self.qr_images.clear()
+        self.qr_image = None
+        self.qr_image_label.config(image="")
+        self.enroll_label.config(text="")
+
     def login(self):
         username = self.username_entry.get()
         password = self.password_entry.get()
         otp = self.otp_entry.get()
         try:
-            self.login_manager.login(username, password)
-            self.login_manager.verify_otp(otp)
+            # Argon2 verification runs on the login pool; the page stays responsive
+            self.login_manager.login_async(
+                username, password,
+                callback=lambda future: self._password_checked(future, username, otp),
+                dispatch=self.controller.dispatch,
+                block=False,
+            )
+            self.login_button.state(["disabled"])
+        except PasswordManagerError as e:
+            self.controller.handle_error(e)
+
+    def _password_checked(self, future, username, otp):
+        """Runs on the Tk thread once the password has been verified."""
+        try:
+            if not future.result():
+                raise PasswordManagerError("Incorrect username or password.")
+        except Exception as e:
+            self.login_button.state(["!disabled"])
+            self.controller.handle_error(e)
+            return
+        # The OTP check reads storage, so it runs on a worker too
+        self.controller.scheduler.submit(
+            self._check_otp, username, otp,
+            priority=PRIORITY_USER,
+            callback=lambda task: self._login_done(task, username),
+        )
+
+    def _check_otp(self, username, otp):
+        """
+        Runs on a worker thread; must not touch Tk.
+        Returns None once logged in, or the provisioning URI of a newly
+        enrolled OTP secret for an account that had none.
+        """
+        try:
+            if not self.login_manager.has_otp(username):
+                secret = self.login_manager.create_otp_secret(username)
+                vault_keys.lock(username)  # Opened only once a code from the new secret is entered
+                return self.login_manager.otp_provisioning_uri(username, secret)
+            self.login_manager.verify_otp(username, otp)
+        except Exception:
+            # The password alone must not leave the vault open
+            vault_keys.lock(username)
+            raise
+        return None
+
+    def _login_done(self, task, username):
+        self.login_button.state(["!disabled"])
+        try:
+            enrollment_uri = task.result()
+            if enrollment_uri is not None:
+                self.qr_image = self.qr_images.get(enrollment_uri)
+                self.qr_image_label.config(image=self.qr_image)
+                self.enroll_label.config(text="Your account has no OTP yet. Scan this QR code with an "
+                                              "authentication app, then log in again with a code from it.")
+                return
+            self.controller.shared_data["username"] = username
             self.controller.show_frame("PasswordsPage")  # Navigate on success
         except PasswordManagerError as e:
             self.controller.handle_error(e)  # Display a known error
         except Exception as e:
-            self.controller.handle_error(e)
\ No newline at end of file
+            self.controller.handle_error(e)
@@ -1,9 +1,7 @@
 import tkinter as tk
 from tkinter import ttk
-from PIL import Image, ImageTk
 import pyotp
-import qrcode
-import os
+from pages.qrRenderer import ProvisioningImages
 
 class OTPApp(tk.Tk):
     def __init__(self):
@@ -13,6 +11,9 @@ class OTPApp(tk.Tk):
         
         # Secret key storage
         self.secret_key = None
+
+        # QR codes shown in this window, cached per secret
+        self.qr_images = ProvisioningImages(self)
         
         # Username input
         self.label_username = ttk.Label(self, text="Enter Username:")
@@ -53,20 +54,8 @@ class OTPApp(tk.Tk):
         # Create a URL for the QR code (compatible with most authenticator apps)
         otp_uri = totp.provisioning_uri(name=username, issuer_name="PassManApp")
         
-        # Generate QR Code
-        qr = qrcode.QRCode(version=1, box_size=10, border=5)
-        qr.add_data(otp_uri)
-        qr.make(fit=True)
-        
-        # Save the QR Code as an image
-        qr_image_path = "otp_qr_code.png"
-        qr_image = qr.make_image(fill="black", back_color="white")
-        qr_image.save(qr_image_path)
-        
-        # Display the QR code in the application
-        img = Image.open(qr_image_path)
-        img = img.resize((200, 200), Image.LANCZOS)
-        self.qr_image = ImageTk.PhotoImage(img)
+        # Rendered in memory at display size; nothing is written to disk
+        self.qr_image = self.qr_images.get(otp_uri)
         self.qr_image_label.config(image=self.qr_image)
         
         # Display OTP for testing (optional)
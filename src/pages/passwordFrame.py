@@ -1,9 +1,16 @@
 # The frame to manage passwords
 
 import tkinter as tk
+from itertools import islice
 from tkinter import ttk, simpledialog, messagebox
-from managers.password_manager import PasswordManager
-from managers.login_manager import LoginManager
+from managers import vault_keys
+from managers.password_generator import PasswordGeneration
+from taskScheduler import PRIORITY_USER
+
+VISIBLE_ROWS = 15  # Height of the list, in rows
+BUFFER_ROWS = 10  # Rows kept in the Treeview above and below the visible ones
+WINDOW_ROWS = VISIBLE_ROWS + 2 * BUFFER_ROWS
+RENDER_CHUNK = 2000  # Entries taken into the list per after() tick
 
 class PasswordsPage(tk.Frame):
     """
@@ -20,13 +27,36 @@ class PasswordsPage(tk.Frame):
     def __init__(self, parent, controller):
         tk.Frame.__init__(self, parent)
         self.controller = controller
-        self.password_manager = PasswordManager()
-        self.login_manager = LoginManager()
+        self.password_manager = controller.password_manager
+        self.login_manager = controller.login_manager
 
         label = ttk.Label(self, text="Passwords", font=controller.title_font)
         label.pack(side="top", fill="x", pady=10)
 
-        self.password_list = ttk.Treeview(self)
+        # Filter box, searched through the vault's in-memory index
+        filter_label = ttk.Label(self, text="Search:")
+        filter_label.pack()
+        self.filter_var = tk.StringVar()
+        self.filter_entry = ttk.Entry(self, textvariable=self.filter_var)
+        self.filter_entry.pack()
+        self.filter_var.trace_add("write", lambda *args: self.update_password_list())
+
+        # Only a window of the list lives in the Treeview; the scrollbar and
+        # mouse wheel move through self._sites and the window follows
+        self._sites = []  # Sites in display order
+        self._entries = {}  # Site -> (username, password)
+        self._shown = []  # Values of the Treeview rows, one per slot
+        self._start = 0  # Position of the first row in the Treeview
+        self._top = 0  # Position of the first visible row
+        self._selected = None  # Site of the selected row, kept while it is scrolled out
+        self._generation = 0  # Bumped on every reload so stale chunks stop
+        self._loading = None  # after() id of the next chunk
+        self._fetch = None  # Scheduler task loading the entries
+
+        list_frame = ttk.Frame(self)
+        list_frame.pack()
+        self.password_list = ttk.Treeview(list_frame, height=VISIBLE_ROWS, selectmode="browse",
+                                          yscrollcommand=self._on_tree_scroll)
         self.password_list["columns"] = ("Website", "Username", "Password")
         self.password_list.column("#0", width=0, stretch=tk.NO)
         self.password_list.column("Website", anchor=tk.W, width=100)
@@ -36,16 +66,14 @@ class PasswordsPage(tk.Frame):
         self.password_list.heading("Website", text="Website", anchor=tk.W)
         self.password_list.heading("Username", text="Username", anchor=tk.W)
         self.password_list.heading("Password", text="Password", anchor=tk.W)
-        self.password_list.pack()
-
-        self.userpin = self.controller.shared_data.get("userpin")
-
-        if not self.userpin:
-            messagebox.showerror("Error", "Userpin is not available. Please log in first.")
-            controller.show_frame("LoginPage")
-            return
+        self.password_list.pack(side="left")
+        self.password_list.bind("<<TreeviewSelect>>", self._on_select)
+        self.password_list.bind("<MouseWheel>", self._on_wheel)
+        self.password_list.bind("<Button-4>", self._on_wheel)
+        self.password_list.bind("<Button-5>", self._on_wheel)
 
-        self.update_password_list()
+        self.scrollbar = ttk.Scrollbar(list_frame, orient="vertical", command=self._on_scrollbar)
+        self.scrollbar.pack(side="right", fill="y")
 
         add_button = ttk.Button(self, text="Add Password", command=self.add_password)
         add_button.pack()
@@ -53,21 +81,157 @@ class PasswordsPage(tk.Frame):
         delete_button = ttk.Button(self, text="Delete Password", command=self.delete_password)
         delete_button.pack()
 
-        back_button = ttk.Button(self, text="Back", command=lambda: controller.show_frame("StartPage"))
-        back_button.pack()
+        logout_button = ttk.Button(self, text="Log Out", command=controller.logout)
+        logout_button.pack()
+
+    @property
+    def username(self):
+        """The logged in user, whose vault this page shows."""
+        return self.controller.shared_data.get("username")
+
+    def on_show(self):
+        """Reloads the list when the page is shown, or sends the user to log in."""
+        if not self.username or not vault_keys.is_unlocked(self.username):
+            messagebox.showerror("Error", "Your vault is locked. Please log in first.")
+            self.controller.show_frame("LoginPage")
+            return
+        self.update_password_list()
 
     def update_password_list(self):
         """
-        Updates the password list with the current passwords
+        Updates the password list with the current passwords, or only the
+        ones matching the filter box
+
+        The vault is read on the controller's scheduler, then entries are
+        taken into the list RENDER_CHUNK at a time through
+        after(), so a large vault never blocks the window; rows already on
+        screen are only touched if their values changed.
         """
-        self.password_list.delete(*self.password_list.get_children())  # Clear existing entries
+        self._generation += 1
+        if self._loading is not None:
+            self.after_cancel(self._loading)
+            self._loading = None
+        if self._fetch is not None:
+            self._fetch.cancel()  # Superseded by this search
 
+        generation = self._generation
+        self._fetch = self.controller.scheduler.submit(
+            self._fetch_passwords, self.username, self.filter_var.get().strip(),
+            callback=lambda task: self._fetched(task, generation),
+        )
+
+    def _fetch_passwords(self, owner, query):
+        """Runs on a worker thread; must not touch Tk."""
+        if query:
+            # Fall back to fuzzy matching when nothing contains the query
+            passwords = self.password_manager.search(owner, query, limit=None)
+            if not passwords:
+                passwords = self.password_manager.search(owner, query, mode="fuzzy")
+            return passwords
+        return self.password_manager.get_passwords(owner)
+
+    def _fetched(self, task, generation):
+        self._fetch = None
+        if generation != self._generation:
+            return
         try:
-            passwords = self.password_manager.get_passwords(self.userpin)
-            for site, credentials in passwords.items():
-                self.password_list.insert("", "end", text="", values=(site, credentials["username"], credentials["password"]))
+            passwords = task.result()
         except Exception as e:
             messagebox.showerror("Error", f"Unable to load passwords: {e}")
+            return
+
+        self._sites = []
+        self._entries = {}
+        self._start = self._top = 0
+        self._load_chunk(iter(passwords.items()), generation)
+
+    def _load_chunk(self, items, generation):
+        """Takes the next RENDER_CHUNK entries into the list and schedules the rest."""
+        self._loading = None
+        if generation != self._generation:
+            return
+        taken = 0
+        for site, credentials in islice(items, RENDER_CHUNK):
+            taken += 1
+            if site not in self._entries:  # May have been added while loading
+                self._sites.append(site)
+            self._entries[site] = (credentials["username"], credentials["password"])
+        if taken == RENDER_CHUNK:
+            self._loading = self.after(1, self._load_chunk, items, generation)
+        self._render()
+        self._update_scrollbar()
+
+    def _render(self):
+        """
+        Brings the Treeview rows in line with the window of the list starting
+        at self._start, inserting, updating or deleting single rows.
+        """
+        tree = self.password_list
+        rows = [(site,) + self._entries[site] for site in self._sites[self._start:self._start + WINDOW_ROWS]]
+        for slot, values in enumerate(rows):
+            if slot >= len(self._shown):
+                tree.insert("", "end", iid=str(slot), text="", values=values)
+            elif self._shown[slot] != values:
+                tree.item(str(slot), values=values)
+        for slot in range(len(rows), len(self._shown)):
+            tree.delete(str(slot))
+        self._shown = rows
+
+        # Rows are reused as the window moves, so follow the selected site
+        slot = next((slot for slot, values in enumerate(rows) if values[0] == self._selected), None)
+        if slot is None:
+            if tree.selection():
+                tree.selection_set(())
+        elif tree.selection() != (str(slot),):
+            tree.selection_set(str(slot))
+        if rows:
+            tree.yview_moveto((self._top - self._start) / len(rows))
+
+    def _scroll_to(self, top):
+        """Scrolls the list so the row at position top is the first visible one."""
+        self._top = max(0, min(top, len(self._sites) - VISIBLE_ROWS))
+        end = self._start + len(self._shown)
+        if self._top < self._start or (self._top + VISIBLE_ROWS > end and end < len(self._sites)):
+            # Left the buffered window: move it, centred on the visible rows
+            self._start = max(0, self._top - BUFFER_ROWS)
+            self._render()
+        elif self._shown:
+            self.password_list.yview_moveto((self._top - self._start) / len(self._shown))
+        self._update_scrollbar()
+
+    def _update_scrollbar(self):
+        total = len(self._sites)
+        if total <= VISIBLE_ROWS:
+            self.scrollbar.set(0, 1)
+        else:
+            self.scrollbar.set(self._top / total, (self._top + VISIBLE_ROWS) / total)
+
+    def _on_scrollbar(self, action, amount, unit=None):
+        if action == "moveto":
+            self._scroll_to(int(float(amount) * len(self._sites)))
+        elif action == "scroll":
+            step = VISIBLE_ROWS if unit == "pages" else 1
+            self._scroll_to(self._top + int(amount) * step)
+
+    def _on_wheel(self, event):
+        if event.num == 4 or event.delta > 0:
+            self._scroll_to(self._top - 3)
+        else:
+            self._scroll_to(self._top + 3)
+        return "break"
+
+    def _on_tree_scroll(self, first, last):
+        """Follows scrolling done by the Treeview itself, e.g. moving the selection with the arrow keys."""
+        if not self._shown:
+            return
+        top = self._start + round(float(first) * len(self._shown))
+        if top != self._top:
+            self.after_idle(self._scroll_to, top)
+
+    def _on_select(self, event):
+        selection = self.password_list.selection()
+        if selection:
+            self._selected = self._shown[int(selection[0])][0]
 
     def add_password(self):
         """
@@ -75,31 +239,64 @@ class PasswordsPage(tk.Frame):
         """
         website = simpledialog.askstring("Website", "Enter the website")
         username = simpledialog.askstring("Username", "Enter the username")
-        password = simpledialog.askstring("Password", "Enter the password")
+        password = simpledialog.askstring("Password", "Enter the password, or leave it empty to generate one")
+        if password == "" and website:
+            # Generated to the site's own policy when it has one
+            password = PasswordGeneration.for_site(website).generate_secure_password()
 
         if not all([website, username, password]):
             messagebox.showerror("Error", "All fields are required.")
             return
 
+        self.controller.scheduler.submit(
+            self.password_manager.add_password, self.username, website, username, password,
+            priority=PRIORITY_USER,
+            callback=lambda task: self._added(task, website, username, password),
+        )
+
+    def _added(self, task, website, username, password):
         try:
-            self.password_manager.add_password(self.userpin, website, username, password)
-            self.update_password_list()
+            task.result()
         except Exception as e:
             messagebox.showerror("Error", f"Unable to add password: {e}")
+            return
+
+        if self.filter_var.get().strip():
+            # The new entry may or may not match the search, so search again
+            self.update_password_list()
+            return
+        if website not in self._entries:
+            self._sites.append(website)
+        self._entries[website] = (username, password)
+        self._selected = website
+        self._scroll_to(self._sites.index(website))
+        self._render()
 
     def delete_password(self):
         """
         Deletes a password from the list
         """
-        selected = self.password_list.selection()
-        if selected:
-            item = self.password_list.item(selected)
-            website = item["values"][0]  # Website is the first value
-            username = item["values"][1]
-            try:
-                self.password_manager.delete_password(self.userpin, website)
-                self.password_list.delete(selected)
-            except Exception as e:
-                messagebox.showerror("Error", f"Unable to delete password: {e}")
-        else:
+        website = self._selected
+        if website not in self._entries:
             messagebox.showinfo("Error", "Please select a password to delete.")
+            return
+        self.controller.scheduler.submit(
+            self.password_manager.delete_password, self.username, website,
+            priority=PRIORITY_USER,
+            callback=lambda task: self._deleted(task, website),
+        )
+
+    def _deleted(self, task, website):
+        try:
+            task.result()
+        except Exception as e:
+            messagebox.showerror("Error", f"Unable to delete password: {e}")
+            return
+
+        if website in self._entries:
+            self._sites.remove(website)
+            del self._entries[website]
+        if self._selected == website:
+            self._selected = None
+        self._scroll_to(self._top)
+        self._render()
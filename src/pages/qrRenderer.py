@@ -0,0 +1,76 @@
+# In-memory QR code rendering for TOTP enrollment
+#
+# The QR matrix is drawn straight into a binary PGM image, each module an
+# exact square of whole pixels, and handed to Tk as image data. Nothing is
+# written to disk and no resampling is needed.
+
+import tkinter as tk
+
+QR_SIZE = 200  # Target width and height in pixels
+QR_BORDER = 4  # Quiet zone in modules, the minimum the QR standard allows
+
+DARK = b"\x00"
+LIGHT = b"\xff"
+
+
+def qr_matrix(data, border=QR_BORDER):
+    """
+    Returns the QR code for data as rows of booleans (True for dark),
+    including the quiet zone.
+    """
+    import qrcode  # Imported on first use: only enrollment screens need it
+
+    qr = qrcode.QRCode(border=border)
+    qr.add_data(data)
+    qr.make(fit=True)
+    return qr.get_matrix()
+
+
+def render_pgm(matrix, size=QR_SIZE):
+    """
+    Draws a QR matrix as a greyscale PGM image.
+
+    Modules are scaled by the largest whole number that fits in size, so
+    the image may be a few pixels smaller than size but is never blurred.
+
+    Returns:
+    bytes: The PGM image.
+    """
+    modules = len(matrix)
+    scale = max(1, size // modules)
+    dark, light = DARK * scale, LIGHT * scale
+    rows = [b"".join(dark if cell else light for cell in row) * scale for row in matrix]
+    width = modules * scale
+    return b"P5 %d %d 255\n" % (width, width) + b"".join(rows)
+
+
+class ProvisioningImages:
+    """
+    QR code images for TOTP provisioning URIs, kept for the life of one
+    enrollment screen.
+
+    Images are cached by URI, which carries the secret, so showing the same
+    secret again costs nothing. Call clear() when the screen is done with
+    them so no rendered secret outlives it.
+
+    Parameters:
+    master (tk.Misc): The widget the images belong to.
+    size (int): Target width and height in pixels.
+    """
+
+    def __init__(self, master, size=QR_SIZE):
+        self.master = master
+        self.size = size
+        self._images = {}
+
+    def get(self, uri):
+        """Returns the tk.PhotoImage for uri, rendering it on first use."""
+        image = self._images.get(uri)
+        if image is None:
+            image = tk.PhotoImage(master=self.master, data=render_pgm(qr_matrix(uri), self.size))
+            self._images[uri] = image
+        return image
+
+    def clear(self):
+        """Forgets every cached image."""
+        self._images.clear()
@@ -1,20 +1,21 @@
 # A page for registration of new users
 import tkinter as tk
 from tkinter import ttk
-from managers.login_manager import LoginManager
 import pyotp
-import qrcode
-from PIL import Image, ImageTk
+from pages.qrRenderer import ProvisioningImages
 
 class RegisterPage(tk.Frame):
     def __init__(self, parent, controller):
         tk.Frame.__init__(self, parent)
         self.controller = controller
-        self.login_manager = LoginManager()
+        self.login_manager = controller.login_manager
 
         # Secret key storage
         self.secret_key = None
 
+        # QR codes shown on this screen, cached per secret until it is shown again
+        self.qr_images = ProvisioningImages(self)
+
         label = ttk.Label(self, text="Register", font=controller.title_font)
         label.pack(side="top", fill="x", pady=10)
 
@@ -23,8 +24,8 @@ class RegisterPage(tk.Frame):
         self.password_entry = ttk.Entry(self, show="*")
         self.password_entry.pack()
 
-        register_button = ttk.Button(self, text="Register", command=self.register)
-        register_button.pack()
+        self.register_button = ttk.Button(self, text="Register", command=self.register)
+        self.register_button.pack()
 
         # QR Code display
         self.qr_label = ttk.Label(self, text="Scan this QR code:")
@@ -55,17 +56,49 @@ class RegisterPage(tk.Frame):
                                 command=lambda: controller.show_frame("LoginPage"))
         next_button.pack()
 
+    def on_show(self):
+        """Drops the secret and QR codes from a previous visit to this screen."""
+        self.qr_images.clear()
+        self.secret_key = None
+        self.qr_image = None
+        self.qr_image_label.config(image="")
+
     def register(self):
         username = self.username_entry.get()
         password = self.password_entry.get()
         try:
-            self.login_manager.register(username, password)
+            # Strength scoring, Argon2 hashing and the storage writes run on the login pool
+            self.login_manager.register_async(
+                username, password,
+                callback=lambda future: self._register_done(future, username),
+                dispatch=self.controller.dispatch,
+                block=False,
+            )
+            self.register_button.state(["disabled"])
+        except Exception as e:
+            self.controller.handle_error(e)
+
+    def _register_done(self, future, username):
+        self.register_button.state(["!disabled"])
+        try:
+            self.secret_key = future.result()
             self.controller.set_error_message("Registration successful!")
             self.controller.shared_data["username"] = username
-            self.controller.shared_data["userpin"] = self.login_manager.get_userpin(username)
             self.generate_qr_code()
         except Exception as e:
             self.controller.handle_error(e)
+            return
+        # The userpin is a storage read, so it is fetched off the Tk thread
+        self.controller.scheduler.submit(
+            self.login_manager.get_userpin, username,
+            callback=self._userpin_loaded,
+        )
+
+    def _userpin_loaded(self, task):
+        try:
+            self.controller.shared_data["userpin"] = task.result()
+        except Exception as e:
+            self.controller.handle_error(e)
 
     def generate_qr_code(self):
         username = self.username_entry.get()
@@ -74,30 +107,16 @@ class RegisterPage(tk.Frame):
             self.otp_label.config(text="Please enter a username!", foreground="red")
             return
 
-        # Generate a new secret key if not already done
+        # The secret is created and stored when the user registers
         if not self.secret_key:
-            self.secret_key = pyotp.random_base32()
-
-        # Create a TOTP object
-        totp = pyotp.TOTP(self.secret_key)
+            self.otp_label.config(text="Please register first.", foreground="red")
+            return
 
         # Create a URL for the QR code (compatible with most authenticator apps)
-        otp_uri = totp.provisioning_uri(name=username, issuer_name="PassMan")
-
-        # Generate QR Code
-        qr = qrcode.QRCode(version=1, box_size=10, border=5)
-        qr.add_data(otp_uri)
-        qr.make(fit=True)
-
-        # Save the QR Code as an image
-        qr_image_path = "otp_qr_code.png"
-        qr_image = qr.make_image(fill="black", back_color="white")
-        qr_image.save(qr_image_path)
-
-        # Display the QR code in the application
-        img = Image.open(qr_image_path)
-        img = img.resize((200, 200), Image.LANCZOS)
-        self.qr_image = ImageTk.PhotoImage(img)
+        otp_uri = self.login_manager.otp_provisioning_uri(username, self.secret_key)
+
+        # Rendered in memory at display size; nothing is written to disk
+        self.qr_image = self.qr_images.get(otp_uri)
         self.qr_image_label.config(image=self.qr_image)
 
         # Display OTP for testing (optional)
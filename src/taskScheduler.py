@@ -0,0 +1,169 @@
+# Background tasks for the Tk windows
+#
+# Keyring, Argon2, AES and zxcvbn calls are too slow for the Tk thread, so
+# pages hand them to a TaskScheduler instead. Tasks wait in a priority queue
+# for a small pool of worker threads; results come back to the Tk thread
+# through after() polling, where each task's callback runs. Tk itself is only
+# ever touched from the Tk thread. Argon2 logins and registrations have their
+# own bounded pool in LoginManager and report back through dispatch().
+
+import itertools
+import os
+import queue
+import threading
+import traceback
+from concurrent.futures import Future
+
+# Lower numbers run first
+PRIORITY_USER = 0  # Something the user is waiting on, e.g. logging in
+PRIORITY_DEFAULT = 1
+PRIORITY_BACKGROUND = 2  # Nice to have, e.g. the live strength meter
+
+WORKERS = min(4, os.cpu_count() or 1)
+POLL_MS = 16  # About one frame; how often results are checked for while busy
+IDLE_POLL_MS = 100  # How often callbacks handed over by other threads are checked for
+
+
+class Task(Future):
+    """
+    A Future for work queued on a TaskScheduler.
+
+    cancel() also works once the task has started: the work itself cannot be
+    interrupted, but its callback is dropped.
+    """
+
+    def __init__(self, callback=None, busy=True):
+        super().__init__()
+        self.callback = callback
+        self.busy = busy  # Counts towards the busy indicator
+        self.dropped = False
+
+    def cancel(self):
+        self.dropped = True
+        return super().cancel()
+
+
+class TaskScheduler:
+    """
+    Runs blocking calls on worker threads and delivers their results to the
+    Tk thread.
+
+    Parameters:
+    root (tk.Misc): Any widget; its after() drives result delivery.
+    workers (int): Number of worker threads, started on first use.
+    on_busy (callable): Called on the Tk thread with True when tasks above
+    PRIORITY_BACKGROUND are outstanding and False once they have all
+    finished, e.g. to show a busy indicator.
+    on_error (callable): Called on the Tk thread with any exception raised
+    by a callback.
+    """
+
+    def __init__(self, root, workers=WORKERS, on_busy=None, on_error=None):
+        self.root = root
+        self.workers = workers
+        self.on_busy = on_busy
+        self.on_error = on_error or (lambda e: traceback.print_exc())
+
+        self._queue = queue.PriorityQueue()  # (priority, sequence, task, func, args, kwargs)
+        self._sequence = itertools.count()  # Keeps equal priorities first in, first out
+        self._finished = queue.SimpleQueue()  # Finished tasks and plain callables for the Tk thread
+        self._threads = []
+        self._outstanding = 0  # Tasks submitted whose callback has not run yet
+        self._busy = 0  # Outstanding tasks that count towards the busy indicator
+        self._poll_after = None
+        self._schedule_poll(IDLE_POLL_MS)
+
+    def _start_workers(self):
+        for number in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"task-worker-{number}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _work(self):
+        while True:
+            _, _, task, func, args, kwargs = self._queue.get()
+            if task is None:  # Sent by shutdown
+                return
+            # Skips tasks cancelled while they were queued
+            if task.set_running_or_notify_cancel():
+                try:
+                    task.set_result(func(*args, **kwargs))
+                except BaseException as e:
+                    task.set_exception(e)
+            self._finished.put(task)
+
+    def submit(self, func, *args, priority=PRIORITY_DEFAULT, callback=None, **kwargs):
+        """
+        Queues func(*args, **kwargs) for a worker thread. Call from the Tk thread.
+
+        Args:
+        priority (int): One of the PRIORITY_* constants.
+        callback (callable): Called on the Tk thread with the finished Task,
+        unless the task was cancelled.
+
+        Returns:
+        Task: The queued task.
+        """
+        if not self._threads:
+            self._start_workers()
+        task = Task(callback, busy=priority < PRIORITY_BACKGROUND)
+        self._queue.put((priority, next(self._sequence), task, func, args, kwargs))
+        self._outstanding += 1
+        if self._outstanding == 1:
+            self._schedule_poll(POLL_MS)
+        if task.busy:
+            self._busy += 1
+            if self._busy == 1 and self.on_busy is not None:
+                self.on_busy(True)
+        return task
+
+    def dispatch(self, func):
+        """
+        Queues func to run on the Tk thread. Safe to call from any thread,
+        unlike Tk itself.
+        """
+        self._finished.put(func)
+
+    def _schedule_poll(self, delay):
+        if self._poll_after is not None:
+            self.root.after_cancel(self._poll_after)
+        self._poll_after = self.root.after(delay, self._poll)
+
+    def _poll(self):
+        """Runs the callbacks of every finished task, then checks again shortly."""
+        self._poll_after = None
+        while True:
+            try:
+                item = self._finished.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                if not isinstance(item, Task):
+                    item()
+                    continue
+                self._outstanding -= 1
+                if item.busy:
+                    self._busy -= 1
+                    if self._busy == 0 and self.on_busy is not None:
+                        self.on_busy(False)
+                if item.callback is not None and not item.dropped:
+                    item.callback(item)
+            except Exception as e:
+                self.on_error(e)
+
+        self._schedule_poll(POLL_MS if self._outstanding else IDLE_POLL_MS)
+
+    def shutdown(self):
+        """Cancels queued tasks and stops the workers once their current task is done."""
+        if self._poll_after is not None:
+            self.root.after_cancel(self._poll_after)
+            self._poll_after = None
+        while True:
+            try:
+                _, _, task, _, _, _ = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            task.cancel()
+        for _ in self._threads:
+            self._queue.put((float("inf"), next(self._sequence), None, None, None, None))
+        self._threads = []
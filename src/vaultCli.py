@@ -0,0 +1,246 @@
+# Command line entry point for bulk vault operations
+#
+# Usage:
+#   python vaultCli.py import --user USER [--encrypted] passwords.csv
+#   python vaultCli.py export --user USER [-o passwords.csv | --encrypt -o backup.pmv]
+#   python vaultCli.py audit (--user USER | --file dump.txt) [-o report.csv]
+#   python vaultCli.py calibrate [--target-ms 250] [--max-memory-mib 256]
+#
+# Commands that open a vault ask for the master password and a current OTP,
+# or read them from PASSMAN_MASTER_PASSWORD and PASSMAN_OTP.
+
+import argparse
+import csv
+import getpass
+import io
+import os
+import sys
+from argon2.exceptions import VerifyMismatchError
+from managers import PasswordManager, PasswordValidator
+from managers.login_manager import LoginManager, PasswordManagerError
+from managers import argon2_tuning, vault_keys
+
+# Header names used by common password manager exports
+SITE_COLUMNS = ("site", "website", "url", "name", "title")
+USERNAME_COLUMNS = ("username", "login", "user", "login_username")
+PASSWORD_COLUMNS = ("password", "login_password")
+
+
+def _pick_column(fieldnames, candidates):
+    """Returns the first header matching one of the candidate names."""
+    lookup = {name.strip().lower(): name for name in fieldnames}
+    for candidate in candidates:
+        if candidate in lookup:
+            return lookup[candidate]
+    return None
+
+
+def read_entries(file):
+    """
+    Yields (site, username, password) rows from a CSV export.
+
+    Raises:
+    ValueError: If the file has no site or password column.
+    """
+    reader = csv.DictReader(file)
+    fieldnames = reader.fieldnames or []
+    site_col = _pick_column(fieldnames, SITE_COLUMNS)
+    user_col = _pick_column(fieldnames, USERNAME_COLUMNS)
+    pass_col = _pick_column(fieldnames, PASSWORD_COLUMNS)
+    if not site_col or not pass_col:
+        raise ValueError("CSV must have a site and a password column.")
+
+    for row in reader:
+        yield row[site_col], row.get(user_col, "") if user_col else "", row[pass_col]
+
+
+def _open_output(path):
+    return open(path, 'w', newline='', encoding='utf-8') if path else sys.stdout
+
+
+def unlock_vault(username):
+    """
+    Verifies the master password and OTP, and unlocks the user's vault for
+    this run. They are read from $PASSMAN_MASTER_PASSWORD and $PASSMAN_OTP,
+    or prompted for. An account without an OTP secret enrolls one first.
+
+    Raises:
+    ValueError: If the password or OTP is wrong.
+    """
+    login_manager = LoginManager()
+    password = os.environ.get("PASSMAN_MASTER_PASSWORD") or getpass.getpass(f"Master password for {username}: ")
+    try:
+        valid = login_manager.login(username, password)
+    except (PasswordManagerError, VerifyMismatchError):
+        valid = False
+    if not valid:
+        raise ValueError("Incorrect username or master password.")
+
+    try:
+        if not login_manager.has_otp(username):
+            # Accounts registered before OTP secrets were stored enroll one now
+            secret = login_manager.create_otp_secret(username)
+            print("This account has no OTP yet. Add this to an authentication app:", file=sys.stderr)
+            print(login_manager.otp_provisioning_uri(username, secret), file=sys.stderr)
+            otp = getpass.getpass(f"OTP for {username}: ")
+        else:
+            otp = os.environ.get("PASSMAN_OTP") or getpass.getpass(f"OTP for {username}: ")
+        login_manager.verify_otp(username, otp)
+    except PasswordManagerError as e:
+        # The password alone must not leave the vault open
+        vault_keys.lock(username)
+        raise ValueError(str(e)) from e
+
+
+def import_passwords(args, manager):
+    if args.encrypted:
+        # Decrypted a segment at a time as the CSV reader consumes it
+        raw = open(args.file, 'rb')
+        file = io.TextIOWrapper(io.BufferedReader(manager.open_backup_reader(args.user, raw)), newline='', encoding='utf-8')
+    else:
+        raw = None
+        file = open(args.file, newline='', encoding='utf-8')
+    try:
+        count = manager.add_passwords_bulk(args.user, read_entries(file), overwrite=args.overwrite)
+    finally:
+        file.close()
+        if raw is not None:
+            raw.close()
+    print(f"Imported {count} passwords.", file=sys.stderr)
+
+
+def export_passwords(args, manager):
+    backup = None
+    if args.encrypt:
+        if not args.output:
+            raise ValueError("An encrypted export needs an output file (-o).")
+        raw = open(args.output, 'wb')
+        backup = manager.open_backup_writer(args.user, raw)
+        output = io.TextIOWrapper(io.BufferedWriter(backup), newline='', encoding='utf-8')
+    else:
+        raw = None
+        output = _open_output(args.output)
+    completed = False
+    try:
+        writer = csv.writer(output)
+        writer.writerow(("site", "username", "password"))
+        # Rows are written as they are decrypted
+        for entry in manager.export_passwords(args.user):
+            writer.writerow(entry)
+        completed = True
+    finally:
+        if backup is not None and not completed:
+            # Never seal a partial backup as if it were complete
+            backup.abort()
+        if output is not sys.stdout:
+            output.close()
+        if raw is not None:
+            raw.close()
+            if not completed:
+                os.remove(args.output)
+
+
+def audit_passwords(args, manager):
+    """
+    Streams a strength report for a vault or a dump with one password per line.
+    Passwords themselves are never written to the report.
+    """
+    sites = []
+    if args.file:
+        dump = open(args.file, encoding='utf-8', errors='replace')
+        passwords = (line.rstrip('\r\n') for line in dump)
+    else:
+        dump = None
+
+        def vault_passwords():
+            # Remember each site as its password is handed to the validator
+            for site, _, password in manager.export_passwords(args.user):
+                sites.append(site)
+                yield password
+        passwords = vault_passwords()
+
+    output = _open_output(args.output)
+    totals = {'strong': 0, 'weak': 0, 'invalid': 0}
+    try:
+        writer = csv.writer(output)
+        writer.writerow(("entry", "result", "suggestions"))
+        results = PasswordValidator().validate_many(passwords, workers=args.workers)
+        for number, result in enumerate(results):
+            label = sites[number] if sites else f"line {number + 1}"
+            verdict, suggestions = result if isinstance(result, tuple) else (result, "")
+            if isinstance(suggestions, (list, tuple)):
+                suggestions = " ".join(suggestions)
+            totals[verdict] += 1
+            writer.writerow((label, verdict, suggestions))
+    finally:
+        if output is not sys.stdout:
+            output.close()
+        if dump is not None:
+            dump.close()
+    print(", ".join(f"{count} {verdict}" for verdict, count in totals.items()), file=sys.stderr)
+
+
+def calibrate_argon2(args, manager):
+    """Benchmarks Argon2 on this machine and saves the parameters used for new hashes."""
+    print(f"Calibrating Argon2 for {args.target_ms} ms...", file=sys.stderr)
+    parameters = argon2_tuning.calibrate(args.target_ms, max_memory_kib=args.max_memory_mib * 1024)
+    argon2_tuning.save_parameters(parameters)
+    print(
+        f"time_cost={parameters['time_cost']} memory_cost={parameters['memory_cost']} KiB "
+        f"parallelism={parameters['parallelism']} ({parameters['measured_ms']} ms)"
+    )
+    print(f"Saved to {argon2_tuning.parameters_path()}. Existing hashes are upgraded at next login.", file=sys.stderr)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="PassMan vault bulk operations")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = commands.add_parser("import", help="Import passwords from a CSV file")
+    import_parser.add_argument("file", help="CSV file with site, username and password columns")
+    import_parser.add_argument("--user", required=True, help="Vault owner")
+    import_parser.add_argument("--overwrite", action="store_true", help="Replace existing sites")
+    import_parser.add_argument("--encrypted", action="store_true", help="The file is an encrypted export")
+    import_parser.set_defaults(handler=import_passwords)
+
+    export_parser = commands.add_parser("export", help="Export passwords as CSV")
+    export_parser.add_argument("--user", required=True, help="Vault owner")
+    export_parser.add_argument("-o", "--output", help="Output file (defaults to stdout)")
+    export_parser.add_argument("--encrypt", action="store_true", help="Encrypt the export with the vault key")
+    export_parser.set_defaults(handler=export_passwords)
+
+    audit_parser = commands.add_parser("audit", help="Report the strength of stored or dumped passwords")
+    source = audit_parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--user", help="Audit this user's vault")
+    source.add_argument("--file", help="Audit a dump with one password per line")
+    audit_parser.add_argument("-o", "--output", help="Report file (defaults to stdout)")
+    audit_parser.add_argument("--workers", type=int, help="Processes used for zxcvbn scoring")
+    audit_parser.set_defaults(handler=audit_passwords)
+
+    calibrate_parser = commands.add_parser("calibrate", help="Tune Argon2 master password hashing for this machine")
+    calibrate_parser.add_argument("--target-ms", type=float, default=argon2_tuning.DEFAULT_TARGET_MS,
+                                  help="Time one login should take")
+    calibrate_parser.add_argument("--max-memory-mib", type=int, default=argon2_tuning.DEFAULT_MAX_MEMORY_KIB // 1024,
+                                  help="Most memory one hash may use")
+    calibrate_parser.set_defaults(handler=calibrate_argon2, uses_vault=False)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        manager = None
+        if getattr(args, "uses_vault", True):
+            if args.user:
+                unlock_vault(args.user)
+            manager = PasswordManager()
+        args.handler(args, manager)
+    except (ValueError, IOError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,37 @@
+# Shared pytest setup
+# The application is run from src, so its packages are imported from there
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from managers import argon2_tuning, vault_keys  # noqa: E402
+from managers.storage_backends import FileBackend  # noqa: E402
+
+# Argon2 parameters small enough to keep key derivation out of the test time
+FAST_ARGON2 = {"time_cost": 1, "memory_cost": 8, "parallelism": 1}
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    """Points PASSMAN_DATA_DIR at an empty directory with fast Argon2 parameters."""
+    monkeypatch.setenv("PASSMAN_DATA_DIR", str(tmp_path))
+    argon2_tuning.save_parameters(FAST_ARGON2, str(tmp_path))
+    return str(tmp_path)
+
+
+@pytest.fixture
+def backend(data_dir):
+    """A file backend in the test's data directory."""
+    return FileBackend(os.path.join(data_dir, "vault"))
+
+
+@pytest.fixture
+def unlocked(backend):
+    """Unlocks the vault of user 'alice' for the test, returning the username."""
+    vault_keys.unlock("alice", "correct horse battery staple", backend)
+    yield "alice"
+    vault_keys.lock_all()
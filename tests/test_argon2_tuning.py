@@ -0,0 +1,68 @@
+# Tests for Argon2 calibration and the saved parameters
+
+import pytest
+
+from managers import argon2_tuning
+from managers.login_manager import LoginManager
+from managers.storage_backends import FileBackend
+
+
+def fake_measure(per_mib_pass):
+    """A host where one pass takes per_mib_pass ms per MiB of memory."""
+    def measure(time_cost, memory_cost, parallelism):
+        return time_cost * memory_cost / 1024 * per_mib_pass
+    return measure
+
+
+def test_calibrate_fits_the_budget(monkeypatch):
+    monkeypatch.setattr(argon2_tuning, "_measure_ms", fake_measure(1.5))
+    parameters = argon2_tuning.calibrate(target_ms=250, max_memory_kib=256 * 1024, parallelism=2)
+    # 256 MiB takes 384 ms a pass, so memory is halved once; a second pass would not fit
+    assert parameters["memory_cost"] == 128 * 1024
+    assert parameters["time_cost"] == 1
+    assert parameters["measured_ms"] <= 250
+
+    monkeypatch.setattr(argon2_tuning, "_measure_ms", fake_measure(0.1))
+    parameters = argon2_tuning.calibrate(target_ms=250, max_memory_kib=64 * 1024, parallelism=2)
+    assert parameters["memory_cost"] == 64 * 1024
+    assert parameters["time_cost"] == 39
+
+
+def test_calibrate_keeps_the_minimum_memory(monkeypatch):
+    monkeypatch.setattr(argon2_tuning, "_measure_ms", fake_measure(1000))
+    parameters = argon2_tuning.calibrate(target_ms=10)
+    assert parameters["memory_cost"] >= argon2_tuning.MIN_MEMORY_KIB
+    assert parameters["time_cost"] == 1
+    with pytest.raises(ValueError):
+        argon2_tuning.calibrate(target_ms=0)
+
+
+def test_saved_parameters_are_used(tmp_path):
+    data_dir = str(tmp_path)
+    assert argon2_tuning.load_parameters(data_dir) is None
+    assert argon2_tuning.get_password_hasher(data_dir).memory_cost > 8
+
+    parameters = {"time_cost": 2, "memory_cost": 16, "parallelism": 1}
+    argon2_tuning.save_parameters(dict(parameters, measured_ms=1.0), data_dir)
+    assert argon2_tuning.load_parameters(data_dir) == parameters
+    hasher = argon2_tuning.get_password_hasher(data_dir)
+    assert (hasher.time_cost, hasher.memory_cost) == (2, 16)
+    assert argon2_tuning.get_password_hasher(data_dir) is hasher
+
+
+def test_unreadable_parameters(tmp_path):
+    with open(argon2_tuning.parameters_path(str(tmp_path)), "w") as file:
+        file.write("{")
+    with pytest.raises(IOError):
+        argon2_tuning.load_parameters(str(tmp_path))
+
+
+def test_outdated_hashes_are_replaced_on_login(data_dir, backend):
+    LoginManager(backend).register("alice", "correct horse battery staple")
+    old_hash = backend.get("alice")
+
+    argon2_tuning.save_parameters({"time_cost": 2, "memory_cost": 16, "parallelism": 1}, data_dir)
+    manager = LoginManager(backend)
+    assert manager.login("alice", "correct horse battery staple")
+    assert backend.get("alice") != old_hash
+    assert not manager.ph.check_needs_rehash(backend.get("alice").decode())
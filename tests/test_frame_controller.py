@@ -0,0 +1,54 @@
+# Tests for the app's vault locking and idle eviction, without a display
+
+import pytest
+
+import frameController
+from frameController import PassManApp
+from managers import vault_keys
+from managers.password_manager import PasswordManager
+from taskScheduler import TaskScheduler
+from test_task_scheduler import FakeRoot
+
+
+@pytest.fixture
+def app(backend, unlocked):
+    """A PassManApp whose Tk calls go to a FakeRoot instead of a window."""
+    root = FakeRoot()
+    app = PassManApp.__new__(PassManApp)
+    app.__dict__.update(
+        after=root.after, after_cancel=root.after_cancel, destroy=lambda: None,
+        show_frame=lambda page_name: app.shown.append(page_name),
+        shared_data={"username": unlocked}, shown=[], root=root,
+        _login_manager=None, _password_manager=PasswordManager(idle_timeout=0, backend=backend),
+    )
+    app.scheduler = TaskScheduler(root, workers=1, on_error=pytest.fail)
+    app._evict_after = app.after(frameController.EVICT_MS, app._evict_idle_vaults)
+    yield app
+    app.scheduler.shutdown()
+
+
+def test_idle_vaults_are_evicted_on_a_timer(app, unlocked):
+    manager = app.password_manager
+    manager.get_passwords(unlocked)
+    assert unlocked in manager._sessions
+
+    app.root.pump(lambda: not manager._sessions)
+    assert vault_keys.is_unlocked(unlocked)
+    assert app._evict_after in app.root.pending  # Checked again later
+
+
+def test_logout_locks_the_vault(app, unlocked):
+    app.password_manager.get_passwords(unlocked)
+    app.logout()
+    assert not vault_keys.is_unlocked(unlocked)
+    assert app.password_manager._sessions == {}
+    assert "username" not in app.shared_data
+    assert app.shown == ["StartPage"]
+
+
+def test_close_locks_every_vault(app, backend, unlocked):
+    vault_keys.unlock("bob", "another horse battery staple", backend)
+    app.close()
+    assert not vault_keys.is_unlocked(unlocked)
+    assert not vault_keys.is_unlocked("bob")
+    assert app._evict_after not in app.root.pending
@@ -0,0 +1,93 @@
+# Tests for the shared password policy and the generators built on it
+
+import json
+import os
+
+import pytest
+
+from managers import generation_policy
+from managers.generation_policy import DEFAULT_POLICY, compile_policy, policy_for
+from managers.passphrase_generator import PassphraseGenerator
+from managers.password_generator import PasswordGeneration
+from managers.password_manager import PasswordManager
+from managers.validation_manager import PasswordValidator
+
+
+@pytest.fixture
+def site_policies(monkeypatch):
+    """Gives the test its own site policy registry."""
+    monkeypatch.setattr(generation_policy, "_site_policies", {})
+    monkeypatch.setattr(generation_policy, "_site_policies_loaded", True)
+
+
+def test_identical_rules_share_one_policy():
+    assert compile_policy() is DEFAULT_POLICY
+    assert compile_policy(length=20) is compile_policy(length=20)
+    assert DEFAULT_POLICY.replace(length=20) is compile_policy(length=20)
+
+
+@pytest.mark.parametrize("rules", [
+    {"colour": "red"},
+    {"upper": -1},
+    {"min_length": 20, "length": 15},
+    {"length": 4, "upper": 2, "lower": 2, "number": 1},
+    {"specials": "abc"},
+    {"num_words": 0},
+])
+def test_invalid_rules(rules):
+    with pytest.raises(ValueError):
+        compile_policy(**rules)
+
+
+@pytest.mark.parametrize("policy", [DEFAULT_POLICY, compile_policy(length=30, upper=5, special=6, specials="#!")])
+def test_generated_passwords_meet_the_policy(policy):
+    validator = PasswordValidator(policy=policy)
+    passwords = list(PasswordGeneration(policy).generate_many(600))
+    assert len(passwords) == 600
+    assert all(len(password) == policy.length for password in passwords)
+    assert all(validator.meets_policy(password) for password in passwords)
+    assert len(set(passwords)) == 600
+
+
+def test_generated_passphrases_meet_the_policy():
+    validator = PasswordValidator()
+    passphrases = list(PassphraseGenerator().generate_many(50))
+    assert len(passphrases) == 50
+    assert all(validator.meets_policy(passphrase) for passphrase in passphrases)
+
+
+def test_site_policies(site_policies):
+    policy = generation_policy.set_site_policy(" Example.COM ", min_length=20, length=24)
+    assert policy_for("example.com") is policy
+    assert generation_policy.has_site_policy("EXAMPLE.com")
+    assert policy_for("other.com") is DEFAULT_POLICY
+    assert policy_for(None) is DEFAULT_POLICY
+
+    assert len(PasswordGeneration.for_site("example.com").generate_secure_password()) == 24
+    assert PasswordValidator().for_site("other.com").policy is DEFAULT_POLICY
+
+    generation_policy.remove_site_policy("example.com")
+    assert not generation_policy.has_site_policy("example.com")
+
+
+def test_policies_file(site_policies, tmp_path):
+    with open(os.path.join(tmp_path, generation_policy.POLICIES_FILE), "w") as file:
+        json.dump({"bank.example": {"min_length": 20, "length": 24, "special": 4}}, file)
+    generation_policy.load_site_policies(str(tmp_path))
+    assert policy_for("bank.example").rules["special"] == 4
+
+    with open(os.path.join(tmp_path, generation_policy.POLICIES_FILE), "w") as file:
+        file.write("[1, 2]")
+    with pytest.raises(ValueError):
+        generation_policy.load_site_policies(str(tmp_path))
+
+
+def test_storage_enforces_site_policies(site_policies, backend, unlocked):
+    generation_policy.set_site_policy("bank.example", min_length=20, length=24)
+    manager = PasswordManager(backend=backend)
+    with pytest.raises(ValueError):
+        manager.add_password(unlocked, "bank.example", "alice", "Vq7#mK2!pLx9@Rt4")
+
+    password = PasswordGeneration.for_site("bank.example").generate_secure_password()
+    manager.add_password(unlocked, "bank.example", "alice", password)
+    assert manager.get_passwords(unlocked)["bank.example"]["password"] == password
@@ -0,0 +1,71 @@
+# Tests for storing a password from the standalone GUI, without a display
+
+import pytest
+
+import guiController
+from guiController import PasswordManagerGUI
+from managers.password_manager import PasswordManager
+from managers.validation_manager import PasswordValidator
+from taskScheduler import TaskScheduler
+from test_task_scheduler import FakeRoot
+
+
+class Field:
+    """Stands in for an Entry, Label or Text widget."""
+
+    def __init__(self, text=""):
+        self.text = text
+        self.options = {}
+
+    def get(self, *args):
+        return self.text
+
+    def config(self, **options):
+        self.options.update(options)
+
+    configure = config
+
+    def insert(self, index, text):
+        self.text += text
+
+    def delete(self, *args):
+        self.text = ""
+
+
+@pytest.fixture
+def errors(monkeypatch):
+    shown = []
+    monkeypatch.setattr(guiController.messagebox, "showerror", lambda title, message: shown.append(message))
+    return shown
+
+
+@pytest.fixture
+def gui(backend, unlocked):
+    root = FakeRoot()
+    gui = PasswordManagerGUI.__new__(PasswordManagerGUI)
+    gui.__dict__.update(
+        root=root, validator=PasswordValidator(), manager=PasswordManager(backend=backend),
+        site_entry=Field(), username_entry=Field(unlocked), password_entry=Field(),
+        status_label=Field(), suggestions_text=Field(),
+    )
+    gui.scheduler = TaskScheduler(root, workers=1, on_error=pytest.fail)
+    yield gui
+    gui.scheduler.shutdown()
+
+
+def test_store_password_saves_it_for_the_site(gui, unlocked, errors):
+    gui.site_entry.text = " example.com "
+    gui.password_entry.text = "Vq7#mK2!pLx9@Rt4"
+    gui.store_password()
+    gui.root.pump(lambda: "text" in gui.status_label.options)
+
+    assert gui.status_label.options == {"text": "Password stored.", "foreground": "green"}
+    assert gui.manager.get_passwords(unlocked) == {"example.com": {"username": "", "password": "Vq7#mK2!pLx9@Rt4"}}
+    assert errors == []
+
+
+def test_store_password_needs_a_site(gui, unlocked, errors):
+    gui.password_entry.text = "Vq7#mK2!pLx9@Rt4"
+    gui.store_password()
+    assert errors == ["Site cannot be empty."]
+    assert gui.manager.get_passwords(unlocked) == {}
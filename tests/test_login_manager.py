@@ -0,0 +1,168 @@
+# Tests for registration, login and TOTP verification
+
+import datetime
+import threading
+
+import pyotp
+import pytest
+from argon2.exceptions import VerifyMismatchError
+
+from managers import login_manager, vault_keys
+from managers.login_manager import LoginManager, PasswordManagerError
+
+PASSWORD = "correct horse battery staple"
+NOW = datetime.datetime(2026, 1, 1, 12, 0, 0)
+
+
+@pytest.fixture(autouse=True)
+def fresh_state(monkeypatch):
+    monkeypatch.setattr(login_manager, "_used_otps", login_manager.OrderedDict())
+    yield
+    vault_keys.lock_all()
+
+
+@pytest.fixture
+def manager(backend):
+    return LoginManager(backend)
+
+
+@pytest.fixture
+def secret(manager):
+    return manager.register("alice", PASSWORD)
+
+
+def code(secret, when=NOW, steps=0):
+    return pyotp.TOTP(secret).at(when + datetime.timedelta(seconds=30 * steps))
+
+
+def test_register_and_login(manager, secret):
+    assert vault_keys.is_unlocked("alice")
+    vault_keys.lock("alice")
+    with pytest.raises(VerifyMismatchError):
+        manager.login("alice", "wrong password")
+    assert not vault_keys.is_unlocked("alice")
+    assert manager.login("alice", PASSWORD)
+    assert vault_keys.is_unlocked("alice")
+
+
+def test_register_refuses_existing_username(manager, backend, secret):
+    master = backend.get("alice")
+    with pytest.raises(PasswordManagerError):
+        manager.register("alice", "another strong passphrase here")
+    assert backend.get("alice") == master
+
+
+def test_failed_registration_leaves_no_account(manager, backend, monkeypatch):
+    def fail(username):
+        raise PasswordManagerError("boom")
+    monkeypatch.setattr(manager, "create_otp_secret", fail)
+    with pytest.raises(PasswordManagerError):
+        manager.register("alice", PASSWORD)
+    assert backend.get("alice") is None
+    assert not vault_keys.is_unlocked("alice")
+
+
+def test_secret_is_sealed(manager, backend, secret):
+    assert secret.encode() not in backend.get("alice", login_manager.OTP_NAME)
+    assert manager.has_otp("alice")
+    vault_keys.lock("alice")
+    with pytest.raises(PasswordManagerError):
+        manager.verify_otp("alice", code(secret), NOW)
+
+
+@pytest.mark.parametrize("steps", [-1, 0, 1])
+def test_codes_inside_the_window(manager, secret, steps):
+    manager.verify_otp("alice", code(secret, steps=steps), NOW)
+
+
+@pytest.mark.parametrize("steps", [-3, -2, 2, 3])
+def test_codes_outside_the_window(manager, secret, steps):
+    with pytest.raises(PasswordManagerError):
+        manager.verify_otp("alice", code(secret, steps=steps), NOW)
+
+
+def test_window_is_configurable(backend, secret):
+    manager = LoginManager(backend, otp_window=0)
+    with pytest.raises(PasswordManagerError):
+        manager.verify_otp("alice", code(secret, steps=1), NOW)
+    manager.verify_otp("alice", code(secret), NOW)
+
+
+def test_codes_cannot_be_replayed(manager, secret):
+    manager.verify_otp("alice", code(secret), NOW)
+    with pytest.raises(PasswordManagerError, match="already been used"):
+        manager.verify_otp("alice", code(secret), NOW + datetime.timedelta(seconds=20))
+    # The next step's code is still accepted
+    manager.verify_otp("alice", code(secret, steps=1), NOW + datetime.timedelta(seconds=30))
+
+
+def test_replay_cache_is_bounded(manager, secret, monkeypatch):
+    monkeypatch.setattr(login_manager, "USED_OTP_LIMIT", 3)
+    for steps in range(5):
+        when = NOW + datetime.timedelta(seconds=30 * steps)
+        manager.verify_otp("alice", code(secret, when), when)
+    assert len(login_manager._used_otps) == 3
+    assert ("alice", pyotp.TOTP(secret).timecode(NOW)) not in login_manager._used_otps
+
+
+@pytest.mark.parametrize("otp", ["", None, "000000x", "12345"])
+def test_bad_codes(manager, secret, otp):
+    with pytest.raises(PasswordManagerError):
+        manager.verify_otp("alice", otp, NOW)
+
+
+def test_accounts_without_a_secret_can_enroll(manager, backend, secret):
+    backend.delete("alice", login_manager.OTP_NAME)
+    assert not manager.has_otp("alice")
+    with pytest.raises(PasswordManagerError, match="No OTP"):
+        manager.verify_otp("alice", "123456", NOW)
+
+    new_secret = manager.create_otp_secret("alice")
+    uri = manager.otp_provisioning_uri("alice", new_secret)
+    assert uri.startswith("otpauth://totp/") and f"secret={new_secret}" in uri
+    manager.verify_otp("alice", code(new_secret), NOW)
+
+
+def test_tampered_secret_is_not_re_enrolled(manager, backend, secret):
+    sealed = bytearray(backend.get("alice", login_manager.OTP_NAME))
+    sealed[-1] ^= 1
+    backend.set("alice", login_manager.OTP_NAME, bytes(sealed))
+
+    with pytest.raises(PasswordManagerError, match="failed authentication"):
+        manager.has_otp("alice")
+    with pytest.raises(PasswordManagerError, match="failed authentication"):
+        manager.verify_otp("alice", code(secret), NOW)
+    assert backend.get("alice", login_manager.OTP_NAME) == bytes(sealed)
+
+
+def test_async_login_and_dispatch(manager, secret):
+    vault_keys.lock("alice")
+    dispatched = []
+    handed_over = threading.Event()
+    results = []
+    future = manager.login_async("alice", PASSWORD, callback=results.append,
+                                 dispatch=lambda func: (dispatched.append(func), handed_over.set()))
+    assert future.result(5)
+    # The callback is handed to dispatch rather than run on the worker
+    assert handed_over.wait(5)
+    assert results == []
+    dispatched[0]()
+    assert results == [future]
+
+
+def test_async_register(manager):
+    future = manager.register_async("bob", PASSWORD)
+    assert manager.otp_provisioning_uri("bob", future.result(5))
+
+
+def test_async_backpressure(manager, monkeypatch):
+    monkeypatch.setattr(login_manager, "_hash_slots", threading.BoundedSemaphore(1))
+    gate = threading.Event()
+    monkeypatch.setattr(manager, "login", lambda username, password: gate.wait(5))
+    first = manager.login_async("alice", PASSWORD)
+    with pytest.raises(PasswordManagerError, match="Too many requests"):
+        manager.login_async("alice", PASSWORD, block=False)
+    gate.set()
+    assert first.result(5)
+    # The slot is freed once the first request finishes
+    assert manager.login_async("alice", PASSWORD).result(5)
@@ -0,0 +1,73 @@
+# Tests for the packed wordlist and the shared wordlist cache
+
+import pytest
+
+from managers import passphrase_generator
+from managers.passphrase_generator import PackedWordlist, PassphraseGenerator, load_wordlist
+
+WORDS = ["apple", "bé", "", "cherry", "日本語"]
+
+
+@pytest.fixture
+def wordfile(tmp_path):
+    path = tmp_path / "words.txt"
+    path.write_text("\n".join(["ant", "bear", "camel", "dingo", "elephant"]) + "\n", encoding="utf-8")
+    return str(path)
+
+
+@pytest.fixture
+def reads(monkeypatch):
+    """Empties the cache and counts how often a word file is read."""
+    monkeypatch.setattr(passphrase_generator, "_wordlists", {})
+    calls = []
+    generate_wordlist = passphrase_generator.xp.generate_wordlist
+
+    def counting(**kwargs):
+        calls.append(kwargs["min_length"])
+        return generate_wordlist(**kwargs)
+
+    monkeypatch.setattr(passphrase_generator.xp, "generate_wordlist", counting)
+    return calls
+
+
+def test_lookup():
+    wordlist = PackedWordlist(WORDS)
+    assert len(wordlist) == len(WORDS)
+    assert [wordlist[i] for i in range(len(WORDS))] == WORDS
+    assert wordlist[-1] == "日本語"
+    assert wordlist[1:4] == WORDS[1:4]
+    assert wordlist[::-2] == WORDS[::-2]
+    assert list(wordlist) == WORDS
+    for index in (len(WORDS), -len(WORDS) - 1):
+        with pytest.raises(IndexError):
+            wordlist[index]
+
+
+def test_membership():
+    wordlist = PackedWordlist(WORDS)
+    assert all(word in wordlist for word in WORDS)
+    assert "app" not in wordlist
+    assert "applebé" not in wordlist
+    assert len(PackedWordlist([])) == 0 and "" not in PackedWordlist([])
+
+
+def test_cache_hits(wordfile, reads):
+    wordlist = load_wordlist(4, wordfile)
+    assert sorted(wordlist) == ["bear", "camel", "dingo", "elephant"]
+    assert load_wordlist(4, wordfile) is wordlist
+    assert reads == [4]
+
+
+def test_cache_entries_per_min_length(wordfile, reads):
+    four = load_wordlist(4, wordfile)
+    five = load_wordlist(5, wordfile)
+    assert five is not four
+    assert sorted(five) == ["camel", "dingo", "elephant"]
+    assert load_wordlist(4, wordfile) is four and load_wordlist(5, wordfile) is five
+    assert reads == [4, 5]
+
+
+def test_generators_share_the_cache(wordfile, reads):
+    PassphraseGenerator(word_length=4, wordfile=wordfile).generate_passphrase()
+    list(PassphraseGenerator(word_length=4, wordfile=wordfile).generate_many(5))
+    assert reads == [4]
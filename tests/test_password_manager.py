@@ -0,0 +1,147 @@
+# Tests for bulk import, export and encrypted backups in PasswordManager
+
+import io
+import threading
+
+import pytest
+
+from managers import vault_crypto, vault_keys
+from managers.password_manager import PasswordManager
+
+STRONG = ["Vq7#mK2!pLx9@Rt4", "Zw3$nB8&hJc5*Ye1", "Gd6^sF1%kQv7!Mu2"]
+
+
+@pytest.fixture
+def manager(backend, unlocked):
+    return PasswordManager(backend=backend)
+
+
+def test_store_get_delete(manager, unlocked):
+    manager.add_password(unlocked, "example.com", "alice", STRONG[0])
+    assert manager.get_passwords(unlocked) == {"example.com": {"username": "alice", "password": STRONG[0]}}
+
+    with pytest.raises(ValueError):
+        manager.add_password(unlocked, "example.com", "alice", STRONG[1])
+    manager.delete_password(unlocked, "example.com")
+    assert manager.get_passwords(unlocked) == {}
+
+
+def test_locked_vault_cannot_delete(manager, backend, unlocked):
+    manager.add_password(unlocked, "example.com", "alice", STRONG[0])
+    vault_keys.lock(unlocked)
+    with pytest.raises(vault_keys.VaultLockedError):
+        manager.delete_password(unlocked, "example.com")
+    assert backend.get(unlocked, "site:example.com")
+
+
+def test_idle_vaults_are_evicted(backend, unlocked):
+    manager = PasswordManager(idle_timeout=0, backend=backend)
+    manager.add_password(unlocked, "example.com", "alice", STRONG[0])
+    manager.get_passwords(unlocked)
+    assert manager.evict_idle() == [unlocked]
+    assert manager._sessions == {}
+    assert vault_keys.is_unlocked(unlocked)
+
+    fresh = PasswordManager(backend=backend)
+    fresh.get_passwords(unlocked)
+    assert fresh.evict_idle() == []
+    vault_keys.lock(unlocked)
+    assert fresh.evict_idle() == [unlocked]
+
+
+def test_lock_one_user(manager, backend, unlocked):
+    vault_keys.unlock("bob", "another horse battery staple", backend)
+    manager.get_passwords(unlocked)
+    manager.get_passwords("bob")
+
+    manager.lock(unlocked)
+    assert not vault_keys.is_unlocked(unlocked)
+    assert list(manager._sessions) == ["bob"]
+    assert vault_keys.is_unlocked("bob")
+
+    manager.lock()
+    assert not vault_keys.is_unlocked("bob")
+    assert manager._sessions == {}
+
+
+def test_records_survive_a_new_instance(manager, backend, unlocked):
+    manager.add_password(unlocked, "example.com", "alice", STRONG[0])
+    assert PasswordManager(backend=backend).get_passwords(unlocked)["example.com"]["password"] == STRONG[0]
+
+
+def test_empty_vault_leaves_the_master_hash_alone(manager, backend, unlocked):
+    backend.set(unlocked, "", b"$argon2id$stand-in-hash")
+    assert manager.get_passwords(unlocked) == {}
+    assert backend.get(unlocked) == b"$argon2id$stand-in-hash"
+
+
+def test_bulk_import_and_export(manager, backend, unlocked):
+    entries = [(f"site{i}.example", f"user{i}", STRONG[i % len(STRONG)]) for i in range(20)]
+    assert manager.add_passwords_bulk(unlocked, entries) == 20
+    assert sorted(PasswordManager(backend=backend).export_passwords(unlocked)) == sorted(entries)
+    assert sorted(manager.export_passwords(unlocked)) == sorted(entries)
+
+
+def test_bulk_import_is_all_or_nothing(manager, unlocked):
+    manager.add_password(unlocked, "taken.example", "alice", STRONG[0])
+    entries = [
+        ("new.example", "bob", STRONG[1]),
+        ("taken.example", "bob", STRONG[2]),
+        ("weak.example", "bob", "password"),
+        ("new.example", "carol", STRONG[2]),
+    ]
+    with pytest.raises(ValueError) as error:
+        manager.add_passwords_bulk(unlocked, entries)
+    assert "3 invalid entries" in str(error.value)
+    assert list(manager.get_passwords(unlocked)) == ["taken.example"]
+
+    manager.add_passwords_bulk(unlocked, [("taken.example", "bob", STRONG[2])], overwrite=True)
+    assert manager.get_passwords(unlocked)["taken.example"]["username"] == "bob"
+
+
+def test_encrypted_backup_round_trip(manager, unlocked):
+    dest = io.BytesIO()
+    with manager.open_backup_writer(unlocked, dest) as writer:
+        writer.write(b"site,username,password\n" * 10000)
+    assert b"site" not in dest.getvalue()
+
+    dest.seek(0)
+    assert manager.open_backup_reader(unlocked, dest).read() == b"site,username,password\n" * 10000
+
+
+def test_aborted_backup_never_decrypts(manager, unlocked):
+    dest = io.BytesIO()
+    writer = manager.open_backup_writer(unlocked, dest)
+    writer.write(b"x" * 200000)
+    writer.abort()
+    writer.close()
+
+    dest.seek(0)
+    with pytest.raises(vault_crypto.VaultCryptoError):
+        manager.open_backup_reader(unlocked, dest).read()
+
+
+def test_concurrent_use_of_one_manager(manager, unlocked):
+    manager.add_passwords_bulk(unlocked, [(f"site{i}.example", "alice", STRONG[0]) for i in range(200)])
+    errors = []
+
+    def run(action):
+        try:
+            for i in range(40):
+                action(i)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=run, args=(action,)) for action in (
+        lambda i: manager.store_password(unlocked, f"new{i}.example", STRONG[1], "bob"),
+        lambda i: manager.delete_password(unlocked, f"site{i}.example"),
+        lambda i: manager.get_passwords(unlocked),
+        lambda i: manager.search(unlocked, "example", limit=None),
+        lambda i: manager.find_by_username(unlocked, "bob"),
+    )]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert len(manager.get_passwords(unlocked)) == 200
@@ -0,0 +1,109 @@
+# Tests for the indexed append-only flat password file
+
+import os
+import threading
+import time
+
+import pytest
+
+from managers import password_manager_OLD
+from managers.password_manager_OLD import PasswordManager
+
+
+@pytest.fixture
+def manager(tmp_path):
+    return PasswordManager(str(tmp_path / "passwords.txt"))
+
+
+def test_store_and_verify(manager):
+    assert manager.add_password("example.com", "alice", "hunter2") == 'Password stored successfully'
+    assert manager.add_password("example.com", "alice", "other") == 'Username already exists'
+    assert manager._verify_password("alice", "hunter2")
+    assert not manager._verify_password("alice", "wrong")
+    with pytest.raises(ValueError):
+        manager._verify_password("bob", "hunter2")
+    with pytest.raises(ValueError):
+        manager.add_password("bad:site", "bob", "pw")
+
+
+def test_index_is_shared_through_the_file(manager):
+    manager.add_password("example.com", "alice", "hunter2")
+    other = PasswordManager(manager.filename)
+    other.add_password("example.org", "bob", "s3cret")
+
+    assert manager._username_exists("bob")
+    assert PasswordManager(manager.filename)._verify_password("alice", "hunter2")
+
+
+def test_remove_appends_a_tombstone(manager):
+    manager.add_password("example.com", "alice", "hunter2")
+    with pytest.raises(ValueError):
+        manager.remove_password("other.com", "alice")
+    manager.remove_password("example.com", "alice")
+
+    assert not manager._username_exists("alice")
+    assert list(manager.load_passwords()) == []
+    manager.add_password("example.com", "alice", "new")
+    assert manager._verify_password("alice", "new")
+
+
+def test_iter_records_and_get_passwords(manager):
+    for i in range(50):
+        manager.add_password(f"site{i}", f"user{i}", "pw")
+    for i in range(0, 50, 2):
+        manager.remove_password(f"site{i}", f"user{i}")
+    manager.add_password("sité", "ünïcode", "pw")  # Offsets past a non-ASCII line
+
+    users = [username for (username,) in manager.iter_records(("username",))]
+    assert users == [f"user{i}" for i in range(1, 50, 2)] + ["ünïcode"]
+    first = next(manager.get_passwords(("website", "salt")))
+    assert first["website"] == "site1" and len(first["salt"]) == password_manager_OLD.SALT_LENGTH
+    with pytest.raises(ValueError):
+        list(manager.iter_records(("colour",)))
+
+
+def test_scan_spans_several_windows(manager, monkeypatch):
+    monkeypatch.setattr(password_manager_OLD, "SCAN_WINDOW", 64)
+    for i in range(100):
+        manager.add_password(f"site{i}", f"user{i}", "pw")
+    assert [username for (username,) in manager.iter_records(("username",))] == [f"user{i}" for i in range(100)]
+
+
+def test_compaction_keeps_live_records(manager):
+    for i in range(20):
+        manager.add_password(f"site{i}", f"user{i}", f"pw{i}")
+    for i in range(15):
+        manager.remove_password(f"site{i}", f"user{i}")
+    size = os.path.getsize(manager.filename)
+    manager.compact()
+
+    assert os.path.getsize(manager.filename) < size
+    assert [username for (username,) in manager.iter_records(("username",))] == [f"user{i}" for i in range(15, 20)]
+    assert PasswordManager(manager.filename)._verify_password("user19", "pw19")
+
+
+def test_compaction_waits_for_open_scans(manager):
+    for i in range(10):
+        manager.add_password(f"site{i}", f"user{i}", "pw")
+    records = manager.iter_records(("username",))
+    next(records)
+
+    compacted = threading.Event()
+    thread = threading.Thread(target=lambda: (manager.compact(), compacted.set()))
+    thread.start()
+    time.sleep(0.2)
+    assert not compacted.is_set()
+
+    assert len(list(records)) == 9
+    thread.join(5)
+    assert compacted.is_set()
+
+
+def test_writing_while_scanning_in_the_same_thread(manager):
+    manager.add_password("example.com", "alice", "hunter2")
+    records = manager.iter_records()
+    next(records)
+    with pytest.raises(IOError):
+        manager.add_password("example.org", "bob", "pw")
+    records.close()
+    manager.add_password("example.org", "bob", "pw")
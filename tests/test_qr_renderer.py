@@ -0,0 +1,36 @@
+# Tests for the in-memory QR code rendering used by TOTP enrollment
+
+import pytest
+
+pytest.importorskip("tkinter")
+from pages.qrRenderer import DARK, LIGHT, qr_matrix, render_pgm  # noqa: E402
+
+URI = "otpauth://totp/PassMan:alice?secret=JBSWY3DPEHPK3PXP&issuer=PassMan"
+
+
+def parse_pgm(image):
+    header, pixels = image.split(b"\n", 1)
+    magic, width, height, maxval = header.split()
+    assert (magic, maxval) == (b"P5", b"255")
+    width, height = int(width), int(height)
+    assert len(pixels) == width * height
+    return width, [pixels[row * width:(row + 1) * width] for row in range(height)]
+
+
+def test_matrix_has_the_quiet_zone():
+    matrix = qr_matrix(URI, border=4)
+    assert len(matrix) == len(matrix[0])
+    assert not any(matrix[0]) and not any(row[0] for row in matrix)
+
+
+@pytest.mark.parametrize("size", [200, 100, 10])
+def test_modules_are_whole_pixel_squares(size):
+    matrix = qr_matrix(URI)
+    width, rows = parse_pgm(render_pgm(matrix, size))
+    scale = width // len(matrix)
+    assert width == len(matrix) * max(1, size // len(matrix))
+    assert width <= max(size, len(matrix))
+    for y, row in enumerate(matrix):
+        for x, cell in enumerate(row):
+            assert rows[y * scale][x * scale:(x + 1) * scale] == (DARK if cell else LIGHT) * scale
+            assert rows[y * scale + scale - 1][x * scale] == (DARK if cell else LIGHT)[0]
@@ -0,0 +1,56 @@
+# Tests for the buffered CSPRNG pool
+
+from collections import Counter
+
+import pytest
+
+from managers.random_pool import RandomPool
+
+
+def test_below_stays_in_range():
+    pool = RandomPool(size=64)
+    for n in (1, 2, 3, 7, 255, 256, 257, 10 ** 6):
+        assert all(0 <= pool.below(n) < n for _ in range(200))
+    with pytest.raises(ValueError):
+        pool.below(0)
+
+
+def test_choices():
+    pool = RandomPool(size=16)
+    drawn = pool.choices("abc", 3000)
+    assert len(drawn) == 3000
+    assert set(drawn) == set("abc")
+    assert pool.choices("xyz", 0) == ""
+    with pytest.raises(ValueError):
+        pool.choices("", 1)
+    with pytest.raises(ValueError):
+        pool.choices("ä", 1)
+
+
+def test_choices_are_not_biased():
+    # 256 % 10 != 0, so a modulo mapping would favour 0-5 by about 4%
+    counts = Counter(RandomPool().choices("0123456789", 1000000))
+    assert max(counts.values()) / min(counts.values()) < 1.02
+
+
+def test_shuffle_is_a_permutation():
+    pool = RandomPool()
+    for size in (0, 1, 2, 100, 1000):
+        items = list(range(size))
+        pool.shuffle(items)
+        assert sorted(items) == list(range(size))
+
+
+def test_token_bytes_refill():
+    pool = RandomPool(size=8)
+    data = [pool.token_bytes(5) for _ in range(10)] + [pool.token_bytes(20)]
+    assert [len(d) for d in data] == [5] * 10 + [20]
+
+
+def test_forked_child_discards_the_buffer(monkeypatch):
+    pool = RandomPool()
+    pool.token_bytes(1)
+    buffered = pool._buffer
+    monkeypatch.setattr(pool, "_pid", -1)  # As if the pool came from a parent process
+    pool.token_bytes(1)
+    assert pool._buffer is not buffered
@@ -0,0 +1,54 @@
+# Tests for the zxcvbn score cache
+
+from managers import score_cache
+from managers.score_cache import ScoreCache
+from managers.validation_manager import PasswordValidator
+
+
+def test_hits_and_misses():
+    cache = ScoreCache()
+    assert cache.get("pw") is None
+    cache.put("pw", (3, ("suggestion",)))
+    assert cache.get("pw") == (3, ("suggestion",))
+    assert cache.stats() == {"hits": 1, "misses": 1, "size": 1}
+
+    cache.clear()
+    assert cache.stats() == {"hits": 0, "misses": 0, "size": 0}
+
+
+def test_least_recently_used_is_evicted():
+    cache = ScoreCache(max_size=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_entries_expire(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(score_cache.time, "monotonic", lambda: now[0])
+    cache = ScoreCache(ttl=10)
+    cache.put("pw", 1)
+    now[0] += 9
+    assert cache.get("pw") == 1
+    now[0] += 2
+    assert cache.get("pw") is None
+    assert cache.stats()["size"] == 0
+
+
+def test_passwords_are_not_kept():
+    cache = ScoreCache()
+    cache.put("hunter2", 1)
+    assert all(b"hunter2" not in key for key in cache._entries)
+    assert ScoreCache()._digest("hunter2") != cache._digest("hunter2")
+
+
+def test_validator_uses_the_cache():
+    cache = ScoreCache()
+    validator = PasswordValidator(score_cache=cache)
+    first = validator._security_score("Vq7#mK2!pLx9@Rt4")
+    assert validator._security_score("Vq7#mK2!pLx9@Rt4") == first
+    assert cache.stats()["hits"] == 1
@@ -0,0 +1,79 @@
+# Tests for the in-memory vault search index
+
+import random
+
+import pytest
+
+from managers.search_index import VaultSearchIndex
+
+SITES = {
+    "GitHub.com": "alice",
+    "gitlab.com": "alice",
+    "mail.google.com": "Bob",
+    "google.com": "bob",
+    "example.org": "carol",
+    "x.io": "dave",
+}
+
+
+@pytest.fixture
+def index():
+    return VaultSearchIndex({site: {"username": user, "password": "pw"} for site, user in SITES.items()})
+
+
+def test_prefix(index):
+    assert index.prefix("git") == ["GitHub.com", "gitlab.com"]
+    assert index.prefix("GOO") == ["google.com"]
+    assert index.prefix("git", limit=1) == ["GitHub.com"]
+    assert index.prefix("zzz") == []
+
+
+@pytest.mark.parametrize("query", ["", "o", "oo", "google", ".com", "x.i", "nothing"])
+def test_substring_matches_a_plain_scan(index, query):
+    expected = sorted((site.lower(), site) for site in SITES if query in site.lower())
+    assert index.substring(query, limit=None) == [site for _, site in expected]
+
+
+def test_substring_limit(index):
+    assert len(index.substring("com", limit=2)) == 2
+
+
+def test_fuzzy(index):
+    assert index.fuzzy("gogle.com")[0] == "google.com"
+    assert index.fuzzy("githib")[0] == "GitHub.com"
+    assert index.fuzzy("qqqq") == []
+
+
+def test_by_username(index):
+    assert index.by_username("BOB") == ["google.com", "mail.google.com"]
+    assert index.by_username("nobody") == []
+
+
+def test_add_and_remove(index):
+    index.add("gitea.io", "erin")
+    index.add("x.io", "frank")  # Replaces the old entry
+    index.remove("gitlab.com")
+    index.remove("missing")
+
+    assert len(index) == len(SITES)
+    assert index.prefix("git") == ["gitea.io", "GitHub.com"]
+    assert index.by_username("dave") == []
+    assert index.by_username("frank") == ["x.io"]
+    assert index.substring("lab") == []
+
+
+def test_random_edits_match_a_plain_scan():
+    rng = random.Random(1)
+    index = VaultSearchIndex()
+    sites = set()
+    for _ in range(500):
+        site = "".join(rng.choice("abc.") for _ in range(rng.randint(1, 6)))
+        if site in sites and rng.random() < 0.5:
+            index.remove(site)
+            sites.discard(site)
+        else:
+            index.add(site)
+            sites.add(site)
+    for query in ["a", "ab", "abc", "c.a", ".", ""]:
+        assert index.substring(query, limit=None) == sorted(site for site in sites if query in site)
+        assert index.prefix(query, limit=None) == sorted(site for site in sites if site.startswith(query))
@@ -0,0 +1,99 @@
+# Tests for the pluggable storage backends
+
+import os
+
+import keyring
+import pytest
+
+from managers import storage_backends
+from managers.storage_backends import FileBackend, KeyringBackend, SQLiteBackend
+
+
+@pytest.fixture(params=["file", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "file":
+        backend = FileBackend(str(tmp_path / "vault"))
+    else:
+        backend = SQLiteBackend(str(tmp_path / "passman.db"))
+    yield backend
+    backend.close()
+
+
+def test_round_trip(store):
+    assert store.get("alice", "site:a") is None
+    store.set("alice", "site:a", b"\x00value")
+    store.set("alice", "", b"master")
+    assert store.get("alice", "site:a") == b"\x00value"
+    assert store.get("alice") == b"master"
+    assert store.get("bob", "site:a") is None
+
+
+def test_delete(store):
+    store.set("alice", "site:a", b"1")
+    assert store.delete("alice", "site:a")
+    assert not store.delete("alice", "site:a")
+    assert store.get("alice", "site:a") is None
+
+
+def test_names_by_prefix(store):
+    store.set_many("alice", [("site:b", b"2"), ("site:a", b"1"), ("index", b"i"), ("site/ü:c", b"3")])
+    store.set("bob", "site:z", b"z")
+    assert store.names("alice", "site:") == ["site:a", "site:b"]
+    assert store.names("alice") == ["index", "site/ü:c", "site:a", "site:b"]
+    assert store.names("nobody") == []
+
+    store.delete_many("alice", ["site:a", "site:b"])
+    assert store.names("alice", "site:") == []
+
+
+def test_file_backend_never_lists_temporary_files(tmp_path):
+    backend = FileBackend(str(tmp_path))
+    backend.set("alice", "site:a", b"1")
+    open(os.path.join(backend._owner_dir("alice"), ".tmp-partial"), "wb").close()
+    assert backend.names("alice") == ["site:a"]
+
+
+class FakeKeyring:
+    """Just enough of the keyring module for KeyringBackend."""
+    errors = keyring.errors
+
+    def __init__(self):
+        self.passwords = {}
+
+    def get_password(self, service, name):
+        return self.passwords.get((service, name))
+
+    def set_password(self, service, name, value):
+        self.passwords[(service, name)] = value
+
+    def delete_password(self, service, name):
+        if self.passwords.pop((service, name), None) is None:
+            raise self.errors.PasswordDeleteError(name)
+
+
+def test_keyring_backend_encoding():
+    backend = KeyringBackend()
+    backend._keyring = fake = FakeKeyring()
+    backend.set("alice", "site:a", b"\xff\x00")
+    assert fake.passwords[("pass_man", "alice:site:a")].startswith("b85:")
+    assert backend.get("alice", "site:a") == b"\xff\x00"
+
+    # Values written by older versions
+    fake.passwords[("pass_man", "alice_userpin")] = "1234"
+    fake.passwords[("pass_man", "alice:old")] = "hex:ff00"
+    assert backend.get("alice", "userpin") == b"1234"
+    assert backend.get("alice", "old") == b"\xff\x00"
+    assert backend.delete("alice", "old")
+    assert not backend.delete("alice", "old")
+
+
+def test_get_backend(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage_backends, "_backends", {})
+    monkeypatch.setenv("PASSMAN_BACKEND", "sqlite")
+    backend = storage_backends.get_backend(data_dir=str(tmp_path))
+    assert isinstance(backend, SQLiteBackend)
+    assert storage_backends.get_backend(data_dir=str(tmp_path)) is backend
+    assert isinstance(storage_backends.get_backend("file", str(tmp_path)), FileBackend)
+    with pytest.raises(ValueError):
+        storage_backends.get_backend("floppy", str(tmp_path))
+    backend.close()
@@ -0,0 +1,112 @@
+# Tests for the Tk task scheduler, driven by a stand-in for the Tk root
+
+import itertools
+import threading
+import time
+
+import pytest
+
+from taskScheduler import PRIORITY_BACKGROUND, PRIORITY_USER, TaskScheduler
+
+
+class FakeRoot:
+    """Runs after() callbacks when pump() is called, like Tk's event loop."""
+
+    def __init__(self):
+        self._ids = itertools.count()
+        self.pending = {}
+
+    def after(self, delay, func, *args):
+        after_id = next(self._ids)
+        self.pending[after_id] = (func, args)
+        return after_id
+
+    def after_cancel(self, after_id):
+        self.pending.pop(after_id, None)
+
+    def pump(self, until, timeout=5):
+        deadline = time.monotonic() + timeout
+        while not until():
+            assert time.monotonic() < deadline, "timed out"
+            for after_id in list(self.pending):
+                func, args = self.pending.pop(after_id)
+                func(*args)
+            time.sleep(0.001)
+
+
+@pytest.fixture
+def root():
+    return FakeRoot()
+
+
+@pytest.fixture
+def scheduler(root):
+    busy = []
+    scheduler = TaskScheduler(root, workers=2, on_busy=busy.append)
+    scheduler.busy_calls = busy
+    yield scheduler
+    scheduler.shutdown()
+
+
+def test_callbacks_run_on_the_polling_thread(root, scheduler):
+    results = []
+    scheduler.submit(lambda a, b: a + b, 2, 3, callback=lambda task: results.append(
+        (task.result(), threading.current_thread() is threading.main_thread())))
+    root.pump(lambda: results)
+    assert results == [(5, True)]
+    assert scheduler.busy_calls == [True, False]
+
+
+def test_exceptions_reach_the_callback(root, scheduler):
+    errors = []
+    scheduler.submit(lambda: 1 / 0, callback=lambda task: errors.append(task.exception()))
+    root.pump(lambda: errors)
+    assert isinstance(errors[0], ZeroDivisionError)
+
+
+def test_priority_order(root):
+    scheduler = TaskScheduler(root, workers=1)
+    gate = threading.Event()
+    order = []
+    scheduler.submit(gate.wait)  # Holds the only worker while the rest queue up
+    for name, priority in (("background", PRIORITY_BACKGROUND), ("user", PRIORITY_USER), ("default", 1)):
+        scheduler.submit(order.append, name, priority=priority)
+    gate.set()
+    root.pump(lambda: len(order) == 3)
+    assert order == ["user", "default", "background"]
+    scheduler.shutdown()
+
+
+def test_cancelled_tasks_drop_their_callback(root, scheduler):
+    gate = threading.Event()
+    called = []
+    task = scheduler.submit(gate.wait, callback=called.append)
+    task.cancel()
+    done = []
+    scheduler.submit(lambda: None, callback=done.append)
+    gate.set()
+    root.pump(lambda: done and scheduler._outstanding == 0)
+    assert called == []
+
+
+def test_background_tasks_are_not_busy(root, scheduler):
+    done = []
+    scheduler.submit(lambda: None, priority=PRIORITY_BACKGROUND, callback=done.append)
+    root.pump(lambda: done)
+    assert scheduler.busy_calls == []
+
+
+def test_dispatch_from_another_thread(root, scheduler):
+    ran = []
+    threading.Thread(target=scheduler.dispatch, args=(lambda: ran.append(threading.current_thread()),)).start()
+    root.pump(lambda: ran)
+    assert ran == [threading.main_thread()]
+
+
+def test_callback_errors_go_to_on_error(root):
+    errors = []
+    scheduler = TaskScheduler(root, workers=1, on_error=errors.append)
+    scheduler.submit(lambda: None, callback=lambda task: 1 / 0)
+    root.pump(lambda: errors)
+    assert isinstance(errors[0], ZeroDivisionError)
+    scheduler.shutdown()
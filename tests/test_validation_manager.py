@@ -0,0 +1,88 @@
+# Tests for single and batched password validation
+
+import random
+import string
+
+import pytest
+
+from managers import validation_manager
+from managers.generation_policy import compile_policy
+from managers.score_cache import ScoreCache
+from managers.validation_manager import PasswordValidator
+
+PASSWORDS = [
+    "", "short1!", "abcdefgh", "Abcdef1!", "ABCdef123456!!xyz", "Vq7#mK2!pLx9@Rt4",
+    "pässwort1A!", "ÀÉÎõü12!!abcdXYZ", "emoji😀Aa1!", "aaaaaaaa", "        ",
+]
+
+
+def random_passwords(count, seed=1):
+    rng = random.Random(seed)
+    alphabet = string.printable + "äßÉ😀"
+    return ["".join(rng.choice(alphabet) for _ in range(rng.randint(0, 20))) for _ in range(count)]
+
+
+def slow_status(password):
+    """The original five-pass count, kept as the reference."""
+    return {
+        'length': len(password),
+        'upper': sum(1 for c in password if c.isupper()),
+        'lower': sum(1 for c in password if c.islower()),
+        'number': sum(1 for c in password if c.isdigit()),
+        'special': sum(1 for c in password if not c.isalnum()),
+    }
+
+
+@pytest.mark.parametrize("password", PASSWORDS + random_passwords(200))
+def test_single_pass_counts_match_the_reference(password):
+    assert PasswordValidator()._password_status(password) == slow_status(password)
+
+
+def test_class_tables_agree():
+    for code, cls in enumerate(validation_manager._ASCII_CLASS_OF):
+        assert chr(code).translate(validation_manager._CLASS_LETTERS) == "ULNS"[cls]
+
+
+@pytest.mark.parametrize("numpy", [True, False])
+def test_batched_validation_matches_single(numpy, monkeypatch):
+    if numpy:
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(validation_manager, "_load_numpy", lambda: None)
+    validator = PasswordValidator()
+    passwords = PASSWORDS + random_passwords(500)
+    assert validator._min_validation_many(passwords) == [validator._min_validation(p) for p in passwords]
+
+
+def test_validate_many_matches_validate():
+    validator = PasswordValidator(score_cache=ScoreCache())
+    passwords = PASSWORDS + ["Tr0ub4dor&3", "correct horse battery staple"]
+    expected = [PasswordValidator(score_cache=ScoreCache()).validate(p) for p in passwords]
+    assert list(validator.validate_many(passwords, workers=1, batch_size=4)) == expected
+
+
+def test_strong_requirements_include_the_weak_ones():
+    validator = PasswordValidator(policy=compile_policy(min_length=6, special=0))
+    assert validator.strong_requirements["special"] == 1
+    assert validator.strong_requirements["length"] == 8
+    assert validator.meets_policy("ABab12eeeexyz")
+
+
+@pytest.mark.parametrize("password", ["ABab12éééé!xyz", "ABab12eeee!xyz", "ABab12éééééxyz", "ÄBab12ééé!"])
+def test_non_ascii_early_exit_matches_ascii(password):
+    # Non-ASCII input stops counting once the strong target is met
+    validator = PasswordValidator(policy=compile_policy(special=0))
+    ascii_twin = password.replace("é", "e").replace("Ä", "A")
+    assert validator._min_validation(password) == validator._min_validation(ascii_twin)
+
+
+@pytest.mark.parametrize("numpy", [True, False])
+def test_zero_count_policy_batches_match_single(numpy, monkeypatch):
+    if numpy:
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(validation_manager, "_load_numpy", lambda: None)
+    validator = PasswordValidator(policy=compile_policy(upper=0, special=0), score_cache=ScoreCache())
+    passwords = PASSWORDS + random_passwords(300) + ["ABab12éééé!xyz", "abab12eeeexyz", "ABab12eeee!xyz"]
+    assert validator._min_validation_many(passwords) == [validator._min_validation(p) for p in passwords]
+    assert list(validator.validate_many(passwords[:40], workers=1)) == [validator.validate(p) for p in passwords[:40]]
@@ -0,0 +1,83 @@
+# Tests for the unlocked-session vault cache
+
+import threading
+
+from managers.vault_cache import VaultSession
+
+PASSWORDS = {
+    "example.com": {"username": "alice", "password": "hunter2"},
+    "mail.example.org": {"username": "bob", "password": "s3cret"},
+}
+
+
+def test_snapshot_is_a_deep_copy():
+    session = VaultSession(PASSWORDS)
+    snapshot = session.snapshot()
+    assert snapshot == PASSWORDS
+
+    snapshot["example.com"]["password"] = "changed"
+    del snapshot["mail.example.org"]
+    assert session.snapshot() == PASSWORDS
+
+
+def test_entries_are_copies():
+    session = VaultSession(PASSWORDS)
+    entries = session.entries(["example.com", "missing"])
+    assert entries == {"example.com": PASSWORDS["example.com"]}
+
+    entries["example.com"]["username"] = "mallory"
+    assert session.entries(["example.com"])["example.com"]["username"] == "alice"
+
+
+def test_put_and_remove_keep_the_index_in_step():
+    session = VaultSession(PASSWORDS)
+    index = session.search_index()
+    session.put("new.example.net", "carol", "pw")
+    session.remove("example.com")
+
+    assert session.sites() == ["mail.example.org", "new.example.net"]
+    assert index.prefix("new") == ["new.example.net"]
+    assert index.prefix("example") == []
+    assert session.snapshot()["new.example.net"] == {"username": "carol", "password": "pw"}
+
+
+def test_wipe_zeroes_the_buffers():
+    session = VaultSession(PASSWORDS)
+    buffers = [buffer for entry in session._entries.values() for buffer in entry]
+    session.wipe()
+
+    assert session.snapshot() == {}
+    assert all(not any(buffer) for buffer in buffers)
+
+
+def test_expiry():
+    session = VaultSession({}, idle_timeout=0)
+    session._last_used -= 1
+    assert session.expired()
+    assert not VaultSession({}, idle_timeout=None).expired()
+
+
+def test_concurrent_writes_and_reads():
+    session = VaultSession({f"site{i}": {"username": "u", "password": "p"} for i in range(2000)})
+    errors = []
+
+    def run(action):
+        try:
+            for i in range(300):
+                action(i)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=run, args=(action,)) for action in (
+        lambda i: session.put(f"new{i}", "u", "p"),
+        lambda i: session.remove(f"site{i}"),
+        lambda i: session.snapshot(),
+        lambda i: session.lookup("substring", "site1", None),
+        lambda i: session.entries(["site1999", f"new{i}"]),
+    )]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert len(session.snapshot()) == 2000
@@ -0,0 +1,107 @@
+# Tests for sealed records and encrypted streams
+
+import io
+import os
+
+import pytest
+
+from managers import vault_crypto
+from managers.vault_crypto import VaultCryptoError
+
+KEY = bytes(range(32))
+OTHER_KEY = bytes(32)
+
+
+def test_record_round_trip():
+    sealed = vault_crypto.seal(KEY, b"secret", "alice", "site:a")
+    assert b"secret" not in sealed
+    assert vault_crypto.open_sealed(KEY, sealed, "alice", "site:a") == b"secret"
+    assert vault_crypto.seal(KEY, b"secret", "alice", "site:a") != sealed  # Fresh nonce
+
+
+@pytest.mark.parametrize("key, owner, name", [
+    (OTHER_KEY, "alice", "site:a"),
+    (KEY, "bob", "site:a"),  # Copied into another vault
+    (KEY, "alice", "site:b"),  # Swapped with another site
+])
+def test_record_is_bound_to_key_owner_and_name(key, owner, name):
+    sealed = vault_crypto.seal(KEY, b"secret", "alice", "site:a")
+    with pytest.raises(VaultCryptoError):
+        vault_crypto.open_sealed(key, sealed, owner, name)
+
+
+@pytest.mark.parametrize("damage", [
+    lambda sealed: sealed[:-1],
+    lambda sealed: sealed[:10],
+    lambda sealed: bytes((sealed[0] ^ 1,)) + sealed[1:],  # Not a GCM record
+    lambda sealed: sealed[:20] + bytes((sealed[20] ^ 1,)) + sealed[21:],
+    lambda sealed: b"",
+])
+def test_damaged_records_are_rejected(damage):
+    sealed = vault_crypto.seal(KEY, b"secret" * 10, "alice")
+    with pytest.raises(VaultCryptoError):
+        vault_crypto.open_sealed(KEY, damage(sealed), "alice")
+
+
+@pytest.mark.parametrize("size", [0, 1, 99, 100, 101, 1000])
+def test_stream_round_trip(size):
+    data = os.urandom(size)
+    pieces = [data[i:i + 7] for i in range(0, size, 7)]
+    encrypted = b"".join(vault_crypto.encrypt_chunks(KEY, pieces, "alice", "backup", chunk_size=100))
+    # Read back in pieces that do not line up with the segments
+    chunks = [encrypted[i:i + 33] for i in range(0, len(encrypted), 33)]
+    assert b"".join(vault_crypto.decrypt_chunks(KEY, chunks, "alice", "backup")) == data
+
+
+def test_file_streams():
+    source, dest, out = io.BytesIO(os.urandom(300000)), io.BytesIO(), io.BytesIO()
+    vault_crypto.encrypt_stream(KEY, source, dest, "alice")
+    vault_crypto.decrypt_stream(KEY, io.BytesIO(dest.getvalue()), out, "alice")
+    assert out.getvalue() == source.getvalue()
+
+
+def encrypted_segments(data=b"x" * 450, chunk_size=100):
+    pieces = list(vault_crypto.encrypt_chunks(KEY, [data], "alice", chunk_size=chunk_size))
+    return pieces[0], pieces[1:]
+
+
+@pytest.mark.parametrize("tamper", [
+    lambda segments: segments[:-1],  # Final segment dropped
+    lambda segments: segments[:2],  # Truncated at a segment boundary
+    lambda segments: [segments[1], segments[0]] + segments[2:],  # Reordered
+    lambda segments: segments[:1] + segments[2:],  # Middle segment dropped
+    lambda segments: segments[:-1] + [segments[-1][:-1]],  # Last byte cut off
+])
+def test_tampered_streams_are_rejected(tamper):
+    header, segments = encrypted_segments()
+    with pytest.raises(VaultCryptoError):
+        b"".join(vault_crypto.decrypt_chunks(KEY, [header] + tamper(segments), "alice"))
+
+
+def test_stream_bound_to_owner():
+    header, segments = encrypted_segments()
+    with pytest.raises(VaultCryptoError):
+        b"".join(vault_crypto.decrypt_chunks(KEY, [header] + segments, "bob"))
+    with pytest.raises(VaultCryptoError):
+        b"".join(vault_crypto.decrypt_chunks(KEY, [b"\x00" * 3], "alice"))
+
+
+def test_text_wrappers():
+    dest = io.BytesIO()
+    with io.TextIOWrapper(vault_crypto.EncryptingWriter(KEY, dest, "alice", chunk_size=64), encoding="utf-8") as text:
+        for row in range(100):
+            text.write(f"site{row},user,pä55\n")
+    reader = vault_crypto.DecryptingReader(KEY, io.BytesIO(dest.getvalue()), "alice")
+    lines = io.TextIOWrapper(reader, encoding="utf-8").readlines()
+    assert lines == [f"site{row},user,pä55\n" for row in range(100)]
+
+
+def test_aborted_writer_leaves_a_truncated_stream():
+    dest = io.BytesIO()
+    writer = vault_crypto.EncryptingWriter(KEY, dest, "alice", chunk_size=64)
+    writer.write(b"y" * 1000)
+    writer.abort()
+    writer.write(b"dropped")
+    writer.close()
+    with pytest.raises(VaultCryptoError):
+        b"".join(vault_crypto.decrypt_chunks(KEY, [dest.getvalue()], "alice"))
@@ -0,0 +1,55 @@
+# Tests for the binary vault record format
+
+import zlib
+
+import pytest
+
+from managers import vault_format
+from managers.vault_format import HEADER, LENGTH, MAGIC, VERSION, VaultFormatError, VaultReader
+
+
+def blob(body, flags=0):
+    return HEADER.pack(MAGIC, VERSION, flags) + body
+
+
+def test_round_trip():
+    records = [("example.com", "alice", "pä55:word"), ("", ""), ("only",)]
+    data = vault_format.encode_records(records)
+    assert list(VaultReader(data)) == records
+    assert VaultReader(data).first() == records[0]
+
+
+def test_large_bodies_are_compressed():
+    records = [(f"site{i}", "user", "password") for i in range(100)]
+    data = vault_format.encode_records(records)
+    assert HEADER.unpack_from(data)[2] & vault_format.FLAG_COMPRESSED
+    assert list(VaultReader(data)) == records
+    assert not HEADER.unpack_from(vault_format.encode_records(records, compress=False))[2]
+
+
+def test_iter_raw_yields_memoryviews():
+    data = vault_format.encode_records([("a", "bc")], compress=False)
+    (fields,) = VaultReader(data).iter_raw()
+    assert [bytes(field) for field in fields] == [b"a", b"bc"]
+
+
+@pytest.mark.parametrize("data", [
+    b"PM",  # Shorter than the header
+    b"XYZ\x01\x00",  # Wrong magic
+    HEADER.pack(MAGIC, VERSION + 1, 0),  # Unknown version
+    blob(b"\x00\x00"),  # Record length cut short
+    blob(LENGTH.pack(10) + b"abc"),  # Record runs past the body
+    blob(LENGTH.pack(2) + b"\x00\x00"),  # Field length cut short
+    blob(LENGTH.pack(6) + LENGTH.pack(10) + b"ab"),  # Field runs past the record
+    blob(LENGTH.pack(5) + LENGTH.pack(1) + b"\xff"),  # Not UTF-8
+    blob(b"not zlib", vault_format.FLAG_COMPRESSED),
+    blob(zlib.compress(b"")[:-2], vault_format.FLAG_COMPRESSED),  # Truncated zlib stream
+])
+def test_malformed_data_raises_format_error(data):
+    with pytest.raises(VaultFormatError):
+        list(VaultReader(data))
+
+
+def test_first_of_empty_blob():
+    with pytest.raises(VaultFormatError):
+        VaultReader(vault_format.encode_records([])).first()
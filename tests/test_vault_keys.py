@@ -0,0 +1,57 @@
+# Tests for the session vault keys
+
+import pytest
+
+from managers import argon2_tuning, vault_keys
+from managers.password_manager import PasswordManager
+
+
+@pytest.fixture(autouse=True)
+def lock_all():
+    yield
+    vault_keys.lock_all()
+
+
+def test_unlock_derives_the_same_key_every_session(backend):
+    vault_keys.unlock("alice", "correct horse battery staple", backend)
+    key = vault_keys.get_session_key("alice")
+    assert len(key) == vault_keys.KEY_SIZE
+    vault_keys.lock("alice")
+
+    vault_keys.unlock("alice", "correct horse battery staple", backend)
+    assert vault_keys.get_session_key("alice") == key
+
+
+def test_keys_differ_by_password_and_user(backend):
+    vault_keys.unlock("alice", "correct horse battery staple", backend)
+    vault_keys.unlock("bob", "correct horse battery staple", backend)
+    assert vault_keys.get_session_key("alice") != vault_keys.get_session_key("bob")
+
+    key = vault_keys.get_session_key("alice")
+    vault_keys.unlock("alice", "wrong password", backend)
+    assert vault_keys.get_session_key("alice") != key
+
+
+def test_lock_zeroes_the_key(backend):
+    vault_keys.unlock("alice", "correct horse battery staple", backend)
+    stored = vault_keys._session_keys["alice"]
+    vault_keys.lock("alice")
+
+    assert not any(stored)
+    assert not vault_keys.is_unlocked("alice")
+    with pytest.raises(vault_keys.VaultLockedError):
+        vault_keys.get_session_key("alice")
+
+
+def test_locked_vault_cannot_be_used(backend):
+    with pytest.raises(vault_keys.VaultLockedError):
+        PasswordManager(backend=backend).add_password("alice", "example.com", "alice", "Vq7#mK2!pLx9@Rt4")
+
+
+def test_kdf_parameters_are_fixed_at_creation(data_dir, backend):
+    vault_keys.unlock("alice", "correct horse battery staple", backend)
+    key = vault_keys.get_session_key("alice")
+    argon2_tuning.save_parameters({"time_cost": 2, "memory_cost": 16, "parallelism": 1}, data_dir)
+
+    vault_keys.unlock("alice", "correct horse battery staple", backend)
+    assert vault_keys.get_session_key("alice") == key